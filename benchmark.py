@@ -0,0 +1,312 @@
+import argparse
+import gc
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from model import Table, Column, PdmColumnType
+
+# 基准测试默认的模型规模：(表数量, 每张表的字段数)
+SUITE_SIZES = [(200, 20), (2000, 20)]
+# 耗时、峰值内存超过基线的比例达到该值即视为退化
+TIME_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.10
+# 短于该值的耗时差异视为测量噪声
+MIN_TIME_DELTA = 0.02
+
+# pdm sql冷启动（单表模型）比空解释器启动多出的耗时上限（秒）
+COLD_START_BUDGET = 0.25
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdm_cli.py")
+
+# 合成模型中循环使用的字段类型
+SYNTHETIC_TYPES = [PdmColumnType.BIGINT, PdmColumnType.VARCHAR, PdmColumnType.DATETIME, PdmColumnType.DECIMAL,
+                   PdmColumnType.INT, PdmColumnType.TEXT]
+
+
+class DictTable:
+    """
+    以__dict__存储属性的表（对照组，等同于紧凑化之前的模型）
+    """
+
+    def __init__(self, id=None, name=None, code=None, comment=None):
+        self.id = id
+        self.name = name
+        self.code = code
+        self.comment = comment
+        self.columns = []
+        self.refs = []
+
+
+class DictColumn:
+    """
+    以__dict__存储属性的字段（对照组），长度保持为字符串，编码不驻留
+    """
+
+    def __init__(self, name=None, code=None, col_type=None, col_length=None, comment=None):
+        self.name = name
+        self.code = code
+        self.col_type = col_type
+        self.col_length = col_length
+        self.pk = False
+        self.not_null = False
+        self.comment = comment
+
+
+def build_synthetic_model(n_tables: int, n_columns: int, compact: bool = True, n_refs: int = 0,
+                          seed: int = 1) -> list:
+    """
+    在内存中构造合成模型，字段编码、名称在各表间重复，模拟真实模型中的公共字段
+    :param n_tables: 表数量
+    :param n_columns: 每张表的字段数
+    :param compact: True使用model中的紧凑模型，False使用dict对照组
+    :param n_refs: 表之间的关联数量，子表总是引用编号更小的主表，不产生循环
+    :param seed: 随机种子
+    :return: 表列表
+    """
+    tables = []
+    for i in range(n_tables):
+        if compact:
+            t = Table("o%d" % i, "表%d" % i, "t_table_%d" % i)
+        else:
+            t = DictTable("o%d" % i, "表%d" % i, "t_table_%d" % i)
+        for j in range(n_columns):
+            col_type = SYNTHETIC_TYPES[j % len(SYNTHETIC_TYPES)]
+            # 每次重新拼接字符串，与解析器逐个读出文本的情况一致
+            name, code, length = "字段%d" % j, "col_%d" % j, "%d" % 64
+            if compact:
+                c = Column(sys.intern(name), sys.intern(code), col_type, int(length))
+            else:
+                c = DictColumn(name, code, col_type.name.lower(), length)
+            t.columns.append(c)
+        tables.append(t)
+    rnd = random.Random(seed)
+    for _ in range(n_refs if n_tables > 1 else 0):
+        child = rnd.randrange(1, n_tables)
+        tables[child].refs.append(tables[rnd.randrange(0, child)])
+    return tables
+
+
+def bench_model_memory(n_tables: int = 2000, n_columns: int = 50) -> dict:
+    """
+    测量合成模型在紧凑模型与dict对照组下的内存占用
+    :return: {"compact": 字节数, "dict": 字节数}
+    """
+    result = {}
+    for label, compact in (("compact", True), ("dict", False)):
+        tracemalloc.start()
+        tables = build_synthetic_model(n_tables, n_columns, compact)
+        result[label] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del tables
+    return result
+
+
+def bench_layout(n_tables: int = 5000, n_columns: int = 20, n_refs: int = None) -> dict:
+    """
+    测量无界面ER布局与SVG导出的耗时
+    :return: {"layout": 秒, "svg": 秒, "svg_bytes": 字节数}
+    """
+    from er_layout import layout_tables, write_svg
+
+    if n_refs is None:
+        n_refs = n_tables
+    tables = build_synthetic_model(n_tables, n_columns, n_refs=n_refs)
+    start = time.perf_counter()
+    layout = layout_tables(tables)
+    layout_time = time.perf_counter() - start
+    out = io.StringIO()
+    start = time.perf_counter()
+    write_svg(layout, out)
+    return {"layout": layout_time, "svg": time.perf_counter() - start, "svg_bytes": len(out.getvalue())}
+
+
+def measure(func, repeat: int = 3) -> dict:
+    """
+    测量一个阶段：耗时取repeat次中的最小值，峰值内存在额外一次tracemalloc跟踪下测得（跟踪会拖慢执行，不计入耗时）
+    :return: {"time": 秒, "peak": 字节数}
+    """
+    best = None
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"time": best, "peak": peak}
+
+
+def bench_pipeline(n_tables: int, n_columns: int, workdir: str, repeat: int = 3) -> dict:
+    """
+    端到端测量各阶段：生成合成PDM、解析、生成建表SQL、生成Python模型、ER布局
+    :param workdir: 存放合成PDM文件的目录
+    :return: {阶段: {"time": 秒, "peak": 字节数}}
+    """
+    from er_layout import layout_tables
+    from pdm_parser import parse_pdm
+    from pdm_synth import write_synthetic_pdm
+    from pymodel import generate_pymodel
+    from sql_generator import DbType, generate_sql
+
+    pdm_path = os.path.join(workdir, "synthetic_%d_%d.pdm" % (n_tables, n_columns))
+    result = {"synth": measure(lambda: write_synthetic_pdm(pdm_path, n_tables, n_columns), 1)}
+    result["parse"] = measure(lambda: parse_pdm(pdm_path), repeat)
+    tables = parse_pdm(pdm_path)
+    result["sql"] = measure(lambda: generate_sql(tables, DbType.MYSQL), repeat)
+    result["pymodel"] = measure(lambda: generate_pymodel(tables), repeat)
+    result["layout"] = measure(lambda: layout_tables(tables), repeat)
+    return result
+
+
+def run_suite(sizes: list = None, repeat: int = 3, workdir: str = None) -> dict:
+    """
+    按多个模型规模运行端到端测量
+    :param sizes: [(表数量, 字段数)]，默认为SUITE_SIZES
+    :param workdir: 存放合成PDM文件的目录，默认使用临时目录
+    :return: {"表数量x字段数": {阶段: {"time": 秒, "peak": 字节数}}}
+    """
+    if sizes is None:
+        sizes = SUITE_SIZES
+    if workdir is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return run_suite(sizes, repeat, tmp)
+    return {"%dx%d" % (n_tables, n_columns): bench_pipeline(n_tables, n_columns, workdir, repeat)
+            for n_tables, n_columns in sizes}
+
+
+def bench_cold_start(repeat: int = 5, workdir: str = None) -> dict:
+    """
+    测量新进程中执行pdm sql的耗时，模型只有一张表，耗时主要为解释器启动与模块导入
+    :return: {"python": 空解释器启动耗时, "sql": pdm sql耗时, "overhead": 二者之差}，均取最小值
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            return bench_cold_start(repeat, tmp)
+    from pdm_synth import write_synthetic_pdm
+
+    pdm_path = os.path.join(workdir, "cold_start.pdm")
+    write_synthetic_pdm(pdm_path, 1, 10)
+
+    def run(args):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, check=True)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    python = run(["-c", "pass"])
+    sql = run([CLI_PATH, "sql", pdm_path])
+    return {"python": python, "sql": sql, "overhead": sql - python}
+
+
+def check_regression(result: dict, baseline: dict, time_tolerance: float = TIME_TOLERANCE,
+                     memory_tolerance: float = MEMORY_TOLERANCE) -> list:
+    """
+    与基线比较，基线中不存在的规模或阶段不参与比较
+    :return: 退化描述列表，为空表示没有退化
+    """
+    regressions = []
+    for size, stages in result.items():
+        for stage, value in stages.items():
+            base = baseline.get(size, {}).get(stage)
+            if base is None:
+                continue
+            if value["time"] > base["time"] * (1 + time_tolerance) + MIN_TIME_DELTA:
+                regressions.append("%s %s: 耗时 %.3f s -> %.3f s" % (size, stage, base["time"], value["time"]))
+            if value["peak"] > base["peak"] * (1 + memory_tolerance):
+                regressions.append("%s %s: 峰值内存 %.1f MB -> %.1f MB" % (
+                    size, stage, base["peak"] / 1024 / 1024, value["peak"] / 1024 / 1024))
+    return regressions
+
+
+def parse_sizes(text: str) -> list:
+    """
+    :param text: 形如"200x20,2000x20"
+    :return: [(表数量, 字段数)]
+    """
+    sizes = []
+    for item in text.split(","):
+        n_tables, n_columns = item.lower().split("x")
+        sizes.append((int(n_tables), int(n_columns)))
+    return sizes
+
+
+def print_model_report(n_tables: int, n_columns: int):
+    mem = bench_model_memory(n_tables, n_columns)
+    n = n_tables * n_columns
+    print("模型内存: %d张表, %d个字段" % (n_tables, n))
+    print("\tdict\t: %.1f MB\t(%.0f B/字段)" % (mem["dict"] / 1024 / 1024, mem["dict"] / n))
+    print("\tcompact\t: %.1f MB\t(%.0f B/字段)" % (mem["compact"] / 1024 / 1024, mem["compact"] / n))
+    print("\t节省\t: %.0f%%" % (100 - mem["compact"] * 100 / mem["dict"]))
+
+    result = bench_layout(n_tables, n_columns)
+    print("ER布局: %d张表" % n_tables)
+    print("\tlayout\t: %.2f s" % result["layout"])
+    print("\tsvg\t: %.2f s\t(%.1f MB)" % (result["svg"], result["svg_bytes"] / 1024 / 1024))
+
+
+def main(argv: list = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="性能测试")
+    arg_parser.add_argument("--sizes", type=parse_sizes, default=SUITE_SIZES,
+                            help="模型规模，形如200x20,2000x20（表数量x每张表的字段数）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="每个阶段的重复次数，耗时取最小值")
+    arg_parser.add_argument("--baseline", help="基线文件，任一阶段超出容差时返回非0")
+    arg_parser.add_argument("--save-baseline", help="将本次结果保存为基线文件")
+    arg_parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE, help="耗时容差比例")
+    arg_parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE, help="峰值内存容差比例")
+    arg_parser.add_argument("--model", action="store_true", help="另外输出紧凑模型内存对比与大模型布局耗时")
+    arg_parser.add_argument("--tables", type=int, default=2000, help="--model使用的表数量")
+    arg_parser.add_argument("--columns", type=int, default=50, help="--model使用的每张表的字段数")
+    arg_parser.add_argument("--cold-start", action="store_true", help="另外测量pdm sql的冷启动耗时，超出预算时返回非0")
+    arg_parser.add_argument("--cold-start-budget", type=float, default=COLD_START_BUDGET,
+                            help="冷启动比空解释器多出的耗时上限（秒）")
+    args = arg_parser.parse_args(argv)
+
+    if args.model:
+        print_model_report(args.tables, args.columns)
+
+    over_budget = False
+    if args.cold_start:
+        cold = bench_cold_start(max(args.repeat, 5))
+        print("冷启动: pdm sql %.3f s\t(解释器 %.3f s, 额外 %.3f s, 预算 %.3f s)" % (
+            cold["sql"], cold["python"], cold["overhead"], args.cold_start_budget))
+        if cold["overhead"] > args.cold_start_budget:
+            over_budget = True
+            print("性能退化: 冷启动超出预算", file=sys.stderr)
+
+    result = run_suite(args.sizes, args.repeat)
+    for size, stages in result.items():
+        print("端到端: %s" % size)
+        for stage, value in stages.items():
+            print("\t%-8s: %8.3f s\t%8.1f MB" % (stage, value["time"], value["peak"] / 1024 / 1024))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check_regression(result, baseline, args.time_tolerance, args.memory_tolerance)
+        for message in regressions:
+            print("性能退化: %s" % message, file=sys.stderr)
+        if regressions:
+            return 1
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import argparse
+import csv
+import os
+import random
+import string
+import sys
+import time
+from itertools import repeat
+
+from model import Table, Column, PdmColumnType, Schema
+
+# 每批生成的行数，内存占用与之成正比
+CHUNK_ROWS = 50000
+# 字符串、时间等需要格式化的值先生成该数量的候选值，再按批随机抽取；须为2的幂
+POOL_SIZE = 4096
+# 生成字符串的最大长度
+MAX_TEXT_LENGTH = 32
+# 可为空字段的空值比例
+NULL_RATIO = 0.1
+
+# 整数类型的取值范围
+INTEGER_RANGES = {
+    PdmColumnType.BYTE: (0, 255),
+    PdmColumnType.TINYINT: (0, 127),
+    PdmColumnType.SMALLINT: (0, 32767),
+    PdmColumnType.MEDIUMINT: (0, 8388607),
+    PdmColumnType.INT: (0, 2147483647),
+    PdmColumnType.BIGINT: (0, 9223372036854775807),
+    PdmColumnType.NUMBER: (0, 9223372036854775807),
+    PdmColumnType.YEAR: (1970, 2037),
+}
+# 字符串类型未指定长度时的默认长度
+TEXT_LENGTHS = {
+    PdmColumnType.CHAR: 50,
+    PdmColumnType.VARCHAR: 255,
+    PdmColumnType.TINYTEXT: 255,
+    PdmColumnType.TEXT: 65535,
+    PdmColumnType.MEDIUMTEXT: 65535,
+    PdmColumnType.LONGTEXT: 65535,
+}
+BINARY_TYPES = frozenset([PdmColumnType.TINYBLOB, PdmColumnType.BLOB, PdmColumnType.MEDIUMBLOB,
+                          PdmColumnType.LONGBLOB])
+# 生成时间的范围：2000-01-01至2030-01-01
+TIME_RANGE = (946684800, 1893456000)
+TIME_FORMATS = {
+    PdmColumnType.DATE: "%Y-%m-%d",
+    PdmColumnType.TIME: "%H:%M:%S",
+    PdmColumnType.DATETIME: "%Y-%m-%d %H:%M:%S",
+    PdmColumnType.TIMESTAMP: "%Y-%m-%d %H:%M:%S",
+}
+
+
+class TablePlan:
+    """
+    一张表的生成计划：行数、主键字段，以及外键字段 -> 主表
+    """
+
+    def __init__(self, table: Table, rows: int):
+        self.table = table
+        self.rows = rows
+        self.pk = find_pk_column(table)
+        # [(字段, 主表TablePlan)]
+        self.foreign_keys = []
+
+
+class DataGenerator:
+    """
+    按模型批量生成测试数据：按字段逐列整批生成（而不是逐行构造对象），主表先于子表生成，
+    子表的外键只取主表已生成（或将生成）的主键值，每批写出后即释放，内存占用只与批大小有关
+
+    主键为整数时取1..行数，为字符串时取其十进制文本，因此外键值无需保存主表数据即可按行数生成
+    主键同时是外键（一对一）时，子表行数不超过主表行数，主键1..行数即都是主表已有的主键
+    外键字段取自关联中的字段对(Table.joins)；关联没有指明字段时按编码推断：
+    主表的非id主键编码、<主表编码>_id，或去掉表前缀后的<名称>_id
+    """
+
+    def __init__(self, tables: list, rows=1000, seed: int = 1, null_ratio: float = NULL_RATIO,
+                 chunk_rows: int = CHUNK_ROWS):
+        """
+        :param tables: 表列表
+        :param rows: 每张表的行数，或{表编码: 行数}（未列出的表不生成）
+        :param seed: 随机种子，相同参数生成的数据相同
+        :param null_ratio: 可为空字段的空值比例
+        :param chunk_rows: 每批生成的行数
+        """
+        self.schema = Schema(tables)
+        self.seed = seed
+        self.null_ratio = null_ratio
+        self.chunk_rows = chunk_rows
+        self.plans = {}
+        for table in self.schema.topological_order + self.schema.cyclic:
+            if isinstance(rows, dict):
+                n = rows.get(table.code, rows.get(table.code.lower()))
+                if n is None:
+                    continue
+            else:
+                n = rows
+            self.plans[table.id] = TablePlan(table, n)
+        for plan in self.plans.values():
+            # 同一主表可能通过多个关联被引用，每个关联的外键字段都取主表的主键值
+            joined = set()
+            for parent, col, parent_col in plan.table.joins:
+                parent_plan = self.__parent_plan(parent)
+                if parent_plan is not None and parent_col is parent_plan.pk:
+                    self.__add_foreign_key(plan, col, parent_plan)
+                    joined.add(parent.id)
+            for parent in self.schema.get_parents(plan.table):
+                parent_plan = self.__parent_plan(parent)
+                if parent_plan is None or parent.id in joined:
+                    continue
+                col = find_fk_column(plan.table, parent, parent_plan.pk)
+                if col is not None:
+                    self.__add_foreign_key(plan, col, parent_plan)
+
+    @staticmethod
+    def __add_foreign_key(plan: TablePlan, col: Column, parent_plan: TablePlan):
+        if col is plan.pk:
+            plan.rows = min(plan.rows, parent_plan.rows)
+        else:
+            plan.foreign_keys.append((col, parent_plan))
+
+    def __parent_plan(self, parent: Table):
+        """
+        :return: 可以被引用的主表TablePlan（有主键且行数大于0），否则返回None
+        """
+        parent_plan = self.plans.get(parent.id)
+        if parent_plan is None or parent_plan.pk is None or parent_plan.rows == 0:
+            return None
+        return parent_plan
+
+    @property
+    def order(self) -> list:
+        """
+        :return: 生成顺序（主表在前，循环引用的表在最后）的TablePlan列表
+        """
+        return list(self.plans.values())
+
+    def iter_chunks(self, plan: TablePlan):
+        """
+        :return: 每批数据的列列表生成器，列顺序与表字段顺序一致
+        """
+        rnd = random.Random("%s:%s" % (self.seed, plan.table.code))
+        fk_parents = {id(col): parent for col, parent in plan.foreign_keys}
+        # 行数较少时缩小候选值个数（保持为2的幂）
+        pool_size = min(POOL_SIZE, 1 << max(0, plan.rows - 1).bit_length())
+        generators = []
+        for col in plan.table.columns:
+            if col is plan.pk:
+                generators.append(_sequence_generator(col))
+            elif id(col) in fk_parents:
+                generators.append(_foreign_key_generator(col, fk_parents[id(col)], rnd))
+            else:
+                generators.append(_value_generator(col, rnd, 0 if col.not_null else self.null_ratio,
+                                                   pool_size))
+        for start in range(0, plan.rows, self.chunk_rows):
+            n = min(self.chunk_rows, plan.rows - start)
+            yield [generate(start, n) for generate in generators]
+
+    def write_csv(self, out_dir: str, log=None) -> list:
+        """
+        按生成顺序为每张表写出<表编码>.csv（首行为字段编码，空值为空字段）
+        :param out_dir: 输出目录
+        :param log: 日志输出函数，每张表完成后调用
+        :return: 按生成顺序排列的文件路径列表
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        paths = []
+        for plan in self.order:
+            start = time.perf_counter()
+            path = os.path.join(out_dir, plan.table.code.lower() + ".csv")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                self.write_table_csv(plan, f)
+            paths.append(path)
+            if log is not None:
+                log("%s\t%d行, 耗时%.2fs" % (plan.table.code, plan.rows, time.perf_counter() - start))
+        return paths
+
+    def write_table_csv(self, plan: TablePlan, out):
+        """
+        生成的值不含分隔符、引号与换行，按列整批转为文本后直接拼接成行，不逐个值做CSV转义
+        """
+        writer = csv.writer(out, lineterminator="\n")
+        writer.writerow([col.code.lower() for col in plan.table.columns])
+        for columns in self.iter_chunks(plan):
+            texts = [list(map(_csv_text, values)) for values in columns]
+            out.write("\n".join(map(",".join, zip(*texts))))
+            out.write("\n")
+
+
+def find_pk_column(table: Table):
+    """
+    :return: 主键字段：标记为主键的字段，其次为id字段，没有时返回None
+    """
+    for col in table.columns:
+        if col.pk:
+            return col
+    for col in table.columns:
+        if col.code is not None and col.code.lower() == "id":
+            return col
+    return None
+
+
+def find_fk_column(table: Table, parent: Table, parent_pk: Column):
+    """
+    子表中引用主表主键的字段：优先取关联中的字段对，其次按编码推断，找不到时返回None
+    """
+    for join_parent, col, parent_col in table.joins:
+        if join_parent is parent and parent_col is parent_pk:
+            return col
+    parent_code = parent.code.lower()
+    candidates = [parent_code + "_id"]
+    if "_" in parent_code:
+        candidates.append(parent_code.split("_", 1)[1] + "_id")
+    if parent_pk.code.lower() != "id":
+        candidates.insert(0, parent_pk.code.lower())
+    columns = {col.code.lower(): col for col in table.columns if col.code is not None}
+    for code in candidates:
+        col = columns.get(code)
+        if col is not None:
+            return col
+    return None
+
+
+def _csv_text(value) -> str:
+    return "" if value is None else str(value)
+
+
+def _is_text(col: Column) -> bool:
+    return col.col_type in TEXT_LENGTHS or col.col_type in BINARY_TYPES or col.col_type is None
+
+
+def _sequence_generator(col: Column):
+    if _is_text(col):
+        return lambda start, n: [str(i) for i in range(start + 1, start + n + 1)]
+    return lambda start, n: list(range(start + 1, start + n + 1))
+
+
+def _foreign_key_generator(col: Column, parent: TablePlan, rnd: random.Random):
+    keys = range(1, parent.rows + 1)
+    if _is_text(col):
+        return lambda start, n: [str(k) for k in rnd.choices(keys, k=n)]
+    return lambda start, n: rnd.choices(keys, k=n)
+
+
+def _value_generator(col: Column, rnd: random.Random, null_ratio: float, pool_size: int = POOL_SIZE):
+    col_type = col.col_type
+    getrandbits = rnd.getrandbits
+    low, high = INTEGER_RANGES.get(col_type, (0, -1))
+    width = high - low + 1
+    if width > 0 and width & (width - 1) == 0:
+        # 取值个数为2的幂时直接取随机位，整批在C中完成
+        bits = width.bit_length() - 1
+        if low:
+            def choose(n):
+                return [low + v for v in map(getrandbits, repeat(bits, n))]
+        else:
+            def choose(n):
+                return list(map(getrandbits, repeat(bits, n)))
+    else:
+        if width > 0:
+            pool = [low + rnd.randrange(width) for _ in range(pool_size)]
+        else:
+            pool = _value_pool(col, rnd, pool_size)
+        # 候选值个数为2的幂，按随机位下标抽取
+        bits = pool_size.bit_length() - 1
+
+        def choose(n):
+            return list(map(pool.__getitem__, map(getrandbits, repeat(bits, n))))
+
+    def generate(start, n):
+        values = choose(n)
+        if null_ratio:
+            for i in rnd.sample(range(n), int(n * null_ratio)):
+                values[i] = None
+        return values
+    return generate
+
+
+def _value_pool(col: Column, rnd: random.Random, size: int) -> list:
+    col_type = col.col_type
+    if col_type in TIME_FORMATS:
+        fmt = TIME_FORMATS[col_type]
+        return [time.strftime(fmt, time.gmtime(rnd.randrange(*TIME_RANGE))) for _ in range(size)]
+    if col_type in (PdmColumnType.FLOAT, PdmColumnType.DOUBLE):
+        return [round(rnd.uniform(-1e6, 1e6), 4) for _ in range(size)]
+    if col_type == PdmColumnType.DECIMAL:
+        # 长度视为精度，未指定小数位数时保留2位小数
+        precision = col.col_length if col.col_length is not None else 9
+        scale = min(col.col_scale if col.col_scale is not None else 2, precision)
+        # 精度等于小数位数时整数部分只能为0
+        bound = 10 ** min(precision - scale, 15)
+        if scale == 0:
+            return [str(rnd.randrange(bound)) for _ in range(size)]
+        factor = 10 ** scale
+        return ["%d.%0*d" % (v // factor, scale, v % factor)
+                for v in (rnd.randrange(bound * factor) for _ in range(size))]
+    if col_type in BINARY_TYPES:
+        length = min(col.col_length or MAX_TEXT_LENGTH, MAX_TEXT_LENGTH)
+        return ["%0*x" % (length, rnd.getrandbits(length * 4)) for _ in range(size)]
+    length = min(col.col_length or TEXT_LENGTHS.get(col_type, MAX_TEXT_LENGTH), MAX_TEXT_LENGTH)
+    letters = string.ascii_letters + string.digits
+    if col_type == PdmColumnType.CHAR:
+        return ["".join(rnd.choices(letters, k=length)) for _ in range(size)]
+    return ["".join(rnd.choices(letters, k=rnd.randint(1, length))) for _ in range(size)]
+
+
+def parse_rows(text: str):
+    """
+    :param text: 形如"1000"或"t_user=1000,t_order=5000"
+    :return: 行数或{表编码: 行数}
+    """
+    if "=" not in text:
+        return int(text)
+    rows = {}
+    for item in text.split(","):
+        code, n = item.split("=")
+        rows[code.strip().lower()] = int(n)
+    return rows
+
+
+def main(argv: list = None) -> int:
+    from pdm_parser import parse_pdm
+
+    arg_parser = argparse.ArgumentParser(description="按PDM模型生成测试数据（CSV）")
+    arg_parser.add_argument("path", help="PDM文件路径")
+    arg_parser.add_argument("-o", "--out", required=True, help="输出目录")
+    arg_parser.add_argument("--rows", type=parse_rows, default=1000,
+                            help="每张表的行数，或t_user=1000,t_order=5000（只生成列出的表）")
+    arg_parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    arg_parser.add_argument("--null-ratio", type=float, default=NULL_RATIO, help="可为空字段的空值比例")
+    arg_parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="每批生成的行数")
+    arg_parser.add_argument("-i", "--include", action="append", default=None, help="只处理匹配的表，可重复指定")
+    arg_parser.add_argument("-x", "--exclude", action="append", default=None, help="不处理匹配的表，可重复指定")
+    args = arg_parser.parse_args(argv)
+
+    tables = parse_pdm(args.path, include=args.include, exclude=args.exclude)
+    generator = DataGenerator(tables, args.rows, args.seed, args.null_ratio, args.chunk_rows)
+    generator.write_csv(args.out, log=print)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model import Table, Schema
+from sql_generator import DbType, table_statements
+
+
+class CyclicReferenceError(Exception):
+    """
+    表之间存在循环引用，无法确定建表顺序
+    """
+
+    def __init__(self, tables: list):
+        self.tables = tables
+        Exception.__init__(self, "以下表存在循环引用: %s" % ", ".join(t.code for t in tables))
+
+
+class ConnectionPool:
+    """
+    有界的DB-API连接池：最多创建size个连接，取不到空闲连接时阻塞等待
+    连接在创建它的线程之外使用，sqlite3须以check_same_thread=False创建连接，否则执行时抛出ProgrammingError：
+    ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False))
+    """
+
+    def __init__(self, connect, size: int = 4):
+        """
+        :param connect: 创建连接的无参函数，如 lambda: pymysql.connect(...)
+        :param size: 连接数上限
+        """
+        self.connect = connect
+        self.size = size
+        self.__idle = queue.LifoQueue()
+        self.__created = 0
+        self.__all = []
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self.__idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.__lock:
+            if self.__created < self.size:
+                self.__created += 1
+                create = True
+            else:
+                create = False
+        if not create:
+            return self.__idle.get()
+        try:
+            conn = self.connect()
+        except Exception:
+            with self.__lock:
+                self.__created -= 1
+            raise
+        with self.__lock:
+            self.__all.append(conn)
+        return conn
+
+    def release(self, conn):
+        self.__idle.put(conn)
+
+    def close(self):
+        with self.__lock:
+            connections = self.__all
+            self.__all = []
+            self.__created = 0
+        while True:
+            try:
+                self.__idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class TableResult:
+    def __init__(self, table: Table, level: int):
+        self.table = table
+        self.level = level
+        self.statements = 0
+        # 执行耗时（秒），不含等待连接的时间
+        self.seconds = 0.0
+        # 失败时为错误信息
+        self.error = None
+        # 因主表失败而未执行
+        self.skipped = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ExecutionReport:
+    def __init__(self):
+        self.results = []
+        self.levels = 0
+        self.elapsed = 0.0
+
+    @property
+    def failed(self) -> list:
+        return [r for r in self.results if not r.ok]
+
+    def __str__(self):
+        failed = self.failed
+        return "%d张表, %d个层级, 失败%d张, 耗时%.2fs" % (len(self.results), self.levels, len(failed), self.elapsed)
+
+
+class DdlExecutor:
+    """
+    按依赖层级并行建表：根据Table.refs将表分层（主表所在层级在前），同一层级的表之间没有依赖，
+    在有界连接池上并发执行，一个层级全部完成后才开始下一层级
+    主表建表失败时，其（直接或间接的）子表不再执行，标记为跳过
+
+    executor = DdlExecutor(lambda: pymysql.connect(**config), DbType.MYSQL, workers=8)
+    report = executor.run(tables)
+
+    连接在线程池的工作线程中使用，对connect的要求见ConnectionPool
+    """
+
+    def __init__(self, connect, db_type: DbType = DbType.MYSQL, workers: int = 4, drop: bool = False,
+                 statements=None, allow_cycles: bool = False):
+        """
+        :param connect: 创建DB-API连接的无参函数
+        :param db_type: 数据库类型
+        :param workers: 并发数，同时也是连接数上限
+        :param drop: 是否在建表前删除同名表
+        :param statements: 生成单张表语句列表的函数(table) -> [sql]，默认为sql_generator.table_statements
+        :param allow_cycles: 为False时存在循环引用即抛出CyclicReferenceError；
+                             为True时循环引用中的表作为最后一个层级执行
+        """
+        self.connect = connect
+        self.db_type = db_type
+        self.workers = workers
+        self.drop = drop
+        self.statements = statements
+        self.allow_cycles = allow_cycles
+
+    def plan(self, tables: list) -> list:
+        """
+        :param tables: 表列表或已建立的Schema
+        :return: 按执行顺序排列的层级列表，每个层级为表列表
+        """
+        schema = tables if isinstance(tables, Schema) else Schema(tables)
+        levels = [list(level) for level in schema.levels]
+        if schema.cyclic:
+            if not self.allow_cycles:
+                raise CyclicReferenceError(schema.cyclic)
+            levels.append(list(schema.cyclic))
+        return levels
+
+    def run(self, tables: list, log=None) -> ExecutionReport:
+        """
+        :param tables: 表列表或已建立的Schema
+        :param log: 日志输出函数，每个层级完成后调用
+        :return: ExecutionReport，结果按执行顺序排列
+        """
+        schema = tables if isinstance(tables, Schema) else Schema(tables)
+        levels = self.plan(schema)
+        report = ExecutionReport()
+        report.levels = len(levels)
+        failed_ids = set()
+        pool = ConnectionPool(self.connect, self.workers)
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for i, level in enumerate(levels):
+                    level_start = time.perf_counter()
+                    results = []
+                    futures = []
+                    for table in level:
+                        result = TableResult(table, i)
+                        results.append(result)
+                        failed_parents = [p.code for p in schema.get_parents(table) if p.id in failed_ids]
+                        if failed_parents:
+                            result.skipped = True
+                            result.error = "主表未创建: %s" % ", ".join(failed_parents)
+                        else:
+                            futures.append(executor.submit(self.__execute_table, pool, result))
+                    for future in futures:
+                        future.result()
+                    for result in results:
+                        if not result.ok:
+                            failed_ids.add(result.table.id)
+                    report.results.extend(results)
+                    if log is not None:
+                        log("层级%d: %d张表, 失败%d张, 耗时%.2fs" % (
+                            i, len(results), sum(1 for r in results if not r.ok), time.perf_counter() - level_start))
+        finally:
+            pool.close()
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def __execute_table(self, pool: ConnectionPool, result: TableResult):
+        try:
+            if self.statements is not None:
+                statements = self.statements(result.table)
+            else:
+                statements = table_statements(result.table, self.db_type, self.drop)
+        except Exception as e:
+            result.error = "%s: %s" % (type(e).__name__, e)
+            return
+        result.statements = len(statements)
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            result.error = "%s: %s" % (type(e).__name__, e)
+            return
+        start = time.perf_counter()
+        try:
+            cursor = conn.cursor()
+            try:
+                for sql in statements:
+                    cursor.execute(sql)
+            finally:
+                cursor.close()
+            conn.commit()
+        except Exception as e:
+            result.error = "%s: %s" % (type(e).__name__, e)
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+        finally:
+            result.seconds = time.perf_counter() - start
+            pool.release(conn)
@@ -0,0 +1,252 @@
+import functools
+import unicodedata
+from xml.sax.saxutils import escape
+
+from model import Table, Column, Schema
+
+
+def get_column_type_text(col: Column) -> str:
+    text = "?" if col.col_type is None else col.col_type._name_
+    if col.col_length is not None:
+        if col.col_scale is not None:
+            text += "(%d,%d)" % (col.col_length, col.col_scale)
+        else:
+            text += "(" + str(col.col_length) + ")"
+    return text
+
+
+class FixedFontMetrics:
+    """
+    不依赖显示环境的近似字体度量：按字符宽度估算，全角字符（中文等）按两倍宽度计算
+    可替换为任何提供font_size属性与text_size(text)方法的对象
+    """
+
+    def __init__(self, font_size: int = 15, char_width: float = None, line_height: int = None,
+                 family: str = "monospace"):
+        self.font_size = font_size
+        self.char_width = font_size * 0.6 if char_width is None else char_width
+        self.line_height = int(font_size * 1.3) if line_height is None else line_height
+        self.family = family
+        self.text_size = functools.lru_cache(maxsize=65536)(self.__text_size)
+
+    def __text_size(self, text: str) -> tuple:
+        units = 0
+        for ch in text:
+            units += 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+        return int(units * self.char_width + 0.5), self.line_height
+
+
+class TableBox:
+    """
+    一张表在ER图中的方框，尺寸计算与visual.TableRect一致
+    """
+
+    def __init__(self, table: Table, metrics, padding: int = 3, line_width: int = 1):
+        self.table = table
+        self.x = 0
+        self.y = 0
+        self.padding = padding
+        self.line_width = line_width
+        self.font_size = metrics.font_size
+        self.type_texts = [get_column_type_text(col) for col in table.columns]
+        self.title_width = metrics.text_size(table.name or table.code)[0]
+        self.name_width = max([metrics.text_size(col.name)[0] for col in table.columns], default=0)
+        self.type_width = max([metrics.text_size(text)[0] for text in self.type_texts], default=0)
+
+        width = self.title_width + 2 * padding
+        height = self.font_size + padding * 2
+        if len(table.columns) == 0:
+            height += padding * 2
+        else:
+            height += padding + self.font_size * len(table.columns) + padding + line_width
+            width = max(width, padding * 3 + self.name_width + self.type_width)
+        self.width = width
+        self.height = height
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bottom(self):
+        return self.y + self.height
+
+    @property
+    def center(self):
+        return self.x + self.width / 2, self.y + self.height / 2
+
+
+class SpatialGrid:
+    """
+    均匀网格空间索引，按矩形区域查询相交的方框
+    """
+
+    def __init__(self, cell_size: int = 512):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def insert(self, box: TableBox):
+        for key in self.__cells(box.x, box.y, box.right, box.bottom):
+            self.cells.setdefault(key, []).append(box)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> list:
+        """
+        :return: 与矩形(x0, y0)-(x1, y1)相交的方框
+        """
+        found = {}
+        for key in self.__cells(x0, y0, x1, y1):
+            for box in self.cells.get(key, ()):
+                if box.x <= x1 and box.right >= x0 and box.y <= y1 and box.bottom >= y0:
+                    found[id(box)] = box
+        return list(found.values())
+
+    def __cells(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for cx in range(int(x0 // size), int(x1 // size) + 1):
+            for cy in range(int(y0 // size), int(y1 // size) + 1):
+                yield cx, cy
+
+
+class Layout:
+    def __init__(self, boxes: list, width: int, height: int, grid: SpatialGrid, metrics=None):
+        self.boxes = boxes
+        self.box_by_id = {box.table.id: box for box in boxes}
+        self.width = width
+        self.height = height
+        self.grid = grid
+        # 布局时使用的字体度量，导出时须使用同一度量，文字才能与方框尺寸一致
+        self.metrics = metrics
+
+    def visible(self, x0: float, y0: float, x1: float, y1: float) -> list:
+        return self.grid.query(x0, y0, x1, y1)
+
+    def edges(self) -> list:
+        """
+        :return: [(子表方框, 主表方框)]
+        """
+        result = []
+        for box in self.boxes:
+            for parent in box.table.refs:
+                parent_box = self.box_by_id.get(parent.id)
+                if parent_box is not None and parent_box is not box:
+                    result.append((box, parent_box))
+        return result
+
+
+def layout_tables(tables: list, metrics=None, max_width: int = 4096, spacing: int = 20,
+                  padding: int = 3, line_width: int = 1, cell_size: int = 512) -> Layout:
+    """
+    分层布局：按关联(Table.refs)将表分为依赖层级，主表在上、子表在下；
+    同一层内按主表位置的重心排序，使有关联的表彼此靠近；没有任何关联的表放在最后
+    每一层从左到右排列，超过max_width时换行
+    :param tables: 表列表
+    :param metrics: 字体度量，默认为FixedFontMetrics()
+    :param max_width: 布局的最大宽度
+    :param spacing: 方框间距
+    :param cell_size: 空间索引的网格大小
+    :return: Layout
+    """
+    if metrics is None:
+        metrics = FixedFontMetrics()
+    schema = Schema(tables)
+    boxes = {t.id: TableBox(t, metrics, padding, line_width) for t in tables}
+
+    layers = []
+    isolated = []
+    for i, level in enumerate(schema.levels):
+        layer = []
+        for t in level:
+            if i == 0 and not schema.children[t.id]:
+                isolated.append(t)
+            else:
+                layer.append(t)
+        if layer:
+            layers.append(layer)
+    if schema.cyclic:
+        layers.append(schema.cyclic)
+    if isolated:
+        layers.append(isolated)
+
+    # 横向次序：第一层按子表数量降序，之后各层按主表次序的重心排序
+    order = {}
+    for i, layer in enumerate(layers):
+        if i == 0:
+            layer.sort(key=lambda t: -len(schema.children[t.id]))
+        else:
+            layer.sort(key=lambda t: __barycenter(schema.parents[t.id], order))
+        for j, t in enumerate(layer):
+            order.setdefault(t.id, j)
+
+    grid = SpatialGrid(cell_size)
+    placed = []
+    y = spacing
+    width = 0
+    for layer in layers:
+        x = spacing
+        row_height = 0
+        for t in layer:
+            box = boxes[t.id]
+            if x > spacing and x + box.width > max_width:
+                x = spacing
+                y += row_height + spacing
+                row_height = 0
+            box.x, box.y = x, y
+            x += box.width + spacing
+            row_height = max(row_height, box.height)
+            width = max(width, box.right)
+            grid.insert(box)
+            placed.append(box)
+        # 层与层之间留出连线空间
+        y += row_height + spacing * 3
+    return Layout(placed, width + spacing, y, grid, metrics)
+
+
+def __barycenter(parents: list, order: dict) -> float:
+    positions = [order[p.id] for p in parents if p.id in order]
+    if not positions:
+        return float("inf")
+    return sum(positions) / len(positions)
+
+
+def write_svg(layout: Layout, out, metrics=None, font_family: str = None):
+    """
+    将布局导出为SVG
+    :param layout: layout_tables的结果
+    :param out: 可写的文本文件对象
+    :param metrics: 字体度量，默认为布局时使用的度量(Layout.metrics)
+    :param font_family: 字体
+    """
+    if metrics is None:
+        metrics = layout.metrics if layout.metrics is not None else FixedFontMetrics()
+    if font_family is None:
+        font_family = getattr(metrics, "family", "monospace")
+    font_size = metrics.font_size
+    write = out.write
+    write('<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" font-family="%s" font-size="%d">\n' % (
+        layout.width, layout.height, escape(font_family, {'"': "&quot;"}), font_size))
+
+    write('<g stroke="#888888" fill="none">\n')
+    for child, parent in layout.edges():
+        x1, y1 = child.center
+        x2, y2 = parent.center
+        write('<line x1="%.1f" y1="%.1f" x2="%.1f" y2="%.1f"/>\n' % (x1, y1, x2, y2))
+    write('</g>\n')
+
+    for box in layout.boxes:
+        p = box.padding
+        write('<g>\n')
+        write('<rect x="%d" y="%d" width="%d" height="%d" fill="white" stroke="black"/>\n' % (
+            box.x, box.y, box.width, box.height))
+        write('<text x="%.1f" y="%.1f" text-anchor="middle" dominant-baseline="middle">%s</text>\n' % (
+            box.x + box.width / 2, box.y + font_size / 2 + p, escape(box.table.name or box.table.code)))
+        split_y = box.y + font_size + p * 2
+        write('<line x1="%d" y1="%d" x2="%d" y2="%d" stroke="black"/>\n' % (box.x, split_y, box.right, split_y))
+        sy = split_y + p
+        name_x = box.x + p
+        type_x = name_x + box.name_width + p
+        for col, type_text in zip(box.table.columns, box.type_texts):
+            write('<text x="%d" y="%d" dominant-baseline="hanging">%s</text>' % (name_x, sy, escape(col.name)))
+            write('<text x="%d" y="%d" dominant-baseline="hanging">%s</text>\n' % (type_x, sy, escape(type_text)))
+            sy += font_size
+        write('</g>\n')
+    write('</svg>\n')
@@ -1,7 +1,12 @@
-from enum import Enum
+import functools
+import gc
+import hashlib
+import re
+import sys
+from enum import IntEnum
 
 
-class PdmColumnType(Enum):
+class PdmColumnType(IntEnum):
     """
     数据类型
     """
@@ -38,6 +43,8 @@ class PdmColumnType(Enum):
 
 
 class Table:
+    __slots__ = ("id", "name", "code", "comment", "columns", "refs", "joins", "fingerprint", "__weakref__")
+
     def __init__(self, id: int = None, name: str = None, code: str = None, comment: str = None, refs=None):
         if refs is None:
             refs = []
@@ -48,21 +55,287 @@ class Table:
         self.columns = []
         # 关联主表
         self.refs = refs
+        # 关联中的外键字段对：[(主表, 本表字段, 主表字段)]
+        self.joins = []
+        # 内容指纹，由table_fingerprint计算后缓存；修改表或字段后须置为None
+        self.fingerprint = None
 
     def __str__(self):
-        return str(self.__dict__)
+        return str({k: getattr(self, k) for k in Table.__slots__[:-1]})
 
 
 class Column:
+    __slots__ = ("name", "code", "col_type", "col_length", "pk", "not_null", "comment", "col_scale")
+
     def __init__(self, name: str = None, code: str = None, col_type: PdmColumnType = None, col_length: int = None,
-                 pk: bool = False, not_null: bool = False, comment: str = None):
+                 pk: bool = False, not_null: bool = False, comment: str = None, col_scale: int = None):
         self.name = name
         self.code = code
         self.col_type = col_type
+        # 长度；数值类型为精度（总位数）
         self.col_length = col_length
         self.pk = pk
         self.not_null = not_null
         self.comment = comment
+        # 小数位数，如decimal(18,4)中的4
+        self.col_scale = col_scale
 
     def __str__(self):
-        return str(self.__dict__)
+        return str({k: getattr(self, k) for k in Column.__slots__})
+
+
+class Schema:
+    """
+    带索引的表集合：按id/编码O(1)查找表与字段，维护双向关联并预先计算拓扑序
+    编码查找不区分大小写
+    """
+
+    def __init__(self, tables: list):
+        self.tables = tables
+        self.table_by_id = {}
+        self.table_by_code = {}
+        # 字段编码 -> [(表, 字段)]，用于跨表查找同名字段
+        self.columns_by_code = {}
+        # 表id -> {字段编码: 字段}
+        self.table_columns = {}
+        # 表id -> 主表列表 / 子表列表（均已去重，不含自关联）
+        self.parents = {}
+        self.children = {}
+        # 主表在前的拓扑序，以及按依赖层级分组的结果（同一层级之间没有依赖）
+        self.topological_order = []
+        self.levels = []
+        # 处于循环引用中、无法排序的表
+        self.cyclic = []
+
+        for t in tables:
+            self.table_by_id[t.id] = t
+            self.table_by_code[t.code.lower()] = t
+            self.parents[t.id] = []
+            self.children[t.id] = []
+            col_map = {}
+            for c in t.columns:
+                if c.code is None:
+                    continue
+                code = c.code.lower()
+                col_map[code] = c
+                self.columns_by_code.setdefault(code, []).append((t, c))
+            self.table_columns[t.id] = col_map
+        for t in tables:
+            seen = set()
+            for parent in t.refs:
+                if parent is t or parent.id in seen or parent.id not in self.table_by_id:
+                    continue
+                seen.add(parent.id)
+                self.parents[t.id].append(parent)
+                self.children[parent.id].append(t)
+        self.__sort()
+
+    def __len__(self):
+        return len(self.tables)
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def get_table(self, code: str):
+        """
+        按编码查找表，不存在时返回None
+        """
+        return self.table_by_code.get(code.lower())
+
+    def get_table_by_id(self, id: str):
+        """
+        按PDM对象id查找表，不存在时返回None
+        """
+        return self.table_by_id.get(id)
+
+    def get_column(self, table_code: str, column_code: str):
+        """
+        按表编码与字段编码查找字段，不存在时返回None
+        """
+        t = self.get_table(table_code)
+        if t is None:
+            return None
+        return self.table_columns[t.id].get(column_code.lower())
+
+    def find_columns(self, column_code: str) -> list:
+        """
+        查找所有包含该字段编码的表
+        :return: [(表, 字段)]
+        """
+        return self.columns_by_code.get(column_code.lower(), [])
+
+    def get_parents(self, table: Table) -> list:
+        return self.parents[table.id]
+
+    def get_children(self, table: Table) -> list:
+        return self.children[table.id]
+
+    def __sort(self):
+        # Kahn算法，逐层剥离入度为0的表
+        in_degree = {t.id: len(self.parents[t.id]) for t in self.tables}
+        level = [t for t in self.tables if in_degree[t.id] == 0]
+        while level:
+            self.levels.append(level)
+            self.topological_order.extend(level)
+            next_level = []
+            for t in level:
+                for child in self.children[t.id]:
+                    in_degree[child.id] -= 1
+                    if in_degree[child.id] == 0:
+                        next_level.append(child)
+            level = next_level
+        self.cyclic = [t for t in self.tables if in_degree[t.id] > 0]
+
+
+def intern_str(s: str):
+    """
+    驻留重复出现的短字符串（编码、名称），相同内容只保留一份
+    """
+    return None if s is None else sys.intern(s)
+
+
+def parse_length(s: str):
+    """
+    将PDM中的长度文本转为int，无法识别时返回None
+    """
+    if s is None:
+        return None
+    try:
+        return int(s.strip())
+    except ValueError:
+        return None
+
+
+# PdmColumnType未直接定义、但在PDM中常见的类型名（各数据库的DBMS定义） -> PdmColumnType
+DATA_TYPE_ALIASES = {
+    "BIT": PdmColumnType.TINYINT,
+    "BOOL": PdmColumnType.TINYINT,
+    "BOOLEAN": PdmColumnType.TINYINT,
+    "SERIAL": PdmColumnType.BIGINT,
+    "BIGSERIAL": PdmColumnType.BIGINT,
+    "REAL": PdmColumnType.FLOAT,
+    "DOUBLE PRECISION": PdmColumnType.DOUBLE,
+    "MONEY": PdmColumnType.DECIMAL,
+    "DATETIME2": PdmColumnType.DATETIME,
+    "TIMESTAMP WITH TIME ZONE": PdmColumnType.TIMESTAMP,
+    "TIMESTAMP WITH LOCAL TIME ZONE": PdmColumnType.TIMESTAMP,
+    "TIMESTAMP WITHOUT TIME ZONE": PdmColumnType.TIMESTAMP,
+    "SMALLDATETIME": PdmColumnType.DATETIME,
+    "NCHAR": PdmColumnType.CHAR,
+    "CHARACTER": PdmColumnType.CHAR,
+    "NVARCHAR": PdmColumnType.VARCHAR,
+    "VARCHAR2": PdmColumnType.VARCHAR,
+    "NVARCHAR2": PdmColumnType.VARCHAR,
+    "CHARACTER VARYING": PdmColumnType.VARCHAR,
+    "LONG VARCHAR": PdmColumnType.TEXT,
+    "NTEXT": PdmColumnType.TEXT,
+    "CLOB": PdmColumnType.LONGTEXT,
+    "NCLOB": PdmColumnType.LONGTEXT,
+    "BINARY": PdmColumnType.BLOB,
+    "VARBINARY": PdmColumnType.BLOB,
+    "RAW": PdmColumnType.BLOB,
+    "IMAGE": PdmColumnType.LONGBLOB,
+}
+# 类型名中不影响类型映射的修饰词
+DATA_TYPE_MODIFIERS = frozenset(["UNSIGNED", "SIGNED", "ZEROFILL"])
+DATA_TYPE_PATTERN = re.compile(r"^([^(]*)(?:\(([^)]*)\))?(.*)$", re.S)
+
+
+@functools.lru_cache(maxsize=4096)
+def resolve_data_type(data_type: str) -> tuple:
+    """
+    解析PDM中的DataType文本，如"varchar(64)"、"decimal(18,4)"、"int unsigned"、"nvarchar(max)"
+    不同的DataType文本很少而字段很多，解析结果按文本缓存
+    :param data_type: DataType文本
+    :return: (PdmColumnType, 长度或精度, 小数位数)，无法识别的类型为None，未指定的长度、小数位数为None
+    """
+    base, args, tail = DATA_TYPE_PATTERN.match(data_type.strip()).groups()
+    words = [w for w in (base + " " + tail).upper().split() if w not in DATA_TYPE_MODIFIERS]
+    name = " ".join(words)
+    col_type = PdmColumnType.__members__.get(name)
+    if col_type is None:
+        col_type = DATA_TYPE_ALIASES.get(name)
+    length = scale = None
+    if args is not None:
+        # 形如"64"、"18,4"、"64 char"；"max"等非数字参数视为未指定
+        numbers = [re.match(r"\s*(\d+)", a) for a in args.split(",")]
+        if numbers and numbers[0] is not None:
+            length = int(numbers[0].group(1))
+        if len(numbers) > 1 and numbers[1] is not None:
+            scale = int(numbers[1].group(1))
+    return col_type, length, scale
+
+
+def column_fingerprint(col: Column) -> str:
+    """
+    字段内容指纹（blake2b），与进程无关，可以持久化后比较
+    """
+    return hashlib.blake2b(__column_key(col), digest_size=16).hexdigest()
+
+
+def table_fingerprint(table: Table) -> str:
+    """
+    表内容指纹（blake2b），覆盖表的名称、注释以及全部字段（含字段顺序）
+    第一次计算后缓存在Table.fingerprint中，随pack_tables保存，再次比较时不再遍历字段
+    """
+    if table.fingerprint is None:
+        h = hashlib.blake2b(repr((table.code, table.name, table.comment)).encode("utf-8"), digest_size=16)
+        for col in table.columns:
+            h.update(__column_key(col))
+        table.fingerprint = h.hexdigest()
+    return table.fingerprint
+
+
+def __column_key(col: Column) -> bytes:
+    # 只含字符串、整数、布尔与None的元组，repr结果与进程、哈希种子无关
+    return repr((col.code, col.name, None if col.col_type is None else int(col.col_type), col.col_length,
+                 col.col_scale, bool(col.pk), bool(col.not_null), col.comment)).encode("utf-8")
+
+
+def pack_tables(tables: list) -> list:
+    """
+    将表列表转为只含基础类型的紧凑记录，便于pickle落盘或跨进程传输：
+    表与字段都保存为tuple，字段类型保存为整数值，Table.refs保存为下标，
+    既避免逐个反序列化枚举对象，也避免深层引用链导致pickle递归过深
+    :param tables: 表列表
+    :return: 记录列表
+    """
+    index = {id(t): i for i, t in enumerate(tables)}
+    records = []
+    for t in tables:
+        columns = [(c.name, c.code, None if c.col_type is None else int(c.col_type), c.col_length,
+                    c.pk, c.not_null, c.comment, c.col_scale) for c in t.columns]
+        refs = [index[id(r)] for r in t.refs if id(r) in index]
+        # 外键字段对保存为(主表下标, 本表字段下标, 主表字段下标)
+        joins = [(index[id(parent)], t.columns.index(column), parent.columns.index(parent_column))
+                 for parent, column, parent_column in t.joins if id(parent) in index]
+        records.append((t.id, t.name, t.code, t.comment, columns, refs, t.fingerprint, joins))
+    return records
+
+
+def unpack_tables(records: list) -> list:
+    """
+    由pack_tables的记录还原表列表
+    :param records: 记录列表
+    :return: 表列表
+    """
+    # 批量创建对象期间暂停循环垃圾回收，避免反复触发全量扫描
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        col_types = {int(v): v for v in PdmColumnType}
+        tables = []
+        for id, name, code, comment, columns, refs, fingerprint, joins in records:
+            t = Table(id, intern_str(name), intern_str(code), comment, refs)
+            t.fingerprint = fingerprint
+            t.joins = joins
+            t.columns = [Column(intern_str(c[0]), intern_str(c[1]), None if c[2] is None else col_types[c[2]],
+                                c[3], c[4], c[5], c[6], c[7]) for c in columns]
+            tables.append(t)
+        for t in tables:
+            t.refs = [tables[i] for i in t.refs]
+            t.joins = [(tables[i], t.columns[c], tables[i].columns[pc]) for i, c, pc in t.joins]
+        return tables
+    finally:
+        if gc_enabled:
+            gc.enable()
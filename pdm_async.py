@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+from model import pack_tables, unpack_tables
+from pdm_parser import PdmIncrementalParser, parse_pdm
+
+
+async def parse_pdm_async(pdm_path, executor=None, include=None, exclude=None) -> list:
+    """
+    在执行器中解析PDM，不阻塞事件循环
+    解析是CPU密集型任务，多个解析需要真正并行时传入ProcessPoolExecutor，子进程以紧凑记录(pack_tables)回传结果；
+    此时pdm_path须为路径或bytes等可pickle的对象
+    :param pdm_path: 同parse_pdm
+    :param executor: 执行器，默认为事件循环的线程池
+    :param include: 只解析匹配的表，同parse_pdm
+    :param exclude: 不解析匹配的表，同parse_pdm
+    :return: 表列表
+    """
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor):
+        records = await loop.run_in_executor(executor, _parse_records, pdm_path, include, exclude)
+        return unpack_tables(records)
+    return await loop.run_in_executor(executor, functools.partial(parse_pdm, pdm_path, include=include,
+                                                                  exclude=exclude))
+
+
+def _parse_records(pdm_path, include, exclude) -> tuple:
+    return pack_tables(parse_pdm(pdm_path, include=include, exclude=exclude))
+
+
+class AsyncPdmParser:
+    """
+    PdmIncrementalParser的异步包装：每块数据在执行器中解析，数据到达与解析交替进行，事件循环不被阻塞
+    同一个解析器的feed需要依次await
+
+    parser = AsyncPdmParser()
+    async for data in request.content.iter_chunked(65536):
+        await parser.feed(data)
+    tables = await parser.close()
+    """
+
+    def __init__(self, executor=None, include=None, exclude=None):
+        """
+        :param executor: 线程执行器，默认为事件循环的线程池（解析器状态不能跨进程，不能使用进程池）
+        :param include: 只解析匹配的表，同parse_pdm
+        :param exclude: 不解析匹配的表，同parse_pdm
+        """
+        self.executor = executor
+        self.parser = PdmIncrementalParser(include, exclude)
+
+    async def feed(self, data):
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.parser.feed, data)
+
+    async def close(self) -> list:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.parser.close)
+
+
+async def parse_stream_async(chunks, executor=None, include=None, exclude=None) -> list:
+    """
+    边接收边解析
+    :param chunks: 数据块的异步迭代器（或普通可迭代对象）
+    :param executor: 线程执行器，同AsyncPdmParser
+    :return: 表列表
+    """
+    parser = AsyncPdmParser(executor, include, exclude)
+    if hasattr(chunks, "__aiter__"):
+        async for data in chunks:
+            await parser.feed(data)
+    else:
+        for data in chunks:
+            await parser.feed(data)
+    return await parser.close()
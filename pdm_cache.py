@@ -0,0 +1,184 @@
+import hashlib
+import os
+import pickle
+
+from model import pack_tables, unpack_tables, table_fingerprint
+from pdm_parser import parse_pdm, PARSER_VERSION
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdm_parser")
+# 缓存目录默认容量上限（字节）
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+
+ENTRY_SUFFIX = ".pickle"
+STAT_SUFFIX = ".stat"
+
+
+def parse_pdm_cached(pdm_path: str, cache_dir: str = None, max_size: int = DEFAULT_MAX_SIZE) -> list:
+    """
+    带磁盘缓存的parse_pdm
+    缓存以文件内容哈希+解析器版本为键，文件内容变化后自动重新解析；
+    同时记录路径、大小、修改时间到内容哈希的映射，文件未变动时无需重新计算哈希
+    命中缓存时省去的是XML解析，仍须反序列化并构造全部Table/Column，3000张表约需0.2s，而不是毫秒级
+    :param pdm_path: PDM文件路径
+    :param cache_dir: 缓存目录，默认为~/.cache/pdm_parser
+    :param max_size: 缓存目录容量上限（字节），超出后按最近最少使用淘汰
+    :return: 表列表
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    stat_path = os.path.join(cache_dir, __stat_key(pdm_path) + STAT_SUFFIX)
+    key = __read_text(stat_path)
+    if key is not None:
+        tables = __load_entry(cache_dir, key)
+        if tables is not None:
+            return tables
+
+    key = content_key(pdm_path)
+    tables = __load_entry(cache_dir, key)
+    if tables is None:
+        tables = parse_pdm(pdm_path)
+        # 指纹随缓存保存，命中缓存的表比较内容时无需再遍历字段
+        for table in tables:
+            table_fingerprint(table)
+        __write_atomic(os.path.join(cache_dir, key + ENTRY_SUFFIX), dump_tables(tables))
+        evict(cache_dir, max_size)
+    __write_atomic(stat_path, key.encode("ascii"))
+    return tables
+
+
+def content_key(pdm_path: str) -> str:
+    """
+    计算缓存键：文件内容哈希 + 解析器版本
+    :param pdm_path: PDM文件路径
+    :return: 缓存键
+    """
+    h = hashlib.blake2b(digest_size=20)
+    with open(pdm_path, "rb") as f:
+        while True:
+            data = f.read(HASH_CHUNK_SIZE)
+            if not data:
+                break
+            h.update(data)
+    return "%s-v%d" % (h.hexdigest(), PARSER_VERSION)
+
+
+def dump_tables(tables: list) -> bytes:
+    """
+    将表列表序列化为二进制
+    :param tables: 表列表
+    :return: 序列化结果
+    """
+    return pickle.dumps((PARSER_VERSION, pack_tables(tables)), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_tables(data: bytes) -> list:
+    """
+    反序列化dump_tables的结果
+    :param data: 序列化结果
+    :return: 表列表，版本不匹配时返回None
+    """
+    version, records = pickle.loads(data)
+    if version != PARSER_VERSION:
+        return None
+    return unpack_tables(records)
+
+
+def evict(cache_dir: str = None, max_size: int = DEFAULT_MAX_SIZE):
+    """
+    按最近使用时间淘汰缓存，直到总大小不超过max_size
+    .stat记录随其指向的缓存项一起计入大小、一起删除；指向的缓存项已不存在的.stat记录直接删除
+    :param cache_dir: 缓存目录
+    :param max_size: 容量上限（字节）
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    # 缓存键 -> [修改时间, 总大小, 文件路径列表]
+    entries = {}
+    stats = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(ENTRY_SUFFIX):
+            st = entry.stat()
+            item = entries.setdefault(entry.name[:-len(ENTRY_SUFFIX)], [0, 0, []])
+            item[0] = st.st_mtime
+            item[1] += st.st_size
+            item[2].append(entry.path)
+        elif entry.name.endswith(STAT_SUFFIX):
+            stats.append(entry)
+    for entry in stats:
+        item = entries.get(__read_text(entry.path))
+        if item is None:
+            __remove(entry.path)
+            continue
+        item[1] += entry.stat().st_size
+        item[2].append(entry.path)
+    total = sum(item[1] for item in entries.values())
+    for _, size, paths in sorted(entries.values(), key=lambda item: item[0]):
+        if total <= max_size:
+            break
+        for path in paths:
+            __remove(path)
+        total -= size
+
+
+def clear_cache(cache_dir: str = None):
+    """
+    清空缓存目录
+    :param cache_dir: 缓存目录
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(ENTRY_SUFFIX) or entry.name.endswith(STAT_SUFFIX):
+            __remove(entry.path)
+
+
+def __stat_key(pdm_path: str) -> str:
+    st = os.stat(pdm_path)
+    raw = "%s|%d|%d|%d" % (os.path.abspath(pdm_path), st.st_size, st.st_mtime_ns, PARSER_VERSION)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def __load_entry(cache_dir: str, key: str):
+    path = os.path.join(cache_dir, key + ENTRY_SUFFIX)
+    try:
+        with open(path, "rb") as f:
+            tables = load_tables(f.read())
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # 缓存损坏，丢弃后重新解析
+        __remove(path)
+        return None
+    if tables is not None:
+        # 刷新修改时间，作为LRU淘汰依据
+        os.utime(path)
+    return tables
+
+
+def __read_text(path: str):
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            return f.read().strip()
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+
+
+def __write_atomic(path: str, data: bytes):
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def __remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
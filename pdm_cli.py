@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import sys
+
+# 各子命令只在执行时才导入对应的模块：生成SQL不需要加载进程池、布局与Tk，
+# 无图形界面的环境中也可以使用除render --gui以外的全部命令
+
+
+def cmd_parse(args) -> int:
+    from pdm_parser import parse_pdm, parse_pdm_many
+
+    if len(args.paths) == 1:
+        # 单个文件直接在当前进程解析，省去启动进程池的开销
+        path = args.paths[0]
+        try:
+            results = [(path, parse_pdm(path, include=args.include, exclude=args.exclude), None)]
+        except Exception as e:
+            results = [(path, None, "%s: %s" % (type(e).__name__, e))]
+    else:
+        results = parse_pdm_many(args.paths, args.workers, args.include, args.exclude)
+    failed = 0
+    for path, tables, error in results:
+        if error is not None:
+            failed += 1
+            print("%s\t解析失败: %s" % (path, error), file=sys.stderr)
+            continue
+        print("%s\t%d张表" % (path, len(tables)))
+        if args.verbose:
+            for table in tables:
+                print("\t%s\t%s\t%d个字段" % (table.code, table.name, len(table.columns)))
+    return 1 if failed else 0
+
+
+def cmd_sql(args) -> int:
+    from pdm_parser import iter_pdm_tables
+    from sql_generator import DbType, write_sql
+
+    with open_output(args.out) as out:
+        try:
+            failed = write_sql(iter_pdm_tables(args.path, include=args.include, exclude=args.exclude),
+                               DbType[args.db], out, args.skip_errors)
+        except Exception as e:
+            print("%s\t%s" % (args.path, e), file=sys.stderr)
+            return 1
+    for code in failed:
+        print("%s\t建表语句生成失败，已跳过" % code, file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_pymodel(args) -> int:
+    from pdm_parser import iter_pdm_tables
+    from pymodel import write_pymodel
+
+    with open_output(args.out) as out:
+        write_pymodel(iter_pdm_tables(args.path, include=args.include, exclude=args.exclude), out,
+                      args.prefix, args.ignore, args.slots)
+    return 0
+
+
+def cmd_render(args) -> int:
+    if args.gui:
+        import visual
+        return visual.main([args.path])
+
+    from er_layout import layout_tables, write_svg
+    from pdm_parser import parse_pdm
+
+    tables = parse_pdm(args.path, include=args.include, exclude=args.exclude)
+    layout = layout_tables(tables, max_width=args.width)
+    with open_output(args.out) as out:
+        write_svg(layout, out)
+    return 0
+
+
+def cmd_search(args) -> int:
+    from pdm_search import open_index, print_hits
+
+    index = open_index(args.index, args.paths, args.include, args.exclude)
+    columns = True if args.columns else False if args.tables else None
+    print_hits(index.search(args.query, args.limit, args.prefix, args.fuzzy, columns))
+    return 0
+
+
+def open_output(path: str = None):
+    """
+    打开输出文件，未指定或为"-"时输出到标准输出（退出时不关闭标准输出）
+    """
+    if path is None or path == "-":
+        return contextlib.nullcontext(sys.stdout)
+    return open(path, "w", encoding="utf-8")
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(prog="pdm", description="PDM文件工具")
+    subparsers = arg_parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    def add_filter_args(p):
+        p.add_argument("-i", "--include", action="append", default=None,
+                       help="只处理匹配的表：表编码、glob或pkg:包，可重复指定")
+        p.add_argument("-x", "--exclude", action="append", default=None, help="不处理匹配的表，可重复指定")
+
+    p = subparsers.add_parser("parse", help="解析PDM文件并输出表数量")
+    p.add_argument("paths", nargs="+", help="PDM文件路径")
+    p.add_argument("-j", "--workers", type=int, default=None, help="多个文件时的并行进程数，默认为CPU核数")
+    p.add_argument("-v", "--verbose", action="store_true", help="列出每张表")
+    add_filter_args(p)
+    p.set_defaults(func=cmd_parse)
+
+    # DbType的取值固定，此处直接列出，避免为生成帮助信息而导入sql_generator
+    p = subparsers.add_parser("sql", help="生成建表语句")
+    p.add_argument("path", help="PDM文件路径")
+    p.add_argument("--db", default="MYSQL", choices=["MYSQL", "ORACLE", "SQLSERVER", "H2"], help="数据库类型")
+    p.add_argument("--skip-errors", action="store_true", help="跳过生成失败的表（写入注释，仍返回非0）")
+    p.add_argument("-o", "--out", default=None, help="输出文件，默认输出到标准输出")
+    add_filter_args(p)
+    p.set_defaults(func=cmd_sql)
+
+    p = subparsers.add_parser("pymodel", help="生成Python模型类")
+    p.add_argument("path", help="PDM文件路径")
+    p.add_argument("--prefix", default=None, help="表前缀（不加入到类名中）")
+    p.add_argument("--ignore", action="append", default=None, help="不生成到模型类中的字段，可重复指定")
+    p.add_argument("--slots", action="store_true", help="生成__slots__模型类")
+    p.add_argument("-o", "--out", default=None, help="输出文件，默认输出到标准输出")
+    add_filter_args(p)
+    p.set_defaults(func=cmd_pymodel)
+
+    p = subparsers.add_parser("render", help="导出ER图SVG，或使用--gui在窗口中查看")
+    p.add_argument("path", help="PDM文件路径")
+    p.add_argument("-o", "--out", default=None, help="SVG输出文件，默认输出到标准输出")
+    p.add_argument("--width", type=int, default=4096, help="ER图布局的最大宽度")
+    p.add_argument("--gui", action="store_true", help="打开Tk窗口（需要图形界面）")
+    add_filter_args(p)
+    p.set_defaults(func=cmd_render)
+
+    p = subparsers.add_parser("search", help="在多个PDM文件中搜索表与字段")
+    p.add_argument("query", help="查询文本，编码按下划线与驼峰拆分，中文按二字组匹配")
+    p.add_argument("paths", nargs="*", help="PDM文件路径")
+    p.add_argument("--index", default=None, help="索引文件：存在时读取并只重新索引有变化的文件")
+    p.add_argument("--prefix", action="store_true", help="前缀匹配")
+    p.add_argument("--fuzzy", action="store_true", help="模糊匹配（编辑距离为1）")
+    p.add_argument("--limit", type=int, default=20, help="最多输出的结果数")
+    kind = p.add_mutually_exclusive_group()
+    kind.add_argument("--columns", action="store_true", help="只输出字段")
+    kind.add_argument("--tables", action="store_true", help="只输出表")
+    add_filter_args(p)
+    p.set_defaults(func=cmd_search)
+    return arg_parser
+
+
+def main(argv: list = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # 输出被管道截断（如 pdm sql x.pdm | head）
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
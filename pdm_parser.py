@@ -1,12 +1,120 @@
+import argparse
+import fnmatch
+import os
+import re
+import sys
+import time
+import weakref
+import xml.parsers.expat
 import xml.sax
-from model import Table, Column, PdmColumnType
+
+from pdm_source import PdmSource, GzipDecoder, SOURCE_CHUNK_SIZE, GZIP_MAGIC
+from model import Table, Column, Schema, pack_tables, unpack_tables, intern_str, parse_length, resolve_data_type
+
+# 解析结果格式版本，解析逻辑或模型结构变化时递增，用于使缓存失效
+PARSER_VERSION = 6
+
+# 流式解析时每次读取的字节数
+READ_CHUNK_SIZE = 64 * 1024
+# expat合并文本节点的缓冲区大小
+EXPAT_BUFFER_SIZE = 64 * 1024
+
+# 需要采集文本内容的属性元素 -> 字段名
+ATTR_TAGS = {
+    "a:Name": "name",
+    "a:Code": "code",
+    "a:DataType": "col_type",
+    "a:Length": "length",
+    # PowerDesigner中的Precision即小数位数
+    "a:Precision": "precision",
+    "a:Comment": "comment",
+    "a:Column.Mandatory": "mandatory",
+}
+
+# 与表结构无关的子树（图形、符号、扩展定义等），遇到后整体跳过
+SKIP_TAGS = frozenset([
+    "c:PhysicalDiagrams",
+    "c:DefaultDiagram",
+    "c:Symbols",
+    "c:ExtendedModelDefinitions",
+    "c:GenerationOrigins",
+    "c:TargetModels",
+    "c:DBMS",
+])
+
+
+# 按包筛选的模式前缀
+PACKAGE_PREFIX = "pkg:"
+
+
+class TableFilter:
+    """
+    按表编码或所属包筛选表，不区分大小写
+    模式为表编码或glob（如"t_order*"），以"pkg:"开头时匹配所属包（含上级包）的编码或名称（如"pkg:trade*"）
+    表被保留当且仅当：include为空或匹配其中任一模式，且不匹配exclude中的任何模式
+    """
+
+    def __init__(self, include=None, exclude=None):
+        """
+        :param include: 模式或模式列表
+        :param exclude: 模式或模式列表
+        """
+        self.include = None if include is None else self.__compile(include)
+        self.exclude = None if exclude is None else self.__compile(exclude)
+
+    def match(self, code: str, packages: list = ()) -> bool:
+        """
+        :param code: 表编码
+        :param packages: 所属的各级包的编码、名称
+        """
+        code = code.lower()
+        packages = [p.lower() for p in packages if p]
+        if self.include is not None and not self.__match(self.include, code, packages):
+            return False
+        return self.exclude is None or not self.__match(self.exclude, code, packages)
+
+    @staticmethod
+    def __match(patterns: tuple, code: str, packages: list) -> bool:
+        code_pattern, package_pattern = patterns
+        if code_pattern is not None and code_pattern.match(code):
+            return True
+        if package_pattern is not None:
+            for p in packages:
+                if package_pattern.match(p):
+                    return True
+        return False
+
+    @staticmethod
+    def __compile(patterns) -> tuple:
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        codes = []
+        packages = []
+        for pattern in patterns:
+            pattern = pattern.lower()
+            if pattern.startswith(PACKAGE_PREFIX):
+                packages.append(fnmatch.translate(pattern[len(PACKAGE_PREFIX):]))
+            else:
+                codes.append(fnmatch.translate(pattern))
+        # 同类模式合并为一个正则，匹配一次即可
+        return (re.compile("|".join(codes)) if codes else None,
+                re.compile("|".join(packages)) if packages else None)
 
 
 class PdmXmlHandler(xml.sax.ContentHandler):
-    def __init__(self):
+    def __init__(self, streaming: bool = False, table_filter: TableFilter = None):
+        """
+        :param streaming: 流式模式，table_map只保留弱引用，已被调用方丢弃的表不会常驻内存；
+                          被丢弃的表只保留id、名称与编码，其字段索引随表释放，关联回填时以不含字段的占位表代替
+        :param table_filter: 表筛选条件，不匹配的表在读到编码后整体跳过，不构造任何对象
+        """
         xml.sax.ContentHandler.__init__(self)
+        self.streaming = streaming
+        self.table_filter = table_filter
         self.tables = []
         self.table_map = {}
+        # 流式模式下已产出的表：表id -> (名称, 编码)
+        self.table_codes = {}
         self.refs = {}
         self.current_table = None
         self.current_column = None
@@ -14,10 +122,66 @@ class PdmXmlHandler(xml.sax.ContentHandler):
         self.current_ref = None
         self.current_parent_table = None
         self.current_child_table = None
+        self.current_key = None
+        self.in_primary_key = False
+        self.current_join = None
+        self.join_side = None
+        # 字段id -> (表id, 字段下标)，用于在文件末尾解析关联中的字段引用
+        self.column_index = {}
+        # [(子表id, 主表id, 主表字段id, 子表字段id)]
+        self.joins = []
+        # 元素嵌套深度，属性元素只归属于直接包含它的表/字段
+        self.depth = 0
+        self.table_depth = 0
+        self.column_depth = 0
+        # 非None时表示正处于被跳过的子树中，skip_level为其中同名元素的嵌套层数
+        self.skip_tag = None
+        self.skip_level = 0
+        # 当前所处的各级包（只在筛选表时记录）
+        self.packages = []
+        self.attr_target = None
+        self.text = []
+        # 由create_expat_parser绑定，绑定后跳过子树时直接切换expat回调
+        self.parser = None
+
+        # 按标签分发的事件处理函数
+        self.start_handlers = {
+            "o:Table": self._start_table,
+            "o:Column": self._start_column,
+            "o:Reference": self._start_reference,
+            "c:ParentTable": self._start_parent_table,
+            "c:ChildTable": self._start_child_table,
+            "o:Key": self._start_key,
+            "c:PrimaryKey": self._start_primary_key,
+            "o:ReferenceJoin": self._start_reference_join,
+            "c:Object1": self._start_join_object,
+            "c:Object2": self._start_join_object,
+        }
+        self.end_handlers = {
+            "o:Table": self._end_table,
+            "o:Column": self._end_column,
+            "o:Reference": self._end_reference,
+            "c:ParentTable": self._end_parent_table,
+            "c:ChildTable": self._end_child_table,
+            "o:Key": self._end_key,
+            "c:PrimaryKey": self._end_primary_key,
+            "o:ReferenceJoin": self._end_reference_join,
+            "c:Object1": self._end_join_object,
+            "c:Object2": self._end_join_object,
+        }
+        for tag in ATTR_TAGS:
+            self.start_handlers[tag] = self._start_attr
+            self.end_handlers[tag] = self._end_attr
+        for tag in SKIP_TAGS:
+            self.start_handlers[tag] = self._start_skip
+        if table_filter is not None:
+            self.start_handlers["o:Package"] = self._start_package
+            self.end_handlers["o:Package"] = self._end_package
 
     def startDocument(self):
         self.tables = []
-        self.table_map = {}
+        self.table_map = weakref.WeakValueDictionary() if self.streaming else {}
+        self.table_codes = {}
         self.refs = {}
         self.current_table = None
         self.current_column = None
@@ -25,100 +189,644 @@ class PdmXmlHandler(xml.sax.ContentHandler):
         self.current_ref = None
         self.current_parent_table = None
         self.current_child_table = None
+        self.current_key = None
+        self.in_primary_key = False
+        self.current_join = None
+        self.join_side = None
+        self.column_index = {}
+        self.joins = []
+        self.depth = 0
+        self.table_depth = 0
+        self.column_depth = 0
+        self.skip_tag = None
+        self.skip_level = 0
+        self.packages = []
+        self.attr_target = None
+        self.text.clear()
+        self.__dict__.pop("startElement", None)
+        self.__dict__.pop("endElement", None)
 
     # 元素开始事件处理
     def startElement(self, tag, attributes):
-        if tag == "o:Table" and "Id" in attributes:
+        self.depth += 1
+        handler = self.start_handlers.get(tag)
+        if handler is not None:
+            handler(tag, attributes)
+
+    # 元素结束事件处理
+    def endElement(self, tag):
+        handler = self.end_handlers.get(tag)
+        if handler is not None:
+            handler()
+        self.depth -= 1
+
+    # 内容事件处理，文本先全部收集，属性元素开始时清空
+    def characters(self, content):
+        if self.skip_tag is None:
+            self.text.append(content)
+
+    def endDocument(self):
+        stubs = {}
+        for id in self.refs.keys():
+            tb = self.table_map.get(id)
+            if tb is None:
+                continue
+            childrenId = self.refs[id]
+            for childId in childrenId:
+                child = self.table_map.get(childId)
+                if child is None and childId in self.table_codes:
+                    # 主表已被调用方丢弃，以只含名称与编码的占位表保留关联
+                    child = stubs.get(childId)
+                    if child is None:
+                        name, code = self.table_codes[childId]
+                        child = stubs[childId] = Table(childId, name, code)
+                if child is not None:
+                    tb.refs.append(child)
+        for child_id, parent_id, parent_column_id, child_column_id in self.joins:
+            child = self.table_map.get(child_id)
+            parent = self.table_map.get(parent_id)
+            if child is None or parent is None:
+                continue
+            child_column = self.column_index.get(child_column_id)
+            parent_column = self.column_index.get(parent_column_id)
+            if child_column is None or parent_column is None or child_column[0] != child_id \
+                    or parent_column[0] != parent_id:
+                continue
+            child.joins.append((parent, child.columns[child_column[1]], parent.columns[parent_column[1]]))
+
+    def _start_skip(self, tag, attributes):
+        # SKIP_TAGS的子树不会嵌套同名元素，只需等待同名结束标签；期间不再响应开始事件
+        self._skip_subtree(tag, nested=False)
+
+    def _skip_subtree(self, tag, nested: bool):
+        """
+        跳过当前元素的剩余部分，直到其结束标签
+        :param nested: 子树中是否可能嵌套同名元素，是则需要响应开始事件以计数
+        """
+        self.skip_tag = tag
+        self.skip_level = 1
+        self.startElement = self._skip_start
+        self.endElement = self._skip_end
+        if self.parser is not None:
+            self.parser.StartElementHandler = self._skip_start if nested else None
+            self.parser.EndElementHandler = self._skip_end
+            self.parser.CharacterDataHandler = None
+
+    def _skip_start(self, tag, attributes):
+        if tag == self.skip_tag:
+            self.skip_level += 1
+
+    def _skip_end(self, tag):
+        if tag != self.skip_tag:
+            return
+        self.skip_level -= 1
+        if self.skip_level:
+            return
+        self.skip_tag = None
+        self.depth -= 1
+        del self.startElement
+        del self.endElement
+        if self.parser is not None:
+            self.parser.StartElementHandler = self.startElement
+            self.parser.EndElementHandler = self.endElement
+            self.parser.CharacterDataHandler = self.text.append
+
+    def _start_table(self, tag, attributes):
+        if "Id" in attributes:
             self.current_table = {'id': attributes["Id"], 'columns': []}
-        elif tag == "o:Column":
-            self.current_column = {}
-        elif tag == "a:Name":
-            self.current_attr = "name"
-        elif tag == "a:Code":
-            self.current_attr = "code"
-        elif tag == "a:DataType":
-            self.current_attr = "col_type"
-        elif tag == "a:Length":
-            self.current_attr = "length"
-        elif tag == "a:Comment":
-            self.current_attr = "comment"
-        elif tag == "o:Reference":
-            self.current_ref = {}
-        elif self.current_ref is not None and tag == "c:ParentTable":
-            self.current_parent_table = {}
-        elif self.current_ref is not None and tag == "c:ChildTable":
-            self.current_child_table = {}
-        elif tag == "o:Table" and "Ref" in attributes:
+            self.table_depth = self.depth
+        elif "Ref" in attributes:
             if self.current_parent_table is not None:
                 self.current_parent_table = attributes['Ref']
             elif self.current_child_table is not None:
                 self.current_child_table = attributes['Ref']
 
-    # 元素结束事件处理
-    def endElement(self, tag):
-        if tag == "o:Table" and self.current_table is not None:
-            if "code" in self.current_table.keys():
-                t = Table()
-                for key, val in self.current_table.items():
-                    t.__setattr__(key, val)
-                self.tables.append(t)
-            self.current_table = None
+    def _end_table(self):
+        if self.current_table is None or self.depth != self.table_depth:
+            return
+        data = self.current_table
+        if "code" in data:
+            t = Table(data['id'], intern_str(data.get('name')), intern_str(data['code']), data.get('comment'))
+            t.columns = data['columns']
+            pk = data.get('pk')
+            if pk is not None:
+                for column_id in data.get('keys', {}).get(pk, ()):
+                    entry = self.column_index.get(column_id)
+                    if entry is not None and entry[0] == t.id:
+                        t.columns[entry[1]].pk = True
+            self.tables.append(t)
             self.table_map[t.id] = t
-        elif tag == "o:Column":
-            if "name" in self.current_column.keys():
-                c = Column()
-                for key, val in self.current_column.items():
-                    if key == 'col_type':
-                        c.col_type = PdmColumnType[val.upper()]
-                    else:
-                        c.__setattr__(key, val)
-                self.current_table['columns'].append(c)
-            self.current_column = None
-        elif tag == "a:Name":
-            self.current_attr = None
-        elif tag == "a:Code":
-            self.current_attr = None
-        elif tag == "a:DataType":
-            self.current_attr = None
-        elif tag == "a:Comment":
+            if self.streaming:
+                self.table_codes[t.id] = (t.name, t.code)
+                # 表被调用方丢弃后其字段不会再被关联引用，字段索引随之删除
+                weakref.finalize(t, _discard_keys, self.column_index, data.get('column_ids', ()))
+        self.current_table = None
+
+    def _start_column(self, tag, attributes):
+        # 键、索引、关联中的<o:Column Ref="..."/>只是引用，不是字段定义
+        if "Id" in attributes:
+            if self.current_table is not None:
+                self.current_column = {'id': attributes["Id"]}
+                self.column_depth = self.depth
+        elif "Ref" in attributes:
+            if self.current_key is not None:
+                self.current_key['columns'].append(attributes["Ref"])
+            elif self.join_side is not None:
+                self.current_join[self.join_side] = attributes["Ref"]
+
+    def _end_column(self):
+        if self.current_column is None or self.depth != self.column_depth:
+            return
+        data = self.current_column
+        if "name" in data:
+            data_type = data.get('col_type')
+            if data_type is None:
+                col_type = length = scale = None
+            else:
+                col_type, length, scale = resolve_data_type(data_type)
+            # 单独的Length/Precision元素优先于DataType文本中的参数
+            value = parse_length(data.get('length'))
+            if value is not None:
+                length = value
+            value = parse_length(data.get('precision'))
+            if value is not None:
+                scale = value
+            c = Column(intern_str(data['name']), intern_str(data.get('code')), col_type, length,
+                       not_null=data.get('mandatory') == "1", comment=data.get('comment'), col_scale=scale)
+            columns = self.current_table['columns']
+            self.column_index[data['id']] = (self.current_table['id'], len(columns))
+            if self.streaming:
+                self.current_table.setdefault('column_ids', []).append(data['id'])
+            columns.append(c)
+        self.current_column = None
+
+    def _start_attr(self, tag, attributes):
+        self.text.clear()
+        if self.current_column is not None:
+            if self.depth == self.column_depth + 1:
+                self.attr_target = self.current_column
+        elif self.current_table is not None:
+            if self.depth == self.table_depth + 1:
+                self.attr_target = self.current_table
+        elif self.packages and self.depth == self.packages[-1]['depth'] + 1:
+            self.attr_target = self.packages[-1]
+        if self.attr_target is not None:
+            self.current_attr = ATTR_TAGS[tag]
+
+    def _end_attr(self):
+        if self.attr_target is not None:
+            target = self.attr_target
+            target[self.current_attr] = "".join(self.text)
+            if self.table_filter is not None and target is self.current_table and self.current_attr == "code":
+                self.__filter_table()
+            self.attr_target = None
             self.current_attr = None
-        elif tag == "o:Reference" and 'child' in self.current_ref.keys() and 'parent' in self.current_ref.keys():
-            if self.current_ref['child'] not in self.refs.keys():
-                self.refs[self.current_ref['child']] = []
-            ref = self.refs[self.current_ref['child']]
-            ref.append(self.current_ref['parent'])
-            self.current_ref = None
-        elif self.current_ref is not None and tag == "c:ParentTable":
+
+    def __filter_table(self):
+        packages = []
+        for package in self.packages:
+            packages.append(package.get('code'))
+            packages.append(package.get('name'))
+        if not self.table_filter.match(self.current_table['code'], packages):
+            # 编码位于表的开头，表的其余部分（字段、键、索引等）整体跳过；键、索引中可能有同名的引用元素
+            self.current_table = None
+            self._skip_subtree("o:Table", nested=True)
+
+    def _start_package(self, tag, attributes):
+        if "Id" in attributes:
+            self.packages.append({'depth': self.depth})
+
+    def _end_package(self):
+        if self.packages and self.packages[-1]['depth'] == self.depth:
+            self.packages.pop()
+
+    def _start_key(self, tag, attributes):
+        if self.current_table is None:
+            return
+        if "Id" in attributes:
+            self.current_key = {'id': attributes["Id"], 'columns': []}
+        elif "Ref" in attributes and self.in_primary_key:
+            self.current_table['pk'] = attributes["Ref"]
+
+    def _end_key(self):
+        if self.current_key is not None:
+            if self.current_table is not None:
+                self.current_table.setdefault('keys', {})[self.current_key['id']] = self.current_key['columns']
+            self.current_key = None
+
+    def _start_primary_key(self, tag, attributes):
+        self.in_primary_key = self.current_table is not None
+
+    def _end_primary_key(self):
+        self.in_primary_key = False
+
+    def _start_reference_join(self, tag, attributes):
+        if self.current_ref is not None:
+            self.current_join = {}
+
+    def _end_reference_join(self):
+        join = self.current_join
+        if join is not None and 'parent' in join and 'child' in join:
+            self.current_ref.setdefault('joins', []).append((join['parent'], join['child']))
+        self.current_join = None
+
+    def _start_join_object(self, tag, attributes):
+        # Object1为主表字段，Object2为子表字段
+        if self.current_join is not None:
+            self.join_side = "parent" if tag == "c:Object1" else "child"
+
+    def _end_join_object(self):
+        self.join_side = None
+
+    def _start_reference(self, tag, attributes):
+        self.current_ref = {}
+
+    def _end_reference(self):
+        ref = self.current_ref
+        self.current_ref = None
+        if ref is None or 'child' not in ref or 'parent' not in ref:
+            return
+        child_id, parent_id = ref['child'], ref['parent']
+        # 流式模式下子表已被调用方丢弃时关联无处回填；主表已被丢弃时只保留关联，不保留字段对
+        if self.__dropped(child_id):
+            return
+        self.refs.setdefault(child_id, []).append(parent_id)
+        if self.__dropped(parent_id):
+            return
+        for parent_column, child_column in ref.get('joins', ()):
+            self.joins.append((child_id, parent_id, parent_column, child_column))
+
+    def __dropped(self, table_id) -> bool:
+        return table_id in self.table_codes and table_id not in self.table_map
+
+    def _start_parent_table(self, tag, attributes):
+        if self.current_ref is not None:
+            self.current_parent_table = {}
+
+    def _end_parent_table(self):
+        if self.current_ref is not None:
             self.current_ref['parent'] = self.current_parent_table
             self.current_parent_table = None
-        elif self.current_ref is not None and tag == "c:ChildTable":
+
+    def _start_child_table(self, tag, attributes):
+        if self.current_ref is not None:
+            self.current_child_table = {}
+
+    def _end_child_table(self):
+        if self.current_ref is not None:
             self.current_ref['child'] = self.current_child_table
             self.current_child_table = None
 
-    # 内容事件处理
-    def characters(self, content):
-        if self.current_column is not None and self.current_attr is not None:
-            self.current_column[self.current_attr] = content
-        elif self.current_table is not None and self.current_attr is not None:
-            self.current_table[self.current_attr] = content
+
+class ParseStats:
+    """
+    一次解析的统计信息
+    """
+
+    def __init__(self):
+        # 文件总字节数（未知时为None）与已读取的字节数；.gz压缩包均为压缩数据的字节数
+        self.total_bytes = None
+        self.bytes_read = 0
+        # 已处理的元素数量（被跳过的子树内部的元素不计入）及按标签的计数
+        self.elements = 0
+        self.element_counts = {}
+        # 被整体跳过的子树数量
+        self.skipped_subtrees = 0
+        self.tables = 0
+        self.columns = 0
+        self.references = 0
+        # 各阶段耗时（秒）：XML扫描、构造Table/Column、endDocument中回填关联
+        self.scan_time = 0.0
+        self.build_time = 0.0
+        self.resolve_time = 0.0
+        self.total_time = 0.0
+
+    @property
+    def progress(self) -> float:
+        """
+        :return: 读取进度(0~1)，文件大小未知时为None
+        """
+        if not self.total_bytes:
+            return None
+        return self.bytes_read / self.total_bytes
+
+    def __str__(self):
+        return "%d字节, %d个元素, %d张表, %d个字段, %d个关联; 扫描%.3fs, 构造%.3fs, 关联%.3fs, 总计%.3fs" % (
+            self.bytes_read, self.elements, self.tables, self.columns, self.references,
+            self.scan_time, self.build_time, self.resolve_time, self.total_time)
+
+
+class InstrumentedPdmXmlHandler(PdmXmlHandler):
+    """
+    带统计的事件处理器，只在需要统计或进度时使用，PdmXmlHandler本身不承担任何统计开销
+    """
+
+    def __init__(self, stats: ParseStats, streaming: bool = False, table_filter: TableFilter = None):
+        PdmXmlHandler.__init__(self, streaming, table_filter)
+        self.stats = stats
+
+    def startElement(self, tag, attributes):
+        stats = self.stats
+        stats.elements += 1
+        stats.element_counts[tag] = stats.element_counts.get(tag, 0) + 1
+        PdmXmlHandler.startElement(self, tag, attributes)
 
     def endDocument(self):
-        for id in self.refs.keys():
-            tb = self.table_map[id]
-            childrenId = self.refs[id]
-            for childId in childrenId:
-                child = self.table_map[childId]
-                tb.refs.append(child)
+        start = time.perf_counter()
+        PdmXmlHandler.endDocument(self)
+        self.stats.resolve_time += time.perf_counter() - start
+
+    def _start_skip(self, tag, attributes):
+        self.stats.skipped_subtrees += 1
+        PdmXmlHandler._start_skip(self, tag, attributes)
+
+    def _end_table(self):
+        count = len(self.tables)
+        start = time.perf_counter()
+        PdmXmlHandler._end_table(self)
+        self.stats.build_time += time.perf_counter() - start
+        self.stats.tables += len(self.tables) - count
+
+    def _end_column(self):
+        built = self.current_column is not None and self.depth == self.column_depth
+        start = time.perf_counter()
+        PdmXmlHandler._end_column(self)
+        self.stats.build_time += time.perf_counter() - start
+        if built:
+            self.stats.columns += 1
+
+    def _end_reference(self):
+        ref = self.current_ref
+        PdmXmlHandler._end_reference(self)
+        if ref is not None and 'child' in ref and 'parent' in ref:
+            self.stats.references += 1
 
 
-def parse_pdm(pdm_path: str) -> list:
-    parser = xml.sax.make_parser()
-    parser.setFeature(xml.sax.handler.feature_namespaces, 0)
-    handler = PdmXmlHandler()
-    parser.setContentHandler(handler)
-    parser.parse(pdm_path)
+def _discard_keys(index: dict, keys):
+    for key in keys:
+        index.pop(key, None)
+
+
+def create_expat_parser(handler: PdmXmlHandler):
+    """
+    创建直接驱动PdmXmlHandler的expat解析器，省去xml.sax的中间层
+    :param handler: 事件处理器
+    :return: expat解析器
+    """
+    parser = xml.parsers.expat.ParserCreate()
+    parser.buffer_text = True
+    parser.buffer_size = EXPAT_BUFFER_SIZE
+    parser.StartElementHandler = handler.startElement
+    parser.EndElementHandler = handler.endElement
+    parser.CharacterDataHandler = handler.text.append
+    handler.parser = parser
+    return parser
+
+
+def parse_pdm(pdm_path, progress=None, stats: ParseStats = None, include=None, exclude=None) -> list:
+    """
+    :param pdm_path: PDM文件路径、文件对象、mmap或bytes，也可以是.gz/.zip压缩包，详见PdmSource
+    :param progress: 进度回调，每读取一块数据后以ParseStats为参数调用一次
+    :param stats: 传入时将本次解析的统计信息写入其中；progress与stats均为None时不做任何统计
+    :param include: 只解析匹配的表，表编码、glob或"pkg:包"，详见TableFilter
+    :param exclude: 不解析匹配的表
+    :return: 表列表，关联(Table.refs)只在选中的表之间建立
+    """
+    table_filter = create_table_filter(include, exclude)
+    if progress is not None or stats is not None:
+        return __parse_instrumented(pdm_path, progress, ParseStats() if stats is None else stats, table_filter)
+    handler = PdmXmlHandler(table_filter=table_filter)
+    handler.startDocument()
+    parser = create_expat_parser(handler)
+    with PdmSource(pdm_path) as source:
+        feed_source(parser, source)
+    handler.endDocument()
     return handler.tables
 
+
+def parse_pdm_stats(pdm_path, progress=None, include=None, exclude=None) -> tuple:
+    """
+    解析PDM文件并返回统计信息
+    :return: (表列表, ParseStats)
+    """
+    stats = ParseStats()
+    tables = parse_pdm(pdm_path, progress, stats, include, exclude)
+    return tables, stats
+
+
+def create_table_filter(include=None, exclude=None):
+    """
+    :return: TableFilter，include与exclude均为None时返回None
+    """
+    if include is None and exclude is None:
+        return None
+    return TableFilter(include, exclude)
+
+
+def feed_source(parser, source: PdmSource, chunk_size: int = SOURCE_CHUNK_SIZE, on_chunk=None):
+    """
+    将数据源逐块交给expat解析器，最后结束解析
+    :param on_chunk: 每块数据解析后以数据块长度为参数调用
+    """
+    chunks = source.chunks(chunk_size)
+    try:
+        for chunk in chunks:
+            parser.Parse(chunk, False)
+            if on_chunk is not None:
+                on_chunk(len(chunk))
+    finally:
+        # 及时释放mmap切片，数据源才能关闭
+        chunks.close()
+    parser.Parse(b"", True)
+
+
+def __parse_instrumented(pdm_path, progress, stats: ParseStats, table_filter: TableFilter) -> list:
+    start = time.perf_counter()
+    handler = InstrumentedPdmXmlHandler(stats, table_filter=table_filter)
+    handler.startDocument()
+    parser = create_expat_parser(handler)
+
+    with PdmSource(pdm_path) as source:
+        def on_chunk(size):
+            # .gz按已读取的压缩数据计算进度，与total_bytes一致
+            stats.bytes_read = source.position
+            if progress is not None:
+                progress(stats)
+
+        stats.total_bytes = source.size
+        feed_source(parser, source, READ_CHUNK_SIZE, on_chunk)
+    handler.endDocument()
+    stats.total_time = time.perf_counter() - start
+    stats.scan_time = stats.total_time - stats.build_time - stats.resolve_time
+    return handler.tables
+
+
+def parse_schema(pdm_path, include=None, exclude=None) -> Schema:
+    """
+    解析PDM文件并建立索引
+    :param pdm_path: PDM文件路径、文件对象或压缩包，同parse_pdm
+    :param include: 只解析匹配的表，同parse_pdm
+    :param exclude: 不解析匹配的表，同parse_pdm
+    :return: Schema
+    """
+    return Schema(parse_pdm(pdm_path, include=include, exclude=exclude))
+
+
+def iter_pdm_tables(pdm_path, chunk_size: int = READ_CHUNK_SIZE, include=None, exclude=None):
+    """
+    流式解析PDM文件，每当</o:Table>闭合即产出对应的Table
+    表之间的关联(Table.refs、Table.joins)在文件读取完毕后统一回填，因此只有迭代结束后才完整；
+    已被调用方丢弃的表不会被保留：引用它的refs中以只含id、名称与编码（没有字段）的占位表代替，
+    与它有关的joins不再回填
+    :param pdm_path: PDM文件路径、文件对象或压缩包，同parse_pdm
+    :param chunk_size: 每次读取的字节数
+    :param include: 只解析匹配的表，同parse_pdm
+    :param exclude: 不解析匹配的表，同parse_pdm
+    :return: Table生成器
+    """
+    handler = PdmXmlHandler(streaming=True, table_filter=create_table_filter(include, exclude))
+    handler.startDocument()
+    parser = create_expat_parser(handler)
+    with PdmSource(pdm_path) as source:
+        chunks = source.chunks(chunk_size)
+        try:
+            for chunk in chunks:
+                parser.Parse(chunk, False)
+                if handler.tables:
+                    finished = handler.tables
+                    handler.tables = []
+                    yield from finished
+        finally:
+            chunks.close()
+        parser.Parse(b"", True)
+    handler.endDocument()
+    yield from handler.tables
+    handler.tables = []
+
+
+class PdmIncrementalParser:
+    """
+    增量解析器：数据按任意边界分块到达时逐块feed，不需要完整文件（如边接收上传边解析）
+    第一块数据以gzip文件头开始时自动边解压边解析
+
+    parser = PdmIncrementalParser()
+    for data in chunks:
+        parser.feed(data)
+    tables = parser.close()
+    """
+
+    def __init__(self, include=None, exclude=None):
+        """
+        :param include: 只解析匹配的表，同parse_pdm
+        :param exclude: 不解析匹配的表，同parse_pdm
+        """
+        self.handler = PdmXmlHandler(table_filter=create_table_filter(include, exclude))
+        self.handler.startDocument()
+        self.parser = create_expat_parser(self.handler)
+        # 已接收的（压缩）字节数
+        self.bytes_fed = 0
+        self.closed = False
+        self.__head = b""
+        self.__decoder = None
+
+    @property
+    def tables(self) -> list:
+        """
+        :return: 目前已解析完成的表，close之前关联(Table.refs)尚未回填
+        """
+        return self.handler.tables
+
+    def feed(self, data):
+        """
+        :param data: 数据块
+        """
+        if self.closed:
+            raise ValueError("解析器已关闭")
+        self.bytes_fed += len(data)
+        if self.bytes_fed <= len(GZIP_MAGIC):
+            # 数据不足以判断是否为gzip时先缓存
+            self.__head += bytes(data)
+            return
+        if self.__head is not None:
+            data = self.__head + bytes(data)
+            self.__head = None
+            if data.startswith(GZIP_MAGIC):
+                self.__decoder = GzipDecoder()
+        self.__parse(data)
+
+    def close(self) -> list:
+        """
+        结束解析并回填关联
+        :return: 表列表
+        """
+        if self.closed:
+            return self.handler.tables
+        if self.__head:
+            data = self.__head
+            self.__head = None
+            self.__parse(data)
+        if self.__decoder is not None:
+            self.parser.Parse(self.__decoder.flush(), False)
+        self.parser.Parse(b"", True)
+        self.handler.endDocument()
+        self.closed = True
+        return self.handler.tables
+
+    def __parse(self, data):
+        if self.__decoder is None:
+            self.parser.Parse(data, False)
+        else:
+            for out in self.__decoder.decode(data):
+                self.parser.Parse(out, False)
+
+
+def parse_pdm_many(paths: list, workers: int = None, include=None, exclude=None):
+    """
+    使用进程池并行解析多个PDM文件，按完成顺序产出结果
+    单个文件解析失败不会中断整批任务；子进程以紧凑记录(pack_tables)回传结果，降低跨进程传输开销
+    :param paths: PDM文件路径列表
+    :param workers: 进程数，默认为CPU核数
+    :param include: 只解析匹配的表，同parse_pdm
+    :param exclude: 不解析匹配的表，同parse_pdm
+    :return: (path, tables, error)生成器，成功时error为None，失败时tables为None、error为错误信息
+    """
+    # 进程池依赖multiprocessing，导入较慢，只在需要时导入
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_parse_packed, path, include, exclude) for path in paths]
+        for future in as_completed(futures):
+            path, records, error = future.result()
+            yield path, None if records is None else unpack_tables(records), error
+
+
+def _parse_packed(pdm_path: str, include=None, exclude=None):
+    try:
+        return pdm_path, pack_tables(parse_pdm(pdm_path, include=include, exclude=exclude)), None
+    except Exception as e:
+        return pdm_path, None, "%s: %s" % (type(e).__name__, e)
+
+
+def main(argv: list = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="解析PDM文件")
+    arg_parser.add_argument("paths", nargs="+", help="PDM文件路径")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="并行进程数，默认为CPU核数")
+    arg_parser.add_argument("-i", "--include", action="append", default=None,
+                            help="只解析匹配的表：表编码、glob或pkg:包，可重复指定")
+    arg_parser.add_argument("-x", "--exclude", action="append", default=None, help="不解析匹配的表，可重复指定")
+    args = arg_parser.parse_args(argv)
+
+    failed = 0
+    for path, tables, error in parse_pdm_many(args.paths, args.workers, args.include, args.exclude):
+        if error is not None:
+            failed += 1
+            print("%s\t解析失败: %s" % (path, error), file=sys.stderr)
+        else:
+            print("%s\t%d张表" % (path, len(tables)))
+    return 1 if failed else 0
+
 # tables = parse_pdm("/Users/liyilin/Workspace/doc/company/AIFactory-train-doc/06 数据模型/deepminer-v2(1).pdm")
 #
 # max_len = [0, 0]
@@ -137,3 +845,7 @@ def parse_pdm(pdm_path: str) -> list:
 #         print("\t\t%-25s\t\t%-10s\t\t%s\t%s" % (
 #         c.code, c.col_type, c.name, "" if c.comment is None else c.comment.strip()))
 #     print()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
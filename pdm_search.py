@@ -0,0 +1,453 @@
+import bisect
+import functools
+import itertools
+import os
+import pickle
+import re
+import sys
+
+INDEX_VERSION = 1
+# 各属性命中时的权重
+CODE_WEIGHT = 4
+NAME_WEIGHT = 2
+COMMENT_WEIGHT = 1
+# 模糊查询允许的编辑距离，以及参与模糊匹配的最短词长（过短的词模糊匹配没有意义）
+FUZZY_DISTANCE = 1
+FUZZY_MIN_LENGTH = 4
+# 缓存的排好序的文档列表个数上限
+RANKED_CACHE_SIZE = 4096
+
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+# CJK连续文本 | 其他字母数字串（下划线、空白、标点均为分隔）
+TOKEN_PATTERN = re.compile(r"([%s]+)|((?:(?![%s])[^\W_])+)" % (CJK_CHARS, CJK_CHARS))
+CJK_PATTERN = re.compile(r"[%s]" % CJK_CHARS)
+# 驼峰拆分：HTTPServer -> HTTP, Server；customerId2 -> customer, Id, 2
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+@functools.lru_cache(maxsize=65536)
+def tokenize(text: str) -> tuple:
+    """
+    分词：编码按下划线与驼峰拆分并转为小写（customer_id、customerId均为customer, id），
+    CJK文本切分为相邻二字组（"客户编号" -> 客户, 户编, 编号），单个CJK字符保留为一个词
+    编码、名称在各表之间大量重复，分词结果按文本缓存
+    """
+    tokens = []
+    if not text:
+        return ()
+    for cjk, word in TOKEN_PATTERN.findall(text):
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        elif word.isascii():
+            tokens.extend(w.lower() for w in CAMEL_PATTERN.findall(word))
+        else:
+            tokens.append(word.lower())
+    return tuple(tokens)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    编辑距离（相邻字符交换计为1次编辑，如tabel与table），超过max_distance时提前结束并返回max_distance + 1
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    before = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            d = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d = min(d, before[j - 2] + 1)
+            current.append(d)
+        if min(current) > max_distance and min(previous) >= max_distance:
+            return max_distance + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _deletes(term: str) -> set:
+    """
+    term以及删除其中一个字符得到的全部字符串；两个词编辑距离不超过1时二者的集合必然相交
+    """
+    result = {term}
+    for i in range(len(term)):
+        result.add(term[:i] + term[i + 1:])
+    return result
+
+
+class SearchHit:
+    __slots__ = ("source", "table_code", "table_name", "column_code", "column_name", "score")
+
+    def __init__(self, source, table_code, table_name, column_code, column_name, score):
+        self.source = source
+        self.table_code = table_code
+        self.table_name = table_name
+        # 命中表本身时为None
+        self.column_code = column_code
+        self.column_name = column_name
+        self.score = score
+
+    def __str__(self):
+        if self.column_code is None:
+            return "%s\t%s(%s)" % (self.source, self.table_code, self.table_name)
+        return "%s\t%s.%s(%s)" % (self.source, self.table_code, self.column_code, self.column_name)
+
+
+class SearchIndex:
+    """
+    表与字段的倒排索引：以表、字段为文档，对编码、名称、注释分词后建立 词 -> {文档: 权重} 的倒排表
+    多个查询词之间为"且"的关系，按命中属性的权重之和排序
+    前缀查询在有序词表上二分查找，模糊查询通过删除一个字符的变体索引找到编辑距离为1的词；
+    变体索引与CJK字符索引随词的增删同步维护（load时整体建立），查询时不再构建
+    查询耗时（5000张表、10万个文档）：单个词的查询约0.1ms，某个词首次查询时须先将其倒排表排序，
+    常见词约1ms；多个词求交时与最短的倒排表长度成正比，两个各命中5000个文档的词约3ms
+    索引按来源（通常是PDM文件路径）组织，单个文件变化时只替换该文件的文档
+
+    index = SearchIndex()
+    index.update_file("a.pdm")
+    index.search("customer_id")
+    index.search("invo", prefix=True)
+    index.save("models.index")
+    """
+
+    def __init__(self):
+        # 文档id -> (来源, 表编码, 表名称, 字段编码, 字段名称)
+        self.docs = {}
+        # 文档id -> 该文档的全部词，删除文档时据此清理倒排表
+        self.doc_terms = {}
+        # 词 -> {文档id: 权重}
+        self.postings = {}
+        # 来源 -> (文件状态, [文档id])
+        self.sources = {}
+        self.next_id = 0
+        # 随倒排表中词的增删同步维护：删除一个字符的变体 -> 词（模糊查询）、CJK字符 -> 包含该字符的二字组
+        self.__deletes = {}
+        self.__cjk_terms = {}
+        # 以下在索引变化后的第一次查询时重建：
+        # 有序词表（前缀查询）、词 -> 按权重排好序的文档id列表（单个词的查询直接截取）
+        self.__terms = None
+        self.__ranked = {}
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add_tables(self, source: str, tables: list, state=None):
+        """
+        索引一个来源的全部表，替换该来源之前的内容
+        :param source: 来源标识，通常是PDM文件路径
+        :param tables: 表列表
+        :param state: 来源的状态（如文件的修改时间与大小），update_file据此判断是否需要重新索引
+        """
+        self.remove_source(source)
+        doc_ids = []
+        for table in tables:
+            doc_ids.append(self.__add_doc((source, table.code, table.name, None, None),
+                                          table.code, table.name, table.comment))
+            for col in table.columns:
+                doc_ids.append(self.__add_doc((source, table.code, table.name, col.code, col.name),
+                                              col.code, col.name, col.comment))
+        self.sources[source] = (state, doc_ids)
+        self.__invalidate()
+
+    def remove_source(self, source: str) -> bool:
+        entry = self.sources.pop(source, None)
+        if entry is None:
+            return False
+        for doc_id in entry[1]:
+            del self.docs[doc_id]
+            for term in self.doc_terms.pop(doc_id):
+                posting = self.postings[term]
+                del posting[doc_id]
+                if not posting:
+                    del self.postings[term]
+                    self.__remove_term(term)
+        self.__invalidate()
+        return True
+
+    def update_file(self, path: str, include=None, exclude=None) -> bool:
+        """
+        文件自上次索引后有变化（修改时间或大小不同）或筛选条件不同时重新解析并索引
+        :return: 是否重新索引
+        """
+        from pdm_parser import parse_pdm
+
+        state = _file_state(path) + (repr(include), repr(exclude))
+        entry = self.sources.get(path)
+        if entry is not None and entry[0] == state:
+            return False
+        self.add_tables(path, parse_pdm(path, include=include, exclude=exclude), state)
+        return True
+
+    def refresh(self, paths: list, include=None, exclude=None) -> tuple:
+        """
+        同步索引与一组文件：重新索引有变化的文件，移除不在paths中或已被删除的文件
+        :return: (重新索引的文件列表, 移除的来源列表)
+        """
+        updated = []
+        existing = set()
+        for path in paths:
+            if os.path.exists(path):
+                existing.add(path)
+                if self.update_file(path, include, exclude):
+                    updated.append(path)
+        removed = [source for source in self.sources if source not in existing]
+        for source in removed:
+            self.remove_source(source)
+        return updated, removed
+
+    def search(self, query: str, limit: int = 20, prefix: bool = False, fuzzy: bool = False,
+               columns: bool = None) -> list:
+        """
+        :param query: 查询文本，分词方式同索引
+        :param limit: 最多返回的结果数，为None时返回全部
+        :param prefix: 每个查询词按前缀匹配
+        :param fuzzy: 每个查询词同时匹配编辑距离为FUZZY_DISTANCE以内的词
+        :param columns: 为True时只返回字段，为False时只返回表，默认都返回
+        :return: SearchHit列表，按得分从高到低排列
+        """
+        docs = self.docs
+        expanded = []
+        for term in dict.fromkeys(tokenize(query)):
+            candidates = self.__expand(term, prefix, fuzzy)
+            if not candidates:
+                return []
+            expanded.append(candidates)
+        if not expanded:
+            return []
+        if len(expanded) == 1:
+            # 单个查询词：直接截取排好序的文档列表
+            ranked, posting = self.__ranked_docs(expanded[0])
+            if columns is not None:
+                ranked = (doc_id for doc_id in ranked if (docs[doc_id][3] is not None) == columns)
+            if limit is not None:
+                ranked = itertools.islice(ranked, limit)
+            return [SearchHit(*docs[doc_id], posting[doc_id]) for doc_id in ranked]
+
+        scores = self.__intersect(expanded)
+        if not scores:
+            return []
+        if columns is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if (docs[doc_id][3] is not None) == columns}
+        # 两次稳定排序：得分从高到低，得分相同时按文档id
+        ranked = sorted(scores)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [SearchHit(*docs[doc_id], scores[doc_id]) for doc_id in ranked]
+
+    def save(self, path: str):
+        data = pickle.dumps((INDEX_VERSION, self.docs, self.doc_terms, self.postings, self.sources, self.next_id),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        读取save保存的索引，版本不一致时抛出ValueError
+        """
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        if data[0] != INDEX_VERSION:
+            raise ValueError("索引版本不一致: %s" % data[0])
+        index = cls()
+        index.docs, index.doc_terms, index.postings, index.sources, index.next_id = data[1:]
+        for term in index.postings:
+            index.__add_term(term)
+        return index
+
+    def __add_doc(self, record: tuple, code: str, name: str, comment: str) -> int:
+        doc_id = self.next_id
+        self.next_id += 1
+        weights = {}
+        for text, weight in ((code, CODE_WEIGHT), (name, NAME_WEIGHT), (comment, COMMENT_WEIGHT)):
+            for term in tokenize(text):
+                # 各属性的权重互不重叠，同一属性中重复出现的词只计一次
+                weights[term] = weights.get(term, 0) | weight
+        postings = self.postings
+        for term, weight in weights.items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = {}
+                self.__add_term(term)
+            posting[doc_id] = weight
+        self.docs[doc_id] = record
+        self.doc_terms[doc_id] = tuple(weights)
+        return doc_id
+
+    def __add_term(self, term: str):
+        if len(term) >= FUZZY_MIN_LENGTH - FUZZY_DISTANCE:
+            deletes = self.__deletes
+            for d in _deletes(term):
+                terms = deletes.get(d)
+                if terms is None:
+                    deletes[d] = [term]
+                else:
+                    terms.append(term)
+        for char in _cjk_chars(term):
+            self.__cjk_terms.setdefault(char, []).append(term)
+
+    def __remove_term(self, term: str):
+        if len(term) >= FUZZY_MIN_LENGTH - FUZZY_DISTANCE:
+            deletes = self.__deletes
+            for d in _deletes(term):
+                terms = deletes[d]
+                terms.remove(term)
+                if not terms:
+                    del deletes[d]
+        for char in _cjk_chars(term):
+            terms = self.__cjk_terms[char]
+            terms.remove(term)
+            if not terms:
+                del self.__cjk_terms[char]
+
+    def __invalidate(self):
+        self.__terms = None
+        self.__ranked = {}
+
+    def __expand(self, term: str, prefix: bool, fuzzy: bool) -> list:
+        """
+        :return: 查询词对应的索引词列表
+        """
+        postings = self.postings
+        candidates = {term} if term in postings else set()
+        if prefix:
+            candidates.update(self.__prefix_terms(term))
+        # 数字按原样匹配，不做模糊扩展（4321与4320是不同的编号）
+        if fuzzy and len(term) >= FUZZY_MIN_LENGTH and not term.isdigit():
+            candidates.update(self.__fuzzy_terms(term))
+        if len(term) == 1 and CJK_PATTERN.match(term):
+            # CJK文本按二字组索引，单个CJK字符匹配包含它的全部二字组
+            candidates.update(self.__cjk_char_terms(term))
+        return list(candidates)
+
+    def __intersect(self, expanded: list) -> dict:
+        """
+        :param expanded: 每个查询词对应的索引词列表
+        :return: {文档id: 得分}，得分为各查询词命中权重之和（一个查询词命中多个索引词时取最大权重）
+        """
+        postings = self.postings
+        groups = [[postings[term] for term in terms] for terms in expanded]
+        groups.sort(key=lambda group: sum(map(len, group)))
+        # 从文档最少的一组开始，依次用其余单个索引词的倒排表过滤（只遍历候选文档）
+        first = groups[0]
+        candidates = list(first[0]) if len(first) == 1 else list(set().union(*first))
+        for group in groups[1:]:
+            if len(group) == 1:
+                candidates = list(filter(group[0].__contains__, candidates))
+                if not candidates:
+                    return {}
+        # 逐组取出各候选文档的权重并求和，不在Python中逐个文档循环
+        vectors = []
+        required = []
+        for i, group in enumerate(groups):
+            if len(group) == 1:
+                vectors.append(map(group[0].__getitem__, candidates))
+            else:
+                values = list(map(max, zip(*[map(posting.get, candidates, itertools.repeat(0))
+                                             for posting in group])))
+                vectors.append(values)
+                if i > 0:
+                    # 未参与求交的组，权重为0的文档未命中该查询词
+                    required.append(values)
+        scores = zip(candidates, map(sum, zip(*vectors)))
+        if required:
+            return {doc_id: score for (doc_id, score), hit in zip(scores, map(all, zip(*required))) if hit}
+        return dict(scores)
+
+    def __ranked_docs(self, terms: list) -> tuple:
+        """
+        :return: (按权重从高到低、文档id从小到大排列的文档id列表, {文档id: 权重})
+        """
+        key = terms[0] if len(terms) == 1 else tuple(sorted(terms))
+        entry = self.__ranked.get(key)
+        if entry is None:
+            postings = self.postings
+            if len(terms) == 1:
+                weights = postings[terms[0]]
+            else:
+                weights = {}
+                for term in terms:
+                    for doc_id, weight in postings[term].items():
+                        if weights.get(doc_id, 0) < weight:
+                            weights[doc_id] = weight
+            ranked = sorted(weights)
+            ranked.sort(key=weights.__getitem__, reverse=True)
+            if len(self.__ranked) >= RANKED_CACHE_SIZE:
+                self.__ranked.clear()
+            entry = self.__ranked[key] = (ranked, weights)
+        return entry
+
+    def __cjk_char_terms(self, char: str) -> list:
+        return self.__cjk_terms.get(char, [])
+
+    def __prefix_terms(self, term: str) -> list:
+        if self.__terms is None:
+            self.__terms = sorted(self.postings)
+        terms = self.__terms
+        return terms[bisect.bisect_left(terms, term):bisect.bisect_left(terms, term + "\U0010ffff")]
+
+    def __fuzzy_terms(self, term: str) -> list:
+        candidates = set()
+        for d in _deletes(term):
+            candidates.update(self.__deletes.get(d, ()))
+        return [c for c in candidates if edit_distance(term, c, FUZZY_DISTANCE) <= FUZZY_DISTANCE]
+
+
+def _cjk_chars(term: str) -> tuple:
+    """
+    :return: CJK二字组中的字符（去重），其他词返回空元组
+    """
+    if len(term) != 2 or not CJK_PATTERN.match(term):
+        return ()
+    return (term[0],) if term[0] == term[1] else (term[0], term[1])
+
+
+def _file_state(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def open_index(index_path: str = None, paths: list = None, include=None, exclude=None) -> SearchIndex:
+    """
+    读取索引文件（不存在或无法读取时新建），与paths同步后保存
+    :param index_path: 索引文件路径，为None时只在内存中建立索引
+    :param paths: PDM文件路径列表，为空时不同步
+    """
+    index = None
+    if index_path is not None and os.path.exists(index_path):
+        try:
+            index = SearchIndex.load(index_path)
+        except Exception as e:
+            print("%s\t索引读取失败，重新建立: %s" % (index_path, e), file=sys.stderr)
+    if index is None:
+        index = SearchIndex()
+    if paths:
+        updated, removed = index.refresh(paths, include, exclude)
+        if index_path is not None and (updated or removed):
+            index.save(index_path)
+    return index
+
+
+def print_hits(hits: list):
+    for hit in hits:
+        print("%d\t%s" % (hit.score, hit))
+
+
+def main(argv: list = None) -> int:
+    """
+    等同于 pdm search，命令行参数见pdm_cli
+    """
+    from pdm_cli import main as cli_main
+
+    return cli_main(["search"] + list(sys.argv[1:] if argv is None else argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import io
+import mmap
+import os
+import zlib
+
+# 直接从内存映射或解压流读取的数据块大小，内存映射按切片传递不产生拷贝，可以取得较大
+SOURCE_CHUNK_SIZE = 1024 * 1024
+# 压缩格式的魔数
+GZIP_MAGIC = b"\x1f\x8b"
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+class PdmSource:
+    """
+    PDM数据源：文件路径、文件对象、mmap、bytes，以及.gz/.zip压缩包（按文件头识别，与扩展名无关）
+    以数据块的形式读出XML内容，不产生中间文件；普通文件通过mmap按切片读取，不拷贝数据
+    只关闭由自身打开的资源
+    size与position为读取进度：压缩包为.gz时按压缩数据计算，其余情况按解压后的XML内容计算
+
+    with PdmSource("model.pdm.gz") as source:
+        for chunk in source.chunks():
+            parser.Parse(chunk, False)
+    """
+
+    def __init__(self, source, member: str = None):
+        """
+        :param source: 文件路径、文件对象、mmap或bytes
+        :param member: zip压缩包中的文件名，默认取唯一的文件或第一个.pdm文件
+        """
+        self.source = source
+        self.member = member
+        # 数据总字节数（.gz为压缩后的字节数，其余为XML内容的字节数），未知时为None
+        self.size = None
+        # 已读取的字节数，与size单位相同
+        self.position = 0
+        self.__owned = []
+        self.__reader = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def open(self):
+        source = self.source
+        if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+            self.__open_buffer(source)
+        elif isinstance(source, (str, os.PathLike)):
+            f = open(source, "rb")
+            self.__owned.append(f)
+            self.__open_file(f)
+        elif hasattr(source, "read"):
+            self.__open_file(source)
+        else:
+            raise TypeError("不支持的PDM数据源: %s" % type(source).__name__)
+
+    def close(self):
+        self.__reader = None
+        while self.__owned:
+            self.__owned.pop().close()
+
+    def chunks(self, chunk_size: int = SOURCE_CHUNK_SIZE):
+        """
+        :param chunk_size: 数据块大小
+        :return: 数据块（bytes或memoryview）生成器
+        """
+        self.position = 0
+        return self.__reader(chunk_size)
+
+    def __counted(self, read):
+        def counted(chunk_size):
+            for data in read(chunk_size):
+                self.position += len(data)
+                yield data
+        return counted
+
+    def __open_buffer(self, buffer):
+        head = bytes(buffer[:4])
+        if head.startswith(GZIP_MAGIC):
+            self.size = len(buffer)
+            self.__reader = _gunzip_reader(self.__counted(_buffer_reader(buffer)))
+        elif head.startswith(ZIP_MAGIC):
+            self.__open_zip(io.BytesIO(buffer))
+        else:
+            self.size = len(buffer)
+            self.__reader = self.__counted(_buffer_reader(buffer))
+
+    def __open_file(self, f):
+        if isinstance(f, io.TextIOBase):
+            # 文本模式的文件对象，expat同样接受str
+            self.__reader = self.__counted(_file_reader(f))
+            return
+        prefix = b""
+        if _seekable(f):
+            position = f.tell()
+            head = f.read(4)
+            f.seek(position)
+        else:
+            # 不可回退的流：已读出的文件头在读取数据时重新拼接
+            head = prefix = f.read(4)
+        if head.startswith(GZIP_MAGIC):
+            # 解压后的大小只有读完才知道，进度按已读取的压缩数据计算
+            self.size = None if prefix else _remaining_size(f)
+            self.__reader = _gunzip_reader(self.__counted(_file_reader(f, prefix)))
+        elif head.startswith(ZIP_MAGIC):
+            if prefix:
+                raise ValueError("zip压缩包需要可随机访问的文件对象")
+            self.__open_zip(f)
+        else:
+            mm = None if prefix else _mmap(f)
+            if mm is not None:
+                self.__owned.append(mm)
+                self.size = len(mm)
+                self.__reader = self.__counted(_buffer_reader(mm))
+            else:
+                self.__reader = self.__counted(_file_reader(f, prefix))
+
+    def __open_zip(self, f):
+        # zipfile导入较慢，只在遇到zip压缩包时才导入
+        import zipfile
+        archive = zipfile.ZipFile(f)
+        self.__owned.append(archive)
+        info = self.__find_member(archive)
+        member = archive.open(info)
+        self.__owned.append(member)
+        self.size = info.file_size
+        self.__reader = self.__counted(_file_reader(member))
+
+    def __find_member(self, archive):
+        if self.member is not None:
+            return archive.getinfo(self.member)
+        files = [info for info in archive.infolist() if not info.is_dir()]
+        if len(files) == 1:
+            return files[0]
+        for info in files:
+            if info.filename.lower().endswith(".pdm"):
+                return info
+        raise ValueError("zip压缩包中没有找到.pdm文件")
+
+
+def _buffer_reader(buffer):
+    def read(chunk_size):
+        view = memoryview(buffer)
+        try:
+            for i in range(0, len(view), chunk_size):
+                chunk = view[i:i + chunk_size]
+                try:
+                    yield chunk
+                finally:
+                    # mmap关闭前必须释放所有切片
+                    chunk.release()
+        finally:
+            view.release()
+    return read
+
+
+def _file_reader(f, prefix=b""):
+    def read(chunk_size):
+        if prefix:
+            yield prefix
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield data
+    return read
+
+
+class GzipDecoder:
+    """
+    增量gzip解压，支持多成员gzip；数据可以按任意边界分块传入
+    与gzip模块一样忽略成员之间及末尾用于补齐的0字节
+    """
+
+    def __init__(self):
+        self.__decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+    def decode(self, data, chunk_size: int = SOURCE_CHUNK_SIZE):
+        """
+        :param data: 压缩数据块
+        :param chunk_size: 每次产出的解压数据不超过该大小
+        :return: 解压数据生成器
+        """
+        decompressor = self.__decompressor
+        while data:
+            if decompressor is None:
+                # 上一个成员已结束：跳过补齐的0字节，遇到非0字节时才开始下一个成员
+                data = bytes(data).lstrip(b"\0")
+                if not data:
+                    break
+                decompressor = self.__decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            out = decompressor.decompress(data, chunk_size)
+            if out:
+                yield out
+            if decompressor.eof:
+                data = decompressor.unused_data
+                decompressor = self.__decompressor = None
+            else:
+                data = decompressor.unconsumed_tail
+
+    def flush(self) -> bytes:
+        if self.__decompressor is None:
+            return b""
+        return self.__decompressor.flush()
+
+
+def _gunzip_reader(read_compressed):
+    def read(chunk_size):
+        decoder = GzipDecoder()
+        for data in read_compressed(chunk_size):
+            yield from decoder.decode(data, chunk_size)
+        out = decoder.flush()
+        if out:
+            yield out
+    return read
+
+
+def _seekable(f) -> bool:
+    try:
+        return f.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+def _remaining_size(f):
+    """
+    :return: 文件从当前位置到末尾的字节数，无法获取时返回None
+    """
+    try:
+        return os.fstat(f.fileno()).st_size - f.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _mmap(f):
+    try:
+        fileno = f.fileno()
+        position = f.tell()
+        size = os.fstat(fileno).st_size - position
+    except (AttributeError, OSError, ValueError):
+        return None
+    # 映射的起点必须按ALLOCATIONGRANULARITY对齐
+    if size <= 0 or position % mmap.ALLOCATIONGRANULARITY != 0:
+        return None
+    try:
+        mm = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ, offset=position)
+    except (OSError, ValueError):
+        return None
+    if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
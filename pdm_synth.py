@@ -0,0 +1,232 @@
+import argparse
+import random
+import sys
+from xml.sax.saxutils import escape
+
+# 合成字段使用的数据类型 -> (长度, 小数位数)（None表示不带长度）
+# 与PowerDesigner一致，DataType文本中同时带有长度与小数位数
+SYNTHETIC_DATA_TYPES = [
+    ("bigint", None, None),
+    ("int", None, None),
+    ("varchar(64)", 64, None),
+    ("varchar(255)", 255, None),
+    ("char(32)", 32, None),
+    ("datetime", None, None),
+    ("timestamp", None, None),
+    ("decimal(18,4)", 18, 4),
+    ("text", None, None),
+    ("tinyint", None, None),
+]
+
+# 字段名称/编码词表，各表之间重复使用，模拟真实模型中的公共字段
+SYNTHETIC_WORDS = ["user", "order", "item", "status", "amount", "price", "remark", "create", "update", "type",
+                   "name", "code", "level", "parent", "count", "flag", "address", "phone", "email", "region"]
+
+
+class SyntheticPdmWriter:
+    """
+    生成PowerDesigner物理模型结构的XML：表、字段、主键、索引、关联，以及图形、符号、扩展定义等与表结构无关的元素
+    """
+
+    def __init__(self, out, n_tables: int, n_columns: int, n_refs: int, noise: int = 2, seed: int = 1,
+                 packages: int = 0):
+        """
+        :param out: 可写的文本文件对象
+        :param n_tables: 表数量
+        :param n_columns: 每张表的字段数（含主键id），不含外键字段
+        :param n_refs: 表之间的关联数量，子表总是引用编号更小的主表，不产生循环；
+                       每个关联在子表中增加一个引用主表id的外键字段ref_<序号>_id
+        :param noise: 每张表对应的图形符号数量
+        :param seed: 随机种子
+        :param packages: 包数量，大于0时表依次平均分配到名为pkg_0、pkg_1……的包中
+        """
+        self.out = out
+        self.n_tables = n_tables
+        self.n_columns = max(1, n_columns)
+        self.n_refs = n_refs if n_tables > 1 else 0
+        self.noise = noise
+        self.packages = packages
+        self.rnd = random.Random(seed)
+        self.next_id = 1
+        self.table_ids = []
+        self.pk_column_ids = []
+        # 关联在生成表之前确定，子表需要写出对应的外键字段；使用单独的随机数序列，不影响表与字段的内容
+        ref_rnd = random.Random("%s:refs" % seed)
+        # [(子表序号, 主表序号)]
+        self.ref_pairs = []
+        for r in range(self.n_refs):
+            child = ref_rnd.randrange(1, n_tables)
+            self.ref_pairs.append((child, ref_rnd.randrange(0, child)))
+        # 子表序号 -> [关联序号]
+        self.child_refs = {}
+        for r, (child, parent) in enumerate(self.ref_pairs):
+            self.child_refs.setdefault(child, []).append(r)
+        # 关联序号 -> 外键字段id
+        self.fk_column_ids = {}
+
+    def write(self):
+        w = self.out.write
+        w('<?xml version="1.0" encoding="UTF-8"?>\n')
+        w('<?PowerDesigner AppLocale="UTF16" Code="SYNTHETIC" Name="Synthetic" Objects="%d" Symbols="%d" '
+          'Target="MySQL 5.0" Type="{CDE44E21-9669-11D1-9914-006097355D9B}" version="16.5.0.3982"?>\n' % (
+              self.n_tables * (self.n_columns + 2) + self.n_refs, self.n_tables * self.noise))
+        w('<Model xmlns:a="attribute" xmlns:c="collection" xmlns:o="object">\n')
+        w('<o:RootObject Id="%s">\n<c:Children>\n<o:Model Id="%s">\n' % (self.__new_id(), self.__new_id()))
+        w('<a:ObjectID>%s</a:ObjectID>\n<a:Name>Synthetic</a:Name>\n<a:Code>SYNTHETIC</a:Code>\n' % self.__object_id())
+        w('<a:CreationDate>1577808000</a:CreationDate>\n<a:Creator>synth</a:Creator>\n')
+        self.__write_noise_header()
+        if self.packages > 0:
+            self.__write_packages()
+        else:
+            w('<c:Tables>\n')
+            for i in range(self.n_tables):
+                self.__write_table(i)
+            w('</c:Tables>\n')
+        self.__write_references()
+        self.__write_diagrams()
+        w('</o:Model>\n</c:Children>\n</o:RootObject>\n</Model>\n')
+
+    def __new_id(self) -> str:
+        oid = "o%d" % self.next_id
+        self.next_id += 1
+        return oid
+
+    def __object_id(self) -> str:
+        return "%08X-%04X-%04X-%04X-%012X" % (self.rnd.getrandbits(32), self.rnd.getrandbits(16),
+                                              self.rnd.getrandbits(16), self.rnd.getrandbits(16),
+                                              self.rnd.getrandbits(48))
+
+    def __write_noise_header(self):
+        w = self.out.write
+        w('<c:DBMS>\n<o:Shortcut Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>MySQL 5.0</a:Name>\n'
+          '<a:Code>MYSQL50</a:Code>\n<a:TargetStereotype/>\n</o:Shortcut>\n</c:DBMS>\n' % (
+              self.__new_id(), self.__object_id()))
+        w('<c:ExtendedModelDefinitions>\n<o:Shortcut Id="%s">\n<a:Name>Synthetic Extension</a:Name>\n'
+          '<a:Code>SYNTHETIC_EXT</a:Code>\n<a:Comment>extension</a:Comment>\n</o:Shortcut>\n'
+          '</c:ExtendedModelDefinitions>\n' % self.__new_id())
+
+    def __write_packages(self):
+        w = self.out.write
+        per_package = -(-self.n_tables // self.packages)
+        w('<c:Packages>\n')
+        for p in range(self.packages):
+            w('<o:Package Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>包%d</a:Name>\n<a:Code>pkg_%d</a:Code>\n'
+              '<c:Tables>\n' % (self.__new_id(), self.__object_id(), p, p))
+            for i in range(p * per_package, min(self.n_tables, (p + 1) * per_package)):
+                self.__write_table(i)
+            w('</c:Tables>\n</o:Package>\n')
+        w('</c:Packages>\n')
+
+    def __write_table(self, i: int):
+        w = self.out.write
+        table_id = self.__new_id()
+        self.table_ids.append(table_id)
+        w('<o:Table Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>表%d</a:Name>\n<a:Code>t_table_%d</a:Code>\n'
+          '<a:CreationDate>1577808000</a:CreationDate>\n<a:Creator>synth</a:Creator>\n'
+          '<a:Comment>%s</a:Comment>\n' % (table_id, self.__object_id(), i, i, escape("第%d张表 <synthetic>" % i)))
+        w('<c:Columns>\n')
+        column_ids = []
+        for j in range(self.n_columns):
+            column_id = self.__new_id()
+            column_ids.append(column_id)
+            if j == 0:
+                name, code, data_type, length, scale = "编号", "id", "bigint", None, None
+            else:
+                word = SYNTHETIC_WORDS[self.rnd.randrange(len(SYNTHETIC_WORDS))]
+                data_type, length, scale = SYNTHETIC_DATA_TYPES[self.rnd.randrange(len(SYNTHETIC_DATA_TYPES))]
+                name, code = "%s字段%d" % (word, j), "%s_%d" % (word, j)
+            w('<o:Column Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>%s</a:Name>\n<a:Code>%s</a:Code>\n'
+              '<a:DataType>%s</a:DataType>\n' % (column_id, self.__object_id(), name, code, data_type))
+            if length is not None:
+                w('<a:Length>%d</a:Length>\n' % length)
+            if scale is not None:
+                w('<a:Precision>%d</a:Precision>\n' % scale)
+            if j == 0:
+                w('<a:Identity>1</a:Identity>\n<a:Column.Mandatory>1</a:Column.Mandatory>\n')
+            elif self.rnd.random() < 0.3:
+                w('<a:Comment>%s</a:Comment>\n' % escape("%s & 说明" % name))
+            w('</o:Column>\n')
+        for r in self.child_refs.get(i, ()):
+            column_id = self.fk_column_ids[r] = self.__new_id()
+            w('<o:Column Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>关联%d</a:Name>\n<a:Code>ref_%d_id</a:Code>\n'
+              '<a:DataType>bigint</a:DataType>\n</o:Column>\n' % (column_id, self.__object_id(), r, r))
+        w('</c:Columns>\n')
+        self.pk_column_ids.append(column_ids[0])
+
+        # 主键与索引中的字段、名称均为引用或同名属性，解析器不能把它们当作表的属性
+        key_id = self.__new_id()
+        w('<c:Keys>\n<o:Key Id="%s">\n<a:Name>Key_1</a:Name>\n<a:Code>Key_1</a:Code>\n'
+          '<c:Key.Columns>\n<o:Column Ref="%s"/>\n</c:Key.Columns>\n</o:Key>\n</c:Keys>\n' % (key_id, column_ids[0]))
+        w('<c:PrimaryKey>\n<o:Key Ref="%s"/>\n</c:PrimaryKey>\n' % key_id)
+        if len(column_ids) > 1:
+            w('<c:Indexes>\n<o:Index Id="%s">\n<a:Name>idx_%d</a:Name>\n<a:Code>idx_%d</a:Code>\n<c:IndexColumns>\n'
+              '<o:IndexColumn Id="%s">\n<c:Column>\n<o:Column Ref="%s"/>\n</c:Column>\n</o:IndexColumn>\n'
+              '</c:IndexColumns>\n</o:Index>\n</c:Indexes>\n' % (
+                  self.__new_id(), i, i, self.__new_id(), column_ids[1]))
+        w('</o:Table>\n')
+
+    def __write_references(self):
+        if not self.n_refs:
+            return
+        w = self.out.write
+        w('<c:References>\n')
+        for r, (child, parent) in enumerate(self.ref_pairs):
+            w('<o:Reference Id="%s">\n<a:ObjectID>%s</a:ObjectID>\n<a:Name>ref_%d</a:Name>\n<a:Code>ref_%d</a:Code>\n'
+              '<a:Cardinality>0..*</a:Cardinality>\n'
+              '<c:ParentTable>\n<o:Table Ref="%s"/>\n</c:ParentTable>\n'
+              '<c:ChildTable>\n<o:Table Ref="%s"/>\n</c:ChildTable>\n'
+              '<c:Joins>\n<o:ReferenceJoin Id="%s">\n<c:Object1>\n<o:Column Ref="%s"/>\n</c:Object1>\n'
+              '<c:Object2>\n<o:Column Ref="%s"/>\n</c:Object2>\n</o:ReferenceJoin>\n</c:Joins>\n</o:Reference>\n' % (
+                  self.__new_id(), self.__object_id(), r, r, self.table_ids[parent], self.table_ids[child],
+                  self.__new_id(), self.pk_column_ids[parent], self.fk_column_ids[r]))
+        w('</c:References>\n')
+
+    def __write_diagrams(self):
+        w = self.out.write
+        w('<c:PhysicalDiagrams>\n<o:PhysicalDiagram Id="%s">\n<a:Name>PhysicalDiagram_1</a:Name>\n'
+          '<a:Code>PhysicalDiagram_1</a:Code>\n<a:DisplayPreferences>[DisplayPreferences]\n'
+          'Trunc Length=40\nEnforce=Yes</a:DisplayPreferences>\n<c:Symbols>\n' % self.__new_id())
+        for i, table_id in enumerate(self.table_ids):
+            x, y = (i % 50) * 9000, (i // 50) * 6000
+            for k in range(self.noise):
+                w('<o:TableSymbol Id="%s">\n<a:Rect>((%d,%d), (%d,%d))</a:Rect>\n<a:LineColor>12615680</a:LineColor>\n'
+                  '<a:FillColor>16570034</a:FillColor>\n<a:FontList>STRN 0 新宋体,8,N</a:FontList>\n'
+                  '<c:Object>\n<o:Table Ref="%s"/>\n</c:Object>\n</o:TableSymbol>\n' % (
+                      self.__new_id(), x, y, x + 8000, y + 5000 + k, table_id))
+        w('</c:Symbols>\n</o:PhysicalDiagram>\n</c:PhysicalDiagrams>\n')
+
+
+def write_synthetic_pdm(pdm_path: str, n_tables: int, n_columns: int = 20, n_refs: int = None, noise: int = 2,
+                        seed: int = 1, packages: int = 0):
+    """
+    生成合成PDM文件
+    :param pdm_path: 输出路径
+    :param n_tables: 表数量
+    :param n_columns: 每张表的字段数
+    :param n_refs: 关联数量，默认与表数量相同
+    :param noise: 每张表对应的图形符号数量
+    :param seed: 随机种子，相同参数与种子生成的文件内容相同
+    :param packages: 包数量，0表示所有表直接位于模型下
+    """
+    if n_refs is None:
+        n_refs = n_tables
+    with open(pdm_path, "w", encoding="utf-8") as f:
+        SyntheticPdmWriter(f, n_tables, n_columns, n_refs, noise, seed, packages).write()
+
+
+def main(argv: list = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="生成合成PDM文件")
+    arg_parser.add_argument("path", help="输出路径")
+    arg_parser.add_argument("--tables", type=int, default=1000, help="表数量")
+    arg_parser.add_argument("--columns", type=int, default=20, help="每张表的字段数")
+    arg_parser.add_argument("--refs", type=int, default=None, help="关联数量，默认与表数量相同")
+    arg_parser.add_argument("--noise", type=int, default=2, help="每张表对应的图形符号数量")
+    arg_parser.add_argument("--seed", type=int, default=1, help="随机种子")
+    arg_parser.add_argument("--packages", type=int, default=0, help="包数量")
+    args = arg_parser.parse_args(argv)
+    write_synthetic_pdm(args.path, args.tables, args.columns, args.refs, args.noise, args.seed, args.packages)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
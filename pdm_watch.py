@@ -0,0 +1,214 @@
+import argparse
+import os
+import sys
+import time
+
+from pdm_parser import parse_pdm
+from pymodel import FILE_PREFIX, generate_table_pymodel
+from schema_diff import table_fingerprint
+from sql_generator import DbType, generate_table_sql
+
+# 检查文件变化的间隔（秒）
+POLL_INTERVAL = 0.5
+# 文件停止变化多久后才重新解析（秒），避免在保存过程中读到不完整的文件
+DEBOUNCE_DELAY = 0.3
+SQL_DIR = "sql"
+PYMODEL_DIR = "pymodel"
+PYMODEL_BASE = "base"
+
+
+class PdmWatcher:
+    """
+    监视PDM文件，变化后重新解析，只重新生成并写入指纹发生变化的表对应的文件：
+        out_dir/sql/<表编码>.sql          单表建表语句
+        out_dir/pymodel/<表编码>.py       单表模型类
+        out_dir/pymodel/base.py          BaseModel等公共代码
+        out_dir/pymodel/__init__.py      导入全部模型类
+    内容与磁盘上已有文件相同时不写入，已删除的表对应的文件随之删除
+    单张表的建表语句或模型类生成失败时，对应文件只写入注释说明，记录在errors中，其余表照常生成
+    """
+
+    def __init__(self, pdm_path: str, out_dir: str, db_type: DbType = DbType.MYSQL, table_prefix: str = None,
+                 ignore_columns: list = None, slots: bool = False, include=None, exclude=None):
+        """
+        :param pdm_path: PDM文件路径
+        :param out_dir: 输出目录
+        :param db_type: 建表语句的数据库类型
+        :param table_prefix: 表前缀（不加入到类名中）
+        :param ignore_columns: 不生成到模型类中的字段
+        :param slots: 生成__slots__模型类
+        :param include: 只处理匹配的表，同parse_pdm
+        :param exclude: 不处理匹配的表，同parse_pdm
+        """
+        self.pdm_path = pdm_path
+        self.out_dir = out_dir
+        self.db_type = db_type
+        self.table_prefix = table_prefix
+        self.ignore_columns = ignore_columns
+        self.slots = slots
+        self.include = include
+        self.exclude = exclude
+        # 表编码(小写) -> 上次生成时的表指纹
+        self.fingerprints = {}
+        # 表编码(小写) -> 生成失败的原因列表，表未变化时保留上次的结果
+        self.errors = {}
+        self.file_state = None
+
+    def build(self) -> tuple:
+        """
+        解析一次并更新输出
+        :return: (重新生成的表编码列表, 删除的表编码列表)
+        """
+        tables = parse_pdm(self.pdm_path, include=self.include, exclude=self.exclude)
+        sql_dir = os.path.join(self.out_dir, SQL_DIR)
+        py_dir = os.path.join(self.out_dir, PYMODEL_DIR)
+        os.makedirs(sql_dir, exist_ok=True)
+        os.makedirs(py_dir, exist_ok=True)
+        if not self.fingerprints:
+            _write_if_changed(os.path.join(py_dir, PYMODEL_BASE + ".py"), FILE_PREFIX)
+
+        fingerprints = {}
+        errors = {}
+        changed = []
+        for table in tables:
+            code = table.code.lower()
+            fingerprint = table_fingerprint(table)
+            fingerprints[code] = fingerprint
+            if self.fingerprints.get(code) == fingerprint:
+                if code in self.errors:
+                    errors[code] = self.errors[code]
+                continue
+            changed.append(code)
+            try:
+                sql = generate_table_sql(table, self.db_type)
+            except Exception as e:
+                message = "%s表创建语句生成失败: %s" % (table.code, str(e))
+                errors.setdefault(code, []).append(message)
+                sql = "-- %s\n" % message
+            _write_if_changed(os.path.join(sql_dir, code + ".sql"), sql)
+            try:
+                py = "from .%s import *\n\n\n%s" % (PYMODEL_BASE, generate_table_pymodel(
+                    table, self.table_prefix, self.ignore_columns, self.slots))
+            except Exception as e:
+                message = "%s模型类生成失败: %s" % (table.code, str(e))
+                errors.setdefault(code, []).append(message)
+                py = "# %s\n" % message
+            _write_if_changed(os.path.join(py_dir, code + ".py"), py)
+
+        removed = [code for code in self.fingerprints if code not in fingerprints]
+        for code in removed:
+            _remove(os.path.join(sql_dir, code + ".sql"))
+            _remove(os.path.join(py_dir, code + ".py"))
+        if removed or fingerprints.keys() != self.fingerprints.keys():
+            _write_if_changed(os.path.join(py_dir, "__init__.py"),
+                              "".join("from .%s import *\n" % code for code in sorted(fingerprints)))
+        self.fingerprints = fingerprints
+        self.errors = errors
+        return changed, removed
+
+    def poll(self, debounce: float = DEBOUNCE_DELAY) -> bool:
+        """
+        检查文件是否变化，变化后等待文件稳定
+        :return: 文件是否变化
+        """
+        state = _file_state(self.pdm_path)
+        if state is None or state == self.file_state:
+            return False
+        # 等待保存完成：连续debounce秒内没有再变化
+        while True:
+            time.sleep(debounce)
+            current = _file_state(self.pdm_path)
+            if current == state:
+                break
+            state = current
+        self.file_state = state
+        return state is not None
+
+    def watch(self, interval: float = POLL_INTERVAL, debounce: float = DEBOUNCE_DELAY, log=None):
+        """
+        持续监视，直到被中断；解析失败（如文件正在保存）时保留上次的输出，等待下一次变化
+        :param interval: 检查间隔（秒）
+        :param debounce: 防抖延迟（秒）
+        :param log: 日志输出函数，默认输出到stderr
+        """
+        if log is None:
+            def log(message):
+                print(message, file=sys.stderr)
+        while True:
+            if self.poll(debounce):
+                start = time.perf_counter()
+                try:
+                    changed, removed = self.build()
+                except Exception as e:
+                    log("%s\t解析失败: %s: %s" % (self.pdm_path, type(e).__name__, e))
+                else:
+                    log("%s\t更新%d张表, 删除%d张表, 耗时%.2fs" % (
+                        self.pdm_path, len(changed), len(removed), time.perf_counter() - start))
+                    for code in changed:
+                        for message in self.errors.get(code, ()):
+                            log("%s\t%s" % (self.pdm_path, message))
+            time.sleep(interval)
+
+
+def _file_state(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _write_if_changed(path: str, content: str):
+    data = content.encode("utf-8")
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    except FileNotFoundError:
+        pass
+    tmp = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def main(argv: list = None) -> int:
+    arg_parser = argparse.ArgumentParser(description="监视PDM文件，增量生成建表语句与Python模型")
+    arg_parser.add_argument("path", help="PDM文件路径")
+    arg_parser.add_argument("-o", "--out", required=True, help="输出目录")
+    arg_parser.add_argument("--db", default=DbType.MYSQL.name, choices=[t.name for t in DbType], help="数据库类型")
+    arg_parser.add_argument("--prefix", default=None, help="表前缀（不加入到类名中）")
+    arg_parser.add_argument("--ignore", action="append", default=None, help="不生成到模型类中的字段，可重复指定")
+    arg_parser.add_argument("--slots", action="store_true", help="生成__slots__模型类")
+    arg_parser.add_argument("-i", "--include", action="append", default=None, help="只处理匹配的表，可重复指定")
+    arg_parser.add_argument("-x", "--exclude", action="append", default=None, help="不处理匹配的表，可重复指定")
+    arg_parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="检查间隔（秒）")
+    arg_parser.add_argument("--debounce", type=float, default=DEBOUNCE_DELAY, help="防抖延迟（秒）")
+    arg_parser.add_argument("--once", action="store_true", help="只生成一次，不持续监视")
+    args = arg_parser.parse_args(argv)
+
+    watcher = PdmWatcher(args.path, args.out, DbType[args.db], args.prefix, args.ignore, args.slots,
+                         args.include, args.exclude)
+    if args.once:
+        changed, removed = watcher.build()
+        print("%s\t生成%d张表" % (args.path, len(changed)))
+        for messages in watcher.errors.values():
+            for message in messages:
+                print("%s\t%s" % (args.path, message), file=sys.stderr)
+        return 1 if watcher.errors else 0
+    try:
+        watcher.watch(args.interval, args.debounce)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
+import io
 from enum import Enum
 
-from model import Table, Column
+from model import Table, Column, PdmColumnType
 
 
 class PyType(Enum):
@@ -43,66 +44,334 @@ class PdmToPyColumnType(Enum):
     LONGTEXT = (24, PyType.STR)
 
 
+# PdmColumnType -> PyType，生成时按字段类型直接取用；无法识别的字段类型按STR处理
+PY_COLUMN_TYPES = {pdm_type: PdmToPyColumnType[name].value[1] for name, pdm_type in PdmColumnType.__members__.items()}
+
+
 BASE_MODEL_CLASS = "BaseModel"
-FILE_PREFIX = """import time
+FILE_PREFIX = """import functools
+import threading
+import time
 
 
+@functools.lru_cache(maxsize=65536)
 def format_timestamp(t: int):
     if t is None:
         return None
+    if not isinstance(t, (int, float)):
+        # 数据库驱动返回的datetime、字符串等保持原样
+        return t
     localTime = time.localtime(t)
     return time.strftime("%Y-%m-%d %H:%M:%S", localTime)
 
 
+def sql_value(v) -> str:
+    if v is None:
+        return "NULL"
+    if isinstance(v, bool):
+        return "1" if v else "0"
+    if isinstance(v, (int, float)):
+        return repr(v)
+    return "'%s'" % str(v).replace("\\\\", "\\\\\\\\").replace("'", "''")
+
+
+# DB-API paramstyle -> 占位符
+PLACEHOLDERS = {
+    "qmark": lambda i: "?",
+    "format": lambda i: "%s",
+    "pyformat": lambda i: "%s",
+    "numeric": lambda i: ":%d" % (i + 1),
+}
+
+
 class BaseModel:
+    # 声明__slots__后，未声明__slots__的子类仍然使用__dict__
+    __slots__ = ("id",)
     table_name = None
+    # 字段名元组，由生成的子类在类定义时给出
+    columns = ()
+    # 构造参数顺序的字段名元组，from_row按此顺序取值
+    fields = ()
     id_sequence = 0
+    id_lock = threading.Lock()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # 每个类只拼接一次字段列表
+        cls.column_sql = "(%s)" % ", ".join(cls.columns)
+        cls.select_sql = "SELECT %s FROM %s" % (", ".join(cls.columns), cls.table_name)
+        # 结果列名元组 -> 加载函数，见row_loader
+        cls.row_loaders = {}
 
     def __init__(self):
-        self.__class__.id_sequence += 1
-        self.id = self.__class__.id_sequence
+        with BaseModel.id_lock:
+            self.__class__.id_sequence += 1
+            self.id = self.__class__.id_sequence
+
+    def get_values(self) -> tuple:
+        return tuple([getattr(self, c) for c in self.__class__.columns])
+
+    def get_values_sql(self) -> str:
+        return "(%s)" % ", ".join([sql_value(v) for v in self.get_values()])
 
     def get_insert_sql(self):
-        attrs = self.__dict__
-        keys = str(tuple(attrs.keys())).replace("'", "")
-        vals = str(tuple(attrs.values())).replace("None", "NULL")
-        return "INSERT INTO %s %s VALUE %s;" % (self.__class__.table_name, keys, vals)
+        return "INSERT INTO %s %s VALUE %s;" % (self.__class__.table_name, self.__class__.column_sql,
+                                                self.get_values_sql())
+
+    @classmethod
+    def from_row(cls, row):
+        \"\"\"
+        由按fields顺序排列的一行数据构造对象
+        \"\"\"
+        return cls(*row)
+
+    @classmethod
+    def from_rows(cls, rows) -> list:
+        return [cls(*row) for row in rows]
+
+    @classmethod
+    def row_loader(cls, names):
+        \"\"\"
+        按结果列名生成批量构造对象的函数，列顺序只解析一次，同一组列名复用同一个函数
+        构造时不调用__init__：不占用id_sequence，时间字段保存数据库返回的原值（__slots__类读取时再格式化）
+        结果中不属于该类的列被忽略，结果中没有id列时id为None
+        :param names: 结果列名，如cursor.description中的列名
+        :return: 函数(rows) -> 对象列表
+        \"\"\"
+        names = tuple(name.lower() for name in names)
+        loader = cls.row_loaders.get(names)
+        if loader is None:
+            loader = cls.row_loaders[names] = cls.__build_row_loader(names)
+        return loader
+
+    @classmethod
+    def __build_row_loader(cls, names: tuple):
+        known = set(cls.columns) | set(cls.fields)
+        targets = []
+        for name in names:
+            if name not in known:
+                targets.append("_")
+            elif isinstance(getattr(cls, name, None), property):
+                # __slots__类的时间字段以"_字段名"保存原值
+                targets.append("obj._" + name)
+            else:
+                targets.append("obj." + name)
+        # 每行只做一次元组解包赋值，不逐列调用setattr
+        lines = ["def load(rows):",
+                 "    result = []",
+                 "    append = result.append",
+                 "    for row in rows:",
+                 "        obj = new(cls)"]
+        if targets:
+            lines.append("        %s, = row" % ", ".join(targets))
+        if "id" not in names:
+            lines.append("        obj.id = None")
+        lines.append("        append(obj)")
+        lines.append("    return result")
+        namespace = {"new": object.__new__, "cls": cls}
+        exec("\\n".join(lines), namespace)
+        return namespace["load"]
+
+    @classmethod
+    def from_cursor(cls, cursor) -> list:
+        \"\"\"
+        读取游标中的全部结果并构造对象，见row_loader
+        \"\"\"
+        return cls.row_loader([d[0] for d in cursor.description])(cursor.fetchall())
+
+    @classmethod
+    def iter_chunks(cls, cursor, size: int = 1000):
+        \"\"\"
+        每次以cursor.fetchmany读取size行，产出对象列表，内存占用与结果集大小无关
+        \"\"\"
+        load = cls.row_loader([d[0] for d in cursor.description])
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                break
+            yield load(rows)
+
+    @classmethod
+    def iter_cursor(cls, cursor, size: int = 1000):
+        \"\"\"
+        同iter_chunks，逐个产出对象
+        \"\"\"
+        for objs in cls.iter_chunks(cursor, size):
+            yield from objs
+
+    @classmethod
+    def query(cls, conn, where: str = None, params=(), size: int = 1000):
+        \"\"\"
+        查询该表的全部字段，逐个产出对象
+        :param conn: DB-API连接
+        :param where: WHERE之后的条件，可包含驱动paramstyle的占位符
+        :param params: 占位符参数
+        :param size: 每次fetchmany的行数
+        \"\"\"
+        sql = cls.select_sql if where is None else "%s WHERE %s" % (cls.select_sql, where)
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, params)
+            yield from cls.iter_cursor(cursor, size)
+        finally:
+            cursor.close()
+
+    @classmethod
+    def get_bulk_insert_sqls(cls, objs, chunk_size: int = 1000):
+        \"\"\"
+        生成多行INSERT语句，每条语句最多包含chunk_size行
+        \"\"\"
+        prefix = "INSERT INTO %s %s VALUES\\n" % (cls.table_name, cls.column_sql)
+        rows = []
+        for obj in objs:
+            rows.append(obj.get_values_sql())
+            if len(rows) >= chunk_size:
+                yield prefix + ",\\n".join(rows) + ";"
+                rows = []
+        if rows:
+            yield prefix + ",\\n".join(rows) + ";"
+
+    @classmethod
+    def get_insert_template(cls, paramstyle: str = "format") -> str:
+        placeholder = PLACEHOLDERS[paramstyle]
+        return "INSERT INTO %s %s VALUES (%s)" % (
+            cls.table_name, cls.column_sql, ", ".join([placeholder(i) for i in range(len(cls.columns))]))
+
+    @classmethod
+    def executemany(cls, conn, objs, paramstyle: str = "format", chunk_size: int = 1000) -> int:
+        \"\"\"
+        通过DB-API连接参数化批量插入，每chunk_size行调用一次cursor.executemany
+        :param conn: DB-API连接
+        :param objs: 对象序列
+        :param paramstyle: 驱动的paramstyle（如sqlite3为qmark，pymysql为format）
+        :param chunk_size: 每批行数
+        :return: 插入行数
+        \"\"\"
+        sql = cls.get_insert_template(paramstyle)
+        cursor = conn.cursor()
+        count = 0
+        try:
+            rows = []
+            for obj in objs:
+                rows.append(obj.get_values())
+                if len(rows) >= chunk_size:
+                    cursor.executemany(sql, rows)
+                    count += len(rows)
+                    rows = []
+            if rows:
+                cursor.executemany(sql, rows)
+                count += len(rows)
+        finally:
+            cursor.close()
+        return count
 
 
 """
 
 
-def generate_pymodel(tables: list, table_prefix: str = None, ignore_columns: list = None) -> str:
-    content = FILE_PREFIX
+def generate_pymodel(tables: list, table_prefix: str = None, ignore_columns: list = None,
+                     slots: bool = False) -> str:
+    out = io.StringIO()
+    write_pymodel(tables, out, table_prefix, ignore_columns, slots)
+    return out.getvalue()
+
+
+def write_pymodel(tables, out, table_prefix: str = None, ignore_columns: list = None, slots: bool = False):
+    """
+    逐表将模型类代码写入out
+    :param tables: 表列表（可以是iter_pdm_tables等生成器）
+    :param out: 可写的文本文件对象
+    :param table_prefix: 表前缀（不加入到类名中）
+    :param ignore_columns: 不生成的字段
+    :param slots: 生成__slots__类，时间字段在读取时才格式化
+    """
+    ignore_columns = [] if ignore_columns is None else [c.lower() for c in ignore_columns]
+    out.write(FILE_PREFIX)
     for table in tables:
-        try:
-            content += __generate_pymodel(table, table_prefix, BASE_MODEL_CLASS, ignore_columns) + "\n\n"
-        except Exception as e:
-            # print("-- %s表创建语句生成失败: %s\n\n" % (table.code, str(e)))
-            pass
-    return content
+        # 生成失败时直接抛出，不能输出缺少部分模型类的文件；每张表的代码完整生成后才写入
+        out.write(__generate_pymodel(table, table_prefix, BASE_MODEL_CLASS, ignore_columns, slots) + "\n\n")
+
+
+def generate_table_pymodel(table: Table, table_prefix: str = None, ignore_columns: list = None,
+                           slots: bool = False) -> str:
+    """
+    生成单张表的模型类代码（不含FILE_PREFIX），类继承自BaseModel
+    :param table: 表
+    :param table_prefix: 表前缀（不加入到类名中）
+    :param ignore_columns: 不生成的字段
+    :param slots: 生成__slots__类
+    :return: 类代码
+    """
+    ignore_columns = [] if ignore_columns is None else [c.lower() for c in ignore_columns]
+    return __generate_pymodel(table, table_prefix, BASE_MODEL_CLASS, ignore_columns, slots)
 
 
 def __generate_pymodel(table: Table, table_prefix: str = None, base_class: str = None,
-                       ignore_columns: list = None) -> str:
+                       ignore_columns: list = None, slots: bool = False) -> str:
     if ignore_columns is None:
         ignore_columns = []
-    else:
-        ignore_columns = [c.lower() for c in ignore_columns]
+    columns = [col for col in table.columns if col.code.lower() not in ignore_columns]
     clz_name = __build_py_class_name(table.code, table_prefix)
     content = "# %s\n" % table.name
     content += "class %s%s:\n" % (clz_name, "" if base_class is None else "(" + base_class + ")")
-    content += '\ttable_name = "%s"\n\n' % table.code.lower()
+    if slots:
+        content += "\t__slots__ = %s\n" % __build_tuple_code(
+            [__build_slot_name(col) for col in columns if col.code.lower() != "id"])
+    content += '\ttable_name = "%s"\n' % table.code.lower()
+    # id由BaseModel分配，始终排在最前（即使被ignore_columns忽略）
+    content += "\tcolumns = %s\n" % __build_tuple_code(
+        ["id"] + [col.code.lower() for col in columns if col.code.lower() != "id"])
+    content += "\tfields = %s\n\n" % __build_tuple_code([col.code.lower() for col in columns])
     content += "\tdef __init__(self, "
-    for col in table.columns:
-        if col.code.lower() not in ignore_columns:
-            content += __build_init_arg_code(col) + ", "
+    for col in columns:
+        content += __build_init_arg_code(col) + ", "
     content = content[:-2] + "):\n"
     if base_class is not None:
         content += "\t\t%s.__init__(self)\n" % base_class
-    for col in table.columns:
-        if col.code.lower() not in ignore_columns:
+    for col in columns:
+        if slots:
+            content += "\t\tself.%s = %s\n" % (__build_slot_name(col), col.code.lower())
+        else:
             content += "\t\t" + __build_init_assign_code(col) + "\n"
+    if slots:
+        for col in columns:
+            if __is_time_column(col):
+                content += __build_time_property_code(col)
+    return content
+
+
+def __build_tuple_code(names: list) -> str:
+    if len(names) == 1:
+        return '("%s",)' % names[0]
+    return "(%s)" % ", ".join('"%s"' % c for c in names)
+
+
+def __py_type(column: Column) -> PyType:
+    return PY_COLUMN_TYPES.get(column.col_type, PyType.STR)
+
+
+def __is_time_column(column: Column) -> bool:
+    return __py_type(column) == PyType.TIME
+
+
+def __build_slot_name(column: Column) -> str:
+    """
+    __slots__模式下时间字段以"_字段名"保存原始时间戳，同名属性读取时再格式化
+    """
+    code = column.code.lower()
+    return "_" + code if __is_time_column(column) and code != "id" else code
+
+
+def __build_time_property_code(column: Column) -> str:
+    code = column.code.lower()
+    if code == "id":
+        return ""
+    content = "\n\t@property\n"
+    content += "\tdef %s(self):\n" % code
+    content += "\t\treturn format_timestamp(self._%s)\n" % code
+    content += "\n\t@%s.setter\n" % code
+    content += "\tdef %s(self, value):\n" % code
+    content += "\t\tself._%s = value\n" % code
     return content
 
 
@@ -127,13 +396,13 @@ def __build_py_class_name(table_name: str, table_prefix: str = None) -> str:
 
 
 def __build_init_arg_code(column: Column) -> str:
-    pyType = PdmToPyColumnType[column.col_type._name_].value[1]
+    pyType = __py_type(column)
     return column.code.lower() + ": " + pyType.value[1] + " = None"
 
 
 def __build_init_assign_code(column: Column) -> str:
     content = "self.%s = " % column.code.lower()
-    pyType = PdmToPyColumnType[column.col_type._name_].value[1]
+    pyType = __py_type(column)
     if pyType == PyType.TIME:
         content += "format_timestamp(%s)" % column.code.lower()
     else:
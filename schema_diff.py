@@ -0,0 +1,171 @@
+import io
+
+from model import Table, table_fingerprint, column_fingerprint
+from sql_generator import DbType, write_table_sql, column_definition, drop_table_sql, quote_name, table_code, \
+    column_code, table_comment_sql, column_comment_sql, escape
+
+
+class TableDiff:
+    def __init__(self, old: Table, new: Table):
+        self.old = old
+        self.new = new
+        self.added_columns = []
+        self.dropped_columns = []
+        # [(旧字段, 新字段)]
+        self.modified_columns = []
+        self.comment_changed = old.comment != new.comment
+        # 主键字段编码（小写，按字段顺序）
+        self.old_pk = [c.code.lower() for c in old.columns if c.code is not None and c.pk]
+        self.new_pk = [c.code.lower() for c in new.columns if c.code is not None and c.pk]
+
+    @property
+    def pk_changed(self) -> bool:
+        return self.old_pk != self.new_pk
+
+    def is_empty(self) -> bool:
+        return not (self.added_columns or self.dropped_columns or self.modified_columns or self.comment_changed
+                    or self.pk_changed)
+
+
+class SchemaDiff:
+    def __init__(self):
+        self.added_tables = []
+        self.dropped_tables = []
+        self.changed_tables = []
+
+
+def diff_tables(old_tables: list, new_tables: list) -> SchemaDiff:
+    """
+    比较两个版本的模型，表、字段均按编码（不区分大小写）对应
+    先比较表指纹，只有指纹不同的表才逐字段比较
+    :param old_tables: 旧版本表列表
+    :param new_tables: 新版本表列表
+    :return: SchemaDiff
+    """
+    diff = SchemaDiff()
+    old_map = {t.code.lower(): t for t in old_tables}
+    new_codes = set()
+    for new in new_tables:
+        code = new.code.lower()
+        new_codes.add(code)
+        old = old_map.get(code)
+        if old is None:
+            diff.added_tables.append(new)
+        elif table_fingerprint(old) != table_fingerprint(new):
+            table_diff = __diff_columns(old, new)
+            if not table_diff.is_empty():
+                diff.changed_tables.append(table_diff)
+    for old in old_tables:
+        if old.code.lower() not in new_codes:
+            diff.dropped_tables.append(old)
+    return diff
+
+
+def generate_alter_sql(old_tables: list, new_tables: list, db_type: DbType) -> str:
+    """
+    生成从旧版本升级到新版本的增量SQL
+    :param old_tables: 旧版本表列表
+    :param new_tables: 新版本表列表
+    :param db_type: 数据库类型
+    :return: SQL脚本
+    """
+    out = io.StringIO()
+    write_alter_sql(diff_tables(old_tables, new_tables), db_type, out)
+    return out.getvalue()
+
+
+def write_alter_sql(diff: SchemaDiff, db_type: DbType, out):
+    """
+    将增量SQL写入out：新增表建表，删除表删表，变更表只输出ALTER TABLE语句
+    主键变化时先删除旧主键，字段变更完成后再添加新主键
+    :param diff: diff_tables的结果
+    :param db_type: 数据库类型
+    :param out: 可写的文本文件对象
+    """
+    write = out.write
+    for table in diff.dropped_tables:
+        write(drop_table_sql(db_type, quote_name(db_type, table_code(db_type, table))))
+        write("\n")
+    for table in diff.added_tables:
+        write_table_sql(table, db_type, out, drop=False)
+        write("\n")
+    for table_diff in diff.changed_tables:
+        table = table_diff.new
+        table_name = quote_name(db_type, table_code(db_type, table))
+        write("-- ----------------------------\n")
+        write("-- Alter table %s\n" % table.code.lower())
+        write("-- ----------------------------\n")
+        if table_diff.pk_changed and table_diff.old_pk:
+            write(__drop_primary_key_sql(db_type, table_name))
+        for col in table_diff.dropped_columns:
+            write("ALTER TABLE %s DROP COLUMN %s;\n" % (table_name, quote_name(db_type, column_code(db_type, col))))
+        for col in table_diff.added_columns:
+            write(__alter_column_sql(db_type, table_name, None, col))
+            write(column_comment_sql(db_type, table, col))
+        for old, new in table_diff.modified_columns:
+            comment_changed = old.name != new.name or old.comment != new.comment
+            # 只有主键标记变化时不修改字段，MySQL的字段注释包含在字段定义中
+            if (__column_type_key(old) != __column_type_key(new) or bool(old.not_null) != bool(new.not_null)
+                    or (comment_changed and db_type == DbType.MYSQL)):
+                write(__alter_column_sql(db_type, table_name, old, new))
+            if comment_changed:
+                write(column_comment_sql(db_type, table, new, update=True))
+        if table_diff.pk_changed and table_diff.new_pk:
+            pk_columns = [c for c in table.columns if c.code is not None and c.pk]
+            write("ALTER TABLE %s ADD PRIMARY KEY (%s);\n" % (table_name, ", ".join(
+                quote_name(db_type, column_code(db_type, c)) for c in pk_columns)))
+        if table_diff.comment_changed:
+            write(table_comment_sql(db_type, table, update=table_diff.old.comment is not None))
+        write("\n")
+
+
+def __diff_columns(old: Table, new: Table) -> TableDiff:
+    table_diff = TableDiff(old, new)
+    # 没有编码的字段无法对应，与解析器一样跳过
+    old_cols = {c.code.lower(): c for c in old.columns if c.code is not None}
+    new_codes = set()
+    for col in new.columns:
+        if col.code is None:
+            continue
+        code = col.code.lower()
+        new_codes.add(code)
+        old_col = old_cols.get(code)
+        if old_col is None:
+            table_diff.added_columns.append(col)
+        elif column_fingerprint(old_col) != column_fingerprint(col):
+            table_diff.modified_columns.append((old_col, col))
+    for code, col in old_cols.items():
+        if code not in new_codes:
+            table_diff.dropped_columns.append(col)
+    return table_diff
+
+
+def __column_type_key(col) -> tuple:
+    return col.col_type, col.col_length, col.col_scale
+
+
+def __drop_primary_key_sql(db_type: DbType, table_name: str) -> str:
+    if db_type == DbType.SQLSERVER:
+        # SQL Server只能按约束名删除主键，约束名由数据库生成，需要先查出来
+        return ("EXEC(N'DECLARE @pk sysname; SELECT @pk = QUOTENAME(name) FROM sys.key_constraints "
+                "WHERE type = ''PK'' AND parent_object_id = OBJECT_ID(N''%s''); "
+                "IF @pk IS NOT NULL EXEC(N''ALTER TABLE %s DROP CONSTRAINT '' + @pk);');\n") % (
+            escape(escape(table_name)), escape(escape(table_name)))
+    return "ALTER TABLE %s DROP PRIMARY KEY;\n" % table_name
+
+
+def __alter_column_sql(db_type: DbType, table_name: str, old, col) -> str:
+    """
+    新增（old为None）或修改字段的语句，主键约束由write_alter_sql统一处理
+    """
+    add = old is None
+    # Oracle的NULL/NOT NULL只在变化时声明
+    nullable = add or db_type != DbType.ORACLE or bool(old.not_null) != bool(col.not_null)
+    definition = column_definition(db_type, col, pk=False, nullable=nullable).strip()
+    if db_type == DbType.MYSQL:
+        return "ALTER TABLE %s %s COLUMN %s;\n" % (table_name, "ADD" if add else "MODIFY", definition)
+    if db_type == DbType.ORACLE:
+        return "ALTER TABLE %s %s (%s);\n" % (table_name, "ADD" if add else "MODIFY", definition)
+    if db_type == DbType.SQLSERVER:
+        return "ALTER TABLE %s %s %s;\n" % (table_name, "ADD" if add else "ALTER COLUMN", definition)
+    return "ALTER TABLE %s %s COLUMN %s;\n" % (table_name, "ADD" if add else "ALTER", definition)
@@ -1,3 +1,4 @@
+import io
 from enum import Enum
 
 from model import Table, PdmColumnType
@@ -46,57 +47,390 @@ class PdmToMySqlColumnType(Enum):
         return self._name_
 
 
-def generate_sql(tables: list, db_type: DbType) -> str:
-    if db_type == DbType.MYSQL:
-        content = ""
-        for table in tables:
-            content += generate_sql(table, db_type) + "\n\n"
-        return content
-    raise Exception("不支持数据库类型")
+class PdmToOracleColumnType(Enum):
+    """
+    PDM与Oracle字段类型映射
+    """
+    BYTE = ("NUMBER", 3)
+    TINYINT = ("NUMBER", 3)
+    SMALLINT = ("NUMBER", 5)
+    MEDIUMINT = ("NUMBER", 7)
+    INT = ("NUMBER", 10)
+    INTEGER = ("NUMBER", 10)
+    BIGINT = ("NUMBER", 19)
+    FLOAT = ("BINARY_FLOAT", None)
+    DOUBLE = ("BINARY_DOUBLE", None)
+    DECIMAL = ("NUMBER", (9, 2))
+    NUMERIC = ("NUMBER", (9, 2))
+    NUMBER = ("NUMBER", 19)
+    DATE = ("DATE", None)
+    TIME = ("DATE", None)
+    YEAR = ("NUMBER", 4)
+    DATETIME = ("DATE", None)
+    TIMESTAMP = ("TIMESTAMP", None)
+    CHAR = ("CHAR", 50)
+    VARCHAR = ("VARCHAR2", 255)
+    TINYBLOB = ("RAW", 255)
+    TINYTEXT = ("VARCHAR2", 255)
+    BLOB = ("BLOB", None)
+    TEXT = ("CLOB", None)
+    MEDIUMBLOB = ("BLOB", None)
+    MEDIUMTEXT = ("CLOB", None)
+    LONGBLOB = ("BLOB", None)
+    LONGTEXT = ("CLOB", None)
+
+    def __str__(self):
+        return self._name_
+
+
+class PdmToSqlServerColumnType(Enum):
+    """
+    PDM与SQL Server字段类型映射
+    """
+    BYTE = ("TINYINT", None)
+    TINYINT = ("TINYINT", None)
+    SMALLINT = ("SMALLINT", None)
+    MEDIUMINT = ("INT", None)
+    INT = ("INT", None)
+    INTEGER = ("INT", None)
+    BIGINT = ("BIGINT", None)
+    FLOAT = ("REAL", None)
+    DOUBLE = ("FLOAT", None)
+    DECIMAL = ("DECIMAL", (9, 2))
+    NUMERIC = ("NUMERIC", (9, 2))
+    NUMBER = ("BIGINT", None)
+    DATE = ("DATE", None)
+    TIME = ("TIME", None)
+    YEAR = ("SMALLINT", None)
+    DATETIME = ("DATETIME2", None)
+    TIMESTAMP = ("DATETIME2", None)
+    CHAR = ("NCHAR", 50)
+    VARCHAR = ("NVARCHAR", 255)
+    TINYBLOB = ("VARBINARY", 255)
+    TINYTEXT = ("NVARCHAR", 255)
+    BLOB = ("VARBINARY", "MAX")
+    TEXT = ("NVARCHAR", "MAX")
+    MEDIUMBLOB = ("VARBINARY", "MAX")
+    MEDIUMTEXT = ("NVARCHAR", "MAX")
+    LONGBLOB = ("VARBINARY", "MAX")
+    LONGTEXT = ("NVARCHAR", "MAX")
+
+    def __str__(self):
+        return self._name_
+
+
+class PdmToH2ColumnType(Enum):
+    """
+    PDM与H2字段类型映射
+    """
+    BYTE = ("TINYINT", None)
+    TINYINT = ("TINYINT", None)
+    SMALLINT = ("SMALLINT", None)
+    MEDIUMINT = ("INT", None)
+    INT = ("INT", None)
+    INTEGER = ("INTEGER", None)
+    BIGINT = ("BIGINT", None)
+    FLOAT = ("REAL", None)
+    DOUBLE = ("DOUBLE PRECISION", None)
+    DECIMAL = ("DECIMAL", (9, 2))
+    NUMERIC = ("NUMERIC", (9, 2))
+    NUMBER = ("BIGINT", None)
+    DATE = ("DATE", None)
+    TIME = ("TIME", None)
+    YEAR = ("SMALLINT", None)
+    DATETIME = ("TIMESTAMP", None)
+    TIMESTAMP = ("TIMESTAMP", None)
+    CHAR = ("CHAR", 50)
+    VARCHAR = ("VARCHAR", 255)
+    TINYBLOB = ("VARBINARY", 255)
+    TINYTEXT = ("VARCHAR", 255)
+    BLOB = ("BLOB", None)
+    TEXT = ("CLOB", None)
+    MEDIUMBLOB = ("BLOB", None)
+    MEDIUMTEXT = ("CLOB", None)
+    LONGBLOB = ("BLOB", None)
+    LONGTEXT = ("CLOB", None)
+
+    def __str__(self):
+        return self._name_
+
+
+# 指定长度时只作用于以下类型（MySQL保持原有行为，所有类型都附加长度）
+LENGTH_TYPES = {
+    DbType.ORACLE: frozenset(["NUMBER", "CHAR", "VARCHAR2", "RAW"]),
+    DbType.SQLSERVER: frozenset(["DECIMAL", "NUMERIC", "NCHAR", "NVARCHAR", "VARBINARY"]),
+    DbType.H2: frozenset(["DECIMAL", "NUMERIC", "CHAR", "VARCHAR", "VARBINARY"]),
+}
+
+
+def __build_type_table(db_type: DbType, mapping) -> dict:
+    """
+    预先计算PdmColumnType -> (类型名, 默认完整类型, 是否接受长度)
+    """
+    length_types = LENGTH_TYPES.get(db_type)
+    table = {}
+    for name, pdm_type in PdmColumnType.__members__.items():
+        if pdm_type._name_ != name:
+            # 跳过别名（如INTEGER之于INT），按规范名称取映射
+            continue
+        col_type, default_len = mapping[name].value
+        if default_len is None:
+            default = col_type
+        else:
+            default = ("%s(%s)" % (col_type, str(default_len))).replace("((", "(").replace("))", ")")
+        table[pdm_type] = (col_type, default, length_types is None or col_type in length_types)
+    return table
+
+
+# 各数据库的字段类型表，生成时按字段类型直接取用
+DB_COLUMN_TYPES = {
+    DbType.MYSQL: __build_type_table(DbType.MYSQL, PdmToMySqlColumnType),
+    DbType.ORACLE: __build_type_table(DbType.ORACLE, PdmToOracleColumnType),
+    DbType.SQLSERVER: __build_type_table(DbType.SQLSERVER, PdmToSqlServerColumnType),
+    DbType.H2: __build_type_table(DbType.H2, PdmToH2ColumnType),
+}
+
+
+def generate_sql(tables: list, db_type: DbType, skip_errors: bool = False) -> str:
+    """
+    生成多张表的建表语句
+    :param tables: 表列表
+    :param db_type: 数据库类型
+    :param skip_errors: 见write_sql
+    :return: SQL脚本
+    """
+    out = io.StringIO()
+    write_sql(tables, db_type, out, skip_errors)
+    return out.getvalue()
 
 
-def generate_sql(table: Table, db_type: DbType) -> str:
-    content = ""
+def write_sql(tables, db_type: DbType, out, skip_errors: bool = False) -> list:
+    """
+    逐表将建表语句写入out，不在内存中拼接整个脚本
+    :param tables: 表列表（可以是iter_pdm_tables等生成器）
+    :param db_type: 数据库类型
+    :param out: 可写的文本文件对象
+    :param skip_errors: 单张表生成失败时写入注释说明并继续，否则直接抛出异常
+    :return: 生成失败的表编码列表
+    """
+    __check_db_type(db_type)
+    failed = []
+    for table in tables:
+        try:
+            write_table_sql(table, db_type, out)
+        except Exception as e:
+            message = "%s表创建语句生成失败: %s" % (table.code, str(e))
+            if not skip_errors:
+                raise Exception(message) from e
+            failed.append(table.code)
+            out.write("-- %s\n" % message)
+        out.write("\n\n")
+    return failed
+
+
+def generate_table_sql(table: Table, db_type: DbType) -> str:
+    """
+    生成单张表的建表语句
+    :param table: 表
+    :param db_type: 数据库类型
+    :return: SQL语句
+    """
+    out = io.StringIO()
+    write_table_sql(table, db_type, out)
+    return out.getvalue()
+
+
+def write_table_sql(table: Table, db_type: DbType, out, drop: bool = True):
+    """
+    将单张表的建表语句写入out
+    :param table: 表
+    :param db_type: 数据库类型
+    :param out: 可写的文本文件对象
+    :param drop: 是否在建表前删除同名表
+    """
+    __check_db_type(db_type)
     if len(table.columns) == 0:
         raise Exception("%s表没有字段" % table.code)
-    if db_type == DbType.MYSQL:
-        content += "-- ----------------------------\n"
-        content += "-- Table structure for %s\n" % table.code.lower()
-        content += "-- ----------------------------\n"
-        content += "DROP TABLE IF EXISTS `%s`;\n" % table.code.lower()
-        content += "CREATE TABLE `%s`(\n" % table.code.lower()
+    table_name = quote_name(db_type, table_code(db_type, table))
+    write = out.write
+    write("-- ----------------------------\n")
+    write("-- Table structure for %s\n" % table.code.lower())
+    write("-- ----------------------------\n")
+    if drop:
+        write(drop_table_sql(db_type, table_name))
+    write(create_table_statement(db_type, table))
+    write(";\n")
+    if db_type != DbType.MYSQL:
+        if table.comment is not None:
+            write(table_comment_sql(db_type, table))
         for col in table.columns:
-            col_type = get_db_col_type(db_type, col.col_type, col.col_length)
-            not_null = "NULL" if col.not_null is None or not col.not_null else "NOT NULL"
-            pk = "" if col.pk is None or not col.pk else " PRIMARY KEY"
-            comments = " COMMENT '%s%s'" % (
-                col.name, "" if col.comment is None or len(col.comment.strip()) == 0 else "\t" + col.comment.strip())
-            content += "  `%s` %s %s%s%s,\n" % (col.code, col_type, not_null, pk, comments)
-        if content[-2] == ',':
-            content = content[:-2] + "\n"
-        content += ")%s;\n" % ("" if table.comment is None else " COMMENT = '" + table.comment.strip() + "'")
-        return content
-    raise Exception("不支持数据库类型")
-
-
-def get_db_col_type(db_type: DbType, pdm_type: PdmColumnType, col_length: int = None) -> str:
+            write(column_comment_sql(db_type, table, col))
+
+
+def table_statements(table: Table, db_type: DbType, drop: bool = False) -> list:
+    """
+    单张表的建表语句拆分为可以逐条交给DB-API cursor.execute执行的语句（不含结尾的分号）
+    :param table: 表
+    :param db_type: 数据库类型
+    :param drop: 是否在建表前删除同名表
+    :return: 语句列表
+    """
+    __check_db_type(db_type)
+    if len(table.columns) == 0:
+        raise Exception("%s表没有字段" % table.code)
+    statements = []
+    if drop:
+        statements.append(drop_table_statement(db_type, quote_name(db_type, table_code(db_type, table))))
+    statements.append(create_table_statement(db_type, table))
+    if db_type != DbType.MYSQL:
+        if table.comment is not None:
+            statements.append(table_comment_sql(db_type, table).rstrip("\n;"))
+        for col in table.columns:
+            statements.append(column_comment_sql(db_type, table, col).rstrip("\n;"))
+    return statements
+
+
+def create_table_statement(db_type: DbType, table: Table) -> str:
+    """
+    CREATE TABLE语句（不含结尾的分号），MySQL的表注释包含在其中
+    """
+    content = "CREATE TABLE %s(\n" % quote_name(db_type, table_code(db_type, table))
+    pk_columns = [col for col in table.columns if col.pk]
+    if len(pk_columns) > 1:
+        # 联合主键不能写在字段定义中，单独作为表约束
+        definitions = [column_definition(db_type, col, False) for col in table.columns]
+        definitions.append("  PRIMARY KEY (%s)" % ", ".join(
+            quote_name(db_type, column_code(db_type, col)) for col in pk_columns))
+    else:
+        definitions = [column_definition(db_type, col) for col in table.columns]
+    content += ",\n".join(definitions)
+    content += "\n)"
+    if db_type == DbType.MYSQL and table.comment is not None:
+        content += " COMMENT = '" + escape(table.comment.strip()) + "'"
+    return content
+
+
+def column_definition(db_type: DbType, col, pk: bool = True, nullable: bool = True) -> str:
+    """
+    生成字段定义，如 `code` VARCHAR(64) NOT NULL PRIMARY KEY
+    :param pk: 是否包含主键约束
+    :param nullable: 是否包含NULL/NOT NULL声明
+    """
+    if col.col_type is None:
+        raise Exception("%s字段类型无法识别" % col.code)
+    col_type = get_db_col_type(db_type, col.col_type, col.col_length, col.col_scale)
+    not_null = "NULL" if col.not_null is None or not col.not_null else "NOT NULL"
+    if not nullable:
+        # Oracle的MODIFY重复声明已有的NULL/NOT NULL会报ORA-01451/ORA-01442
+        return "  %s %s" % (quote_name(db_type, column_code(db_type, col)), col_type)
+    pk = "" if not pk or col.pk is None or not col.pk else " PRIMARY KEY"
     if db_type == DbType.MYSQL:
-        mysqlColType, defaultLen = PdmToMySqlColumnType[pdm_type._name_].value
-        if col_length is not None:
-            mysqlColLen = "(%d)" % col_length
-        elif defaultLen is not None:
-            mysqlColLen = "(%s)" % str(defaultLen)
-            mysqlColLen = mysqlColLen.replace("((", "(").replace("))", ")")
-        else:
-            mysqlColLen = ""
-        return mysqlColType + mysqlColLen
-    raise Exception("不支持数据库类型")
+        comments = " COMMENT '%s'" % escape(column_comment(col))
+        return "  `%s` %s %s%s%s" % (col.code, col_type, not_null, pk, comments)
+    return "  %s %s %s%s" % (quote_name(db_type, column_code(db_type, col)), col_type, not_null, pk)
+
+
+def column_comment(col) -> str:
+    return "%s%s" % (col.name, "" if col.comment is None or len(col.comment.strip()) == 0 else "\t" + col.comment.strip())
+
+
+def table_comment_sql(db_type: DbType, table: Table, update: bool = False) -> str:
+    """
+    表注释语句（MySQL为ALTER TABLE ... COMMENT）
+    :param update: SQL Server下为修改已有注释
+    """
+    code = table_code(db_type, table)
+    comment = escape("" if table.comment is None else table.comment.strip())
+    if db_type == DbType.MYSQL:
+        return "ALTER TABLE %s COMMENT = '%s';\n" % (quote_name(db_type, code), comment)
+    if db_type == DbType.SQLSERVER:
+        return "EXEC %s 'MS_Description', N'%s', 'SCHEMA', 'dbo', 'TABLE', '%s';\n" % (
+            "sp_updateextendedproperty" if update else "sp_addextendedproperty", comment, code)
+    return "COMMENT ON TABLE %s IS '%s';\n" % (quote_name(db_type, code), comment)
+
+
+def column_comment_sql(db_type: DbType, table: Table, col, update: bool = False) -> str:
+    """
+    非MySQL数据库的字段注释语句，MySQL的字段注释包含在字段定义中，返回空串
+    :param update: SQL Server下为修改已有注释
+    """
+    if db_type == DbType.MYSQL:
+        return ""
+    code = table_code(db_type, table)
+    if db_type == DbType.SQLSERVER:
+        return "EXEC %s 'MS_Description', N'%s', 'SCHEMA', 'dbo', 'TABLE', '%s', 'COLUMN', '%s';\n" % (
+            "sp_updateextendedproperty" if update else "sp_addextendedproperty", escape(column_comment(col)), code,
+            column_code(db_type, col))
+    return "COMMENT ON COLUMN %s.%s IS '%s';\n" % (
+        quote_name(db_type, code), quote_name(db_type, column_code(db_type, col)), escape(column_comment(col)))
+
+
+def drop_table_statement(db_type: DbType, table_name: str) -> str:
+    """
+    可以直接执行的删表语句，Oracle为不带"/"的PL/SQL块
+    """
+    if db_type == DbType.ORACLE:
+        return "BEGIN\n  EXECUTE IMMEDIATE 'DROP TABLE %s';\nEXCEPTION\n  WHEN OTHERS THEN NULL;\nEND;" % table_name
+    return drop_table_sql(db_type, table_name).rstrip("\n;")
+
+
+def drop_table_sql(db_type: DbType, table_name: str) -> str:
+    if db_type == DbType.ORACLE:
+        return "BEGIN\n  EXECUTE IMMEDIATE 'DROP TABLE %s';\nEXCEPTION\n  WHEN OTHERS THEN NULL;\nEND;\n/\n" % table_name
+    if db_type == DbType.SQLSERVER:
+        return "IF OBJECT_ID(N'%s', N'U') IS NOT NULL DROP TABLE %s;\n" % (table_name, table_name)
+    return "DROP TABLE IF EXISTS %s;\n" % table_name
+
+
+def table_code(db_type: DbType, table: Table) -> str:
+    # Oracle、H2未加引号的标识符默认大写，统一转为大写避免大小写敏感问题
+    if db_type in (DbType.ORACLE, DbType.H2):
+        return table.code.upper()
+    return table.code.lower()
+
+
+def column_code(db_type: DbType, col) -> str:
+    if db_type in (DbType.ORACLE, DbType.H2):
+        return col.code.upper()
+    return col.code
+
+
+def quote_name(db_type: DbType, name: str) -> str:
+    if db_type == DbType.MYSQL:
+        return "`%s`" % name
+    if db_type == DbType.SQLSERVER:
+        return "[%s]" % name
+    return '"%s"' % name
+
+
+def escape(text: str) -> str:
+    return text.replace("'", "''")
+
+
+def get_db_col_type(db_type: DbType, pdm_type: PdmColumnType, col_length: int = None, col_scale: int = None) -> str:
+    type_table = DB_COLUMN_TYPES.get(db_type)
+    if type_table is None:
+        raise Exception("不支持数据库类型")
+    entry = type_table.get(pdm_type)
+    if entry is None:
+        raise Exception("不支持的字段类型")
+    col_type, default, accepts_length = entry
+    if col_length is not None and accepts_length:
+        if col_scale is not None:
+            return "%s(%d,%d)" % (col_type, col_length, col_scale)
+        return "%s(%d)" % (col_type, col_length)
+    return default
+
+
+def __check_db_type(db_type: DbType):
+    if db_type not in DB_COLUMN_TYPES:
+        raise Exception("不支持数据库类型")
 
 # from pdm_parser import parse_pdm
 #
 # tables = parse_pdm("/Users/liyilin/Workspace/doc/company/AIFactory-train-doc/06 数据模型/deepminer-v2(1).pdm")
 # for table in tables:
 #     try:
-#         print(generate_sql(table, DbType.MYSQL))
+#         print(generate_table_sql(table, DbType.MYSQL))
 #     except Exception as e:
 #         print("-- %s表创建语句生成失败: %s\n\n" % (table.code, str(e)))
@@ -0,0 +1,15 @@
+import pytest
+
+from pdm_synth import write_synthetic_pdm
+
+
+@pytest.fixture
+def synthetic_pdm(tmp_path):
+    """
+    生成合成PDM文件的函数，参数同write_synthetic_pdm（不含路径），返回文件路径
+    """
+    def make(n_tables: int = 20, **kwargs) -> str:
+        path = str(tmp_path / ("synthetic_%d.pdm" % n_tables))
+        write_synthetic_pdm(path, n_tables, **kwargs)
+        return path
+    return make
@@ -0,0 +1,28 @@
+from benchmark import check_regression, parse_sizes, build_synthetic_model
+from pdm_synth import write_synthetic_pdm
+
+
+def test_synthetic_pdm_is_deterministic(tmp_path):
+    paths = [str(tmp_path / name) for name in ("a.pdm", "b.pdm", "c.pdm")]
+    write_synthetic_pdm(paths[0], 10, seed=7)
+    write_synthetic_pdm(paths[1], 10, seed=7)
+    write_synthetic_pdm(paths[2], 10, seed=8)
+    data = [open(path, "rb").read() for path in paths]
+    assert data[0] == data[1] != data[2]
+
+
+def test_parse_sizes():
+    assert parse_sizes("200x20,2000X5") == [(200, 20), (2000, 5)]
+
+
+def test_check_regression():
+    baseline = {"200x20": {"parse": {"time": 1.0, "peak": 100 * 1024 * 1024}}}
+    ok = {"200x20": {"parse": {"time": 1.1, "peak": 105 * 1024 * 1024}, "sql": {"time": 9.0, "peak": 1}}}
+    assert check_regression(ok, baseline) == []
+    slow = {"200x20": {"parse": {"time": 2.0, "peak": 200 * 1024 * 1024}}}
+    assert len(check_regression(slow, baseline)) == 2
+
+
+def test_build_synthetic_model():
+    tables = build_synthetic_model(20, 5, n_refs=10)
+    assert len(tables) == 20 and all(len(t.columns) == 5 for t in tables)
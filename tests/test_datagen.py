@@ -0,0 +1,61 @@
+import csv
+import os
+
+from datagen import DataGenerator
+from model import Table, Column, PdmColumnType
+from pdm_parser import parse_pdm
+
+
+def read_csv(path: str) -> list:
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_foreign_keys_follow_reference_joins(synthetic_pdm, tmp_path):
+    tables = parse_pdm(synthetic_pdm(6, n_columns=6, n_refs=6))
+    joins = [(t, col, parent, parent_col) for t in tables for parent, col, parent_col in t.joins]
+    assert joins
+    generator = DataGenerator(tables, rows={t.code: 50 + 10 * i for i, t in enumerate(tables)}, seed=3,
+                              chunk_rows=16)
+    for plan in generator.order:
+        assert {col.code for col, parent in plan.foreign_keys} == {
+            col.code for t, col, parent, parent_col in joins if t is plan.table}
+
+    out_dir = str(tmp_path / "data")
+    generator.write_csv(out_dir)
+    rows = {t.code: read_csv(os.path.join(out_dir, t.code + ".csv")) for t in tables}
+    for t, col, parent, parent_col in joins:
+        parent_keys = {row[parent_col.code] for row in rows[parent.code]}
+        child_values = [row[col.code] for row in rows[t.code]]
+        assert len(child_values) == 50 + 10 * tables.index(t)
+        assert set(child_values) <= parent_keys
+
+
+def test_primary_key_and_mandatory_columns(synthetic_pdm, tmp_path):
+    tables = parse_pdm(synthetic_pdm(2, n_columns=4, n_refs=1))
+    generator = DataGenerator(tables, rows=30, null_ratio=0.5)
+    for plan in generator.order:
+        assert plan.pk is plan.table.columns[0] and plan.pk.pk and plan.pk.not_null
+        ids = [v for chunk in generator.iter_chunks(plan) for v in chunk[0]]
+        assert ids == list(range(1, 31))
+
+
+def test_one_to_one_primary_key_only_references_parent_keys(tmp_path):
+    user = Table(1, "用户", "t_user")
+    user.columns = [Column("编号", "id", PdmColumnType.BIGINT, None, pk=True, not_null=True)]
+    profile = Table(2, "用户资料", "t_user_profile", refs=[user])
+    profile.columns = [Column("用户编号", "user_id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+                       Column("金额", "amount", PdmColumnType.DECIMAL, 2, col_scale=2)]
+    profile.joins = [(user, profile.columns[0], user.columns[0])]
+    generator = DataGenerator([user, profile], rows={"t_user": 20, "t_user_profile": 50})
+    assert [plan.rows for plan in generator.order] == [20, 20]
+
+    out_dir = str(tmp_path / "data")
+    generator.write_csv(out_dir)
+    with open(os.path.join(out_dir, "t_user_profile.csv"), encoding="utf-8", newline="") as f:
+        text = f.read()
+    assert "\r" not in text
+    rows = list(csv.DictReader(text.splitlines()))
+    assert sorted(int(row["user_id"]) for row in rows) == list(range(1, 21))
+    # DECIMAL(2,2)的整数部分只能为0
+    assert all(row["amount"] == "" or row["amount"].startswith("0.") and len(row["amount"]) == 4 for row in rows)
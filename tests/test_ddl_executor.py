@@ -0,0 +1,71 @@
+import sqlite3
+
+from ddl_executor import DdlExecutor, ConnectionPool
+from model import Table, Schema
+
+
+def make_tables():
+    # a <- b <- c, a <- d, e 独立
+    a, b, c, d, e = [Table(i, code, code) for i, code in enumerate(["t_a", "t_b", "t_c", "t_d", "t_e"], 1)]
+    b.refs.append(a)
+    c.refs.append(b)
+    d.refs.append(a)
+    return [c, d, e, b, a]
+
+
+def create_statements(table: Table) -> list:
+    return ["CREATE TABLE %s (id INTEGER PRIMARY KEY)" % table.code]
+
+
+def sqlite_connect(path: str):
+    return lambda: sqlite3.connect(path, timeout=30, check_same_thread=False)
+
+
+def created_tables(path: str) -> set:
+    with sqlite3.connect(path) as conn:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def test_plan_orders_parents_first():
+    tables = make_tables()
+    levels = DdlExecutor(None).plan(Schema(tables))
+    assert [sorted(t.code for t in level) for level in levels] == [["t_a", "t_e"], ["t_b", "t_d"], ["t_c"]]
+
+
+def test_run_creates_all_tables_on_sqlite(tmp_path):
+    path = str(tmp_path / "ddl.db")
+    report = DdlExecutor(sqlite_connect(path), workers=3, statements=create_statements).run(make_tables())
+    assert not report.failed
+    assert report.levels == 3
+    assert created_tables(path) == {"t_a", "t_b", "t_c", "t_d", "t_e"}
+
+
+def test_failed_parent_skips_children(tmp_path):
+    path = str(tmp_path / "ddl.db")
+
+    def statements(table):
+        if table.code == "t_b":
+            return ["CREATE TABLE t_b (id INTEGER PRIMARY KEY"]
+        return create_statements(table)
+
+    report = DdlExecutor(sqlite_connect(path), workers=3, statements=statements).run(make_tables())
+    results = {r.table.code: r for r in report.results}
+    assert not results["t_b"].ok and not results["t_b"].skipped
+    assert results["t_c"].skipped
+    assert all(results[code].ok for code in ("t_a", "t_d", "t_e"))
+    assert created_tables(path) == {"t_a", "t_d", "t_e"}
+
+
+def test_pool_reuses_connections(tmp_path):
+    created = []
+
+    def connect():
+        created.append(sqlite3.connect(str(tmp_path / "pool.db"), check_same_thread=False))
+        return created[-1]
+
+    pool = ConnectionPool(connect, size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.close()
+    assert len(created) == 1
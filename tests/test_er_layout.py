@@ -0,0 +1,44 @@
+import io
+import xml.etree.ElementTree as ET
+
+from er_layout import FixedFontMetrics, layout_tables, write_svg
+from pdm_parser import parse_pdm
+
+
+def test_font_metrics_are_memoized():
+    metrics = FixedFontMetrics(font_size=10)
+    assert metrics.text_size("ab") == (12, 13)
+    assert metrics.text_size("中文") == (24, 13)
+    metrics.text_size("ab")
+    assert metrics.text_size.cache_info().hits == 1
+
+
+def test_layout_places_parents_above_children(synthetic_pdm):
+    tables = parse_pdm(synthetic_pdm(40, n_refs=30))
+    layout = layout_tables(tables, max_width=2000)
+    assert len(layout.boxes) == 40
+    for box in layout.boxes:
+        assert box.right <= layout.width and box.bottom <= layout.height
+    for child, parent in layout.edges():
+        assert parent.y < child.y
+    boxes = sorted(layout.boxes, key=lambda b: (b.y, b.x))
+    for a, b in zip(boxes, boxes[1:]):
+        assert not (a.x < b.right and b.x < a.right and a.y < b.bottom and b.y < a.bottom)
+
+
+def test_visible_returns_only_intersecting_boxes(synthetic_pdm):
+    layout = layout_tables(parse_pdm(synthetic_pdm(60, n_refs=0)), max_width=3000)
+    x0, y0, x1, y1 = 100, 50, 900, 400
+    expected = {id(b) for b in layout.boxes if b.x <= x1 and b.right >= x0 and b.y <= y1 and b.bottom >= y0}
+    assert expected and {id(b) for b in layout.visible(x0, y0, x1, y1)} == expected
+
+
+def test_svg_uses_layout_metrics(synthetic_pdm):
+    metrics = FixedFontMetrics(font_size=11, family="Courier")
+    layout = layout_tables(parse_pdm(synthetic_pdm(5)), metrics=metrics)
+    assert layout.metrics is metrics
+    out = io.StringIO()
+    write_svg(layout, out)
+    root = ET.fromstring(out.getvalue())
+    assert root.get("font-family") == "Courier" and root.get("font-size") == "11"
+    assert all(">表%d<" % i in out.getvalue() for i in range(5))
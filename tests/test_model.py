@@ -0,0 +1,74 @@
+import pytest
+
+from model import Table, Column, PdmColumnType, Schema, resolve_data_type, parse_length, pack_tables, \
+    unpack_tables, intern_str
+from pdm_parser import parse_pdm
+
+
+@pytest.mark.parametrize("data_type, expected", [
+    ("varchar(255)", (PdmColumnType.VARCHAR, 255, None)),
+    ("VARCHAR2(64)", (PdmColumnType.VARCHAR, 64, None)),
+    ("decimal(18,4)", (PdmColumnType.DECIMAL, 18, 4)),
+    ("numeric(10, 2)", (PdmColumnType.NUMERIC, 10, 2)),
+    ("bigint", (PdmColumnType.BIGINT, None, None)),
+    ("int unsigned", (PdmColumnType.INT, None, None)),
+    ("geometry", (None, None, None)),
+])
+def test_resolve_data_type(data_type, expected):
+    assert resolve_data_type(data_type) == expected
+
+
+def test_parse_length():
+    assert parse_length("32") == 32
+    assert parse_length(" 8 ") == 8
+    assert parse_length(None) is None
+    assert parse_length("") is None
+
+
+def test_slots_and_interning():
+    table = Table(1, "表", "t_a")
+    with pytest.raises(AttributeError):
+        table.extra = 1
+    with pytest.raises(AttributeError):
+        Column("a", "a").extra = 1
+    code = "".join(["customer", "_id"])
+    assert intern_str(code) is intern_str("customer_id")
+
+
+def test_pack_tables_round_trip(synthetic_pdm):
+    tables = parse_pdm(synthetic_pdm(10, n_refs=12))
+    restored = unpack_tables(pack_tables(tables))
+    for a, b in zip(tables, restored):
+        assert (a.id, a.name, a.code, a.comment) == (b.id, b.name, b.code, b.comment)
+        assert [str(c) for c in a.columns] == [str(c) for c in b.columns]
+        assert [r.code for r in a.refs] == [r.code for r in b.refs]
+        assert all(r in restored for r in b.refs)
+
+
+def make_schema() -> Schema:
+    a, b, c, d = [Table(i, code, code) for i, code in enumerate(["t_a", "t_b", "t_c", "t_d"], 1)]
+    a.columns = [Column("编号", "ID")]
+    b.columns = [Column("编号", "id"), Column("主表", "a_id")]
+    b.refs = [a, a, b]
+    c.refs = [b, d]
+    d.refs = [c]
+    return Schema([c, b, a, d])
+
+
+def test_schema_lookups():
+    schema = make_schema()
+    assert schema.get_table("T_B").code == "t_b"
+    assert schema.get_table_by_id(3).code == "t_c"
+    assert schema.get_column("t_b", "A_ID").code == "a_id"
+    assert schema.get_column("t_x", "id") is None
+    assert sorted(t.code for t, col in schema.find_columns("id")) == ["t_a", "t_b"]
+    b = schema.get_table("t_b")
+    assert [t.code for t in schema.get_parents(b)] == ["t_a"]
+    assert [t.code for t in schema.get_children(b)] == ["t_c"]
+
+
+def test_schema_levels_and_cycles():
+    schema = make_schema()
+    assert [[t.code for t in level] for level in schema.levels] == [["t_a"], ["t_b"]]
+    assert [t.code for t in schema.topological_order] == ["t_a", "t_b"]
+    assert sorted(t.code for t in schema.cyclic) == ["t_c", "t_d"]
@@ -0,0 +1,35 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from pdm_async import parse_pdm_async, parse_stream_async
+from pdm_parser import parse_pdm
+
+
+def codes(tables: list) -> list:
+    return [(t.code, [r.code for r in t.refs]) for t in tables]
+
+
+def test_parse_pdm_async(synthetic_pdm):
+    path = synthetic_pdm(8)
+    expected = codes(parse_pdm(path))
+
+    async def run():
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            in_process = await parse_pdm_async(path, executor)
+        return await parse_pdm_async(path), in_process
+
+    threaded, in_process = asyncio.run(run())
+    assert codes(threaded) == codes(in_process) == expected
+
+
+def test_parse_stream_async(synthetic_pdm):
+    path = synthetic_pdm(8)
+    with open(path, "rb") as f:
+        data = f.read()
+
+    async def chunks():
+        for i in range(0, len(data), 1000):
+            yield data[i:i + 1000]
+
+    tables = asyncio.run(parse_stream_async(chunks(), include="t_table_[0-3]"))
+    assert [t.code for t in tables] == ["t_table_%d" % i for i in range(4)]
@@ -0,0 +1,46 @@
+import os
+
+import pdm_cache
+from pdm_cache import parse_pdm_cached, evict, clear_cache, ENTRY_SUFFIX, STAT_SUFFIX
+from pdm_synth import write_synthetic_pdm
+
+
+def cache_files(cache_dir: str, suffix: str) -> list:
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(suffix))
+
+
+def test_cache_hit_and_invalidation(synthetic_pdm, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    path = synthetic_pdm(5)
+    tables = parse_pdm_cached(path, cache_dir)
+    assert len(cache_files(cache_dir, ENTRY_SUFFIX)) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("命中缓存时不应重新解析")
+
+    monkeypatch.setattr(pdm_cache, "parse_pdm", fail)
+    cached = parse_pdm_cached(path, cache_dir)
+    assert [t.code for t in cached] == [t.code for t in tables]
+    assert [t.fingerprint for t in cached] == [t.fingerprint for t in tables]
+    monkeypatch.undo()
+
+    # 内容变化后重新解析
+    write_synthetic_pdm(path, 7)
+    assert len(parse_pdm_cached(path, cache_dir)) == 7
+    assert len(cache_files(cache_dir, ENTRY_SUFFIX)) == 2
+
+
+def test_evict_removes_stat_records(synthetic_pdm, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    for seed in range(3):
+        parse_pdm_cached(synthetic_pdm(5 + seed, seed=seed), cache_dir)
+    with open(os.path.join(cache_dir, "orphan" + STAT_SUFFIX), "w") as f:
+        f.write("missing")
+    assert len(cache_files(cache_dir, STAT_SUFFIX)) == 4
+
+    evict(cache_dir, 1)
+    assert cache_files(cache_dir, ENTRY_SUFFIX) == [] and cache_files(cache_dir, STAT_SUFFIX) == []
+
+    parse_pdm_cached(synthetic_pdm(5), cache_dir)
+    clear_cache(cache_dir)
+    assert os.listdir(cache_dir) == []
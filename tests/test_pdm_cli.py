@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import pytest
+
+import sql_generator
+from pdm_cli import main
+from pdm_search import main as search_main
+
+
+def test_import_does_not_load_heavy_modules():
+    code = "import sys, pdm_cli; print(' '.join(m for m in ('tkinter', 'pdm_parser', 'zipfile') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env={"PYTHONPATH": ":".join(sys.path)}).stdout
+    assert out.strip() == ""
+
+
+def test_sql_and_parse_commands(synthetic_pdm, tmp_path, capsys):
+    path = synthetic_pdm(3)
+    out = str(tmp_path / "model.sql")
+    assert main(["sql", path, "--db", "H2", "-o", out, "-x", "t_table_0"]) == 0
+    with open(out, encoding="utf-8") as f:
+        assert f.read().count("CREATE TABLE") == 2
+    assert main(["parse", path, "-v"]) == 0
+    assert "3张表" in capsys.readouterr().out
+
+
+def test_search_command(synthetic_pdm, tmp_path, capsys):
+    path = synthetic_pdm(3)
+    index = str(tmp_path / "search.index")
+    assert main(["search", "编号", path, "--index", index, "--columns", "--limit", "2"]) == 0
+    assert capsys.readouterr().out.count("(编号)") == 2
+    assert search_main(["t_table_1", path, "--index", index, "--tables"]) == 0
+    assert "t_table_1" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("skip", [False, True])
+def test_sql_command_fails_on_broken_table(synthetic_pdm, tmp_path, capsys, monkeypatch, skip):
+    write_table_sql = sql_generator.write_table_sql
+
+    def fail_table_1(table, db_type, out, drop=True):
+        if table.code == "t_table_1":
+            raise Exception("字段类型无法识别")
+        write_table_sql(table, db_type, out, drop)
+    monkeypatch.setattr(sql_generator, "write_table_sql", fail_table_1)
+    out = str(tmp_path / "model.sql")
+    assert main(["sql", synthetic_pdm(3), "-o", out] + (["--skip-errors"] if skip else [])) == 1
+    assert "t_table_1" in capsys.readouterr().err
+    with open(out, encoding="utf-8") as f:
+        assert f.read().count("CREATE TABLE") == (2 if skip else 1)
@@ -0,0 +1,185 @@
+import gc
+import gzip
+import weakref
+import zipfile
+
+from model import PdmColumnType, pack_tables, unpack_tables
+from pdm_parser import parse_pdm, iter_pdm_tables, parse_pdm_stats, parse_pdm_many, PdmIncrementalParser, \
+    PdmXmlHandler, create_expat_parser
+
+
+def join_codes(tables: list) -> list:
+    return [[(parent.code, col.code, parent_col.code) for parent, col, parent_col in t.joins] for t in tables]
+
+
+def test_primary_key_mandatory_and_joins(synthetic_pdm):
+    path = synthetic_pdm(5, n_columns=3, n_refs=4)
+    tables = parse_pdm(path)
+    for t in tables:
+        pk = [col.code for col in t.columns if col.pk]
+        assert pk == ["id"]
+        assert [col.code for col in t.columns if col.not_null] == ["id"]
+        assert {parent.code for parent, col, parent_col in t.joins} == {r.code for r in t.refs}
+        for parent, col, parent_col in t.joins:
+            assert col in t.columns and parent_col is parent.columns[0]
+    assert sum(len(t.joins) for t in tables) == 4
+    assert join_codes(unpack_tables(pack_tables(tables))) == join_codes(tables)
+    assert join_codes(list(iter_pdm_tables(path))) == join_codes(tables)
+
+
+def test_joins_to_filtered_tables_are_dropped(synthetic_pdm):
+    path = synthetic_pdm(5, n_columns=3, n_refs=4)
+    tables = parse_pdm(path, exclude="t_table_0")
+    assert all(parent.code != "t_table_0" for t in tables for parent, col, parent_col in t.joins)
+
+
+def test_index_and_key_names_do_not_overwrite_tables_or_columns(synthetic_pdm):
+    # 回归：索引、主键中的a:Name/a:Code（idx_N、Key_1）曾覆盖表与字段的名称、编码
+    path = synthetic_pdm(10)
+    for tables in (parse_pdm(path), list(iter_pdm_tables(path))):
+        assert [t.code for t in tables] == ["t_table_%d" % i for i in range(10)]
+        assert [t.name for t in tables] == ["表%d" % i for i in range(10)]
+        for t in tables:
+            assert t.comment.startswith("第")
+            assert t.columns[0].code == "id" and t.columns[0].name == "编号"
+            assert not any(col.code.startswith(("idx_", "Key_")) for col in t.columns)
+
+
+def test_iter_pdm_tables_matches_parse_pdm(synthetic_pdm):
+    path = synthetic_pdm(30, n_refs=40)
+    expected = parse_pdm(path)
+    tables = list(iter_pdm_tables(path, chunk_size=4096))
+    assert [t.code for t in tables] == [t.code for t in expected]
+    assert [len(t.columns) for t in tables] == [len(t.columns) for t in expected]
+    assert [[r.code for r in t.refs] for t in tables] == [[r.code for r in t.refs] for t in expected]
+
+
+def test_streaming_does_not_keep_dropped_tables(synthetic_pdm):
+    refs = []
+    for table in iter_pdm_tables(synthetic_pdm(50, n_refs=0)):
+        refs.append(weakref.ref(table))
+    gc.collect()
+    assert sum(1 for r in refs if r() is not None) <= 1
+
+
+def test_streaming_refs_to_dropped_tables_use_stubs(synthetic_pdm):
+    path = synthetic_pdm(30, n_refs=40)
+    expected = {t.code: t for t in parse_pdm(path)}
+    # 只保留编号为偶数的表
+    kept = [t for i, t in enumerate(iter_pdm_tables(path, chunk_size=4096)) if i % 2 == 0]
+    gc.collect()
+    for t in kept:
+        assert [r.code for r in t.refs] == [r.code for r in expected[t.code].refs]
+        assert all(r.columns == [] and r.name == expected[r.code].name for r in t.refs if r not in kept)
+        assert all(parent in kept for parent, col, parent_col in t.joins)
+
+
+def test_streaming_releases_column_index(synthetic_pdm):
+    with open(synthetic_pdm(40, n_refs=0), "rb") as f:
+        data = f.read()
+    handler = PdmXmlHandler(streaming=True)
+    handler.startDocument()
+    parser = create_expat_parser(handler)
+    largest = 0
+    for i in range(0, len(data), 4096):
+        parser.Parse(data[i:i + 4096], False)
+        handler.tables = []
+        gc.collect()
+        largest = max(largest, len(handler.column_index))
+    parser.Parse(b"", True)
+    # 只保留尚未被丢弃的表的字段
+    assert largest <= 2 * 20
+
+
+def test_data_type_length_and_scale(synthetic_pdm):
+    # 回归：varchar(255)等带长度的DataType曾在生成SQL时抛出KeyError
+    columns = [col for t in parse_pdm(synthetic_pdm(20)) for col in t.columns]
+    types = {(col.col_type, col.col_length, col.col_scale) for col in columns}
+    assert (PdmColumnType.VARCHAR, 255, None) in types
+    assert (PdmColumnType.DECIMAL, 18, 4) in types
+    assert all(col.col_type is not None for col in columns)
+
+
+def test_parse_sources(synthetic_pdm, tmp_path):
+    path = synthetic_pdm(8)
+    expected = [t.code for t in parse_pdm(path)]
+    with open(path, "rb") as f:
+        data = f.read()
+    gz_path = str(tmp_path / "model.pdm.gz")
+    with gzip.open(gz_path, "wb") as f:
+        f.write(data)
+    zip_path = str(tmp_path / "model.zip")
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("readme.txt", "x")
+        archive.writestr("model.pdm", data)
+    with open(path, "rb") as f:
+        assert [t.code for t in parse_pdm(f)] == expected
+    for source in (data, gz_path, zip_path, gzip.compress(data)):
+        assert [t.code for t in parse_pdm(source)] == expected
+
+
+def test_gzip_with_zero_padding(synthetic_pdm, tmp_path):
+    path = synthetic_pdm(4)
+    expected = [t.code for t in parse_pdm(path)]
+    with open(path, "rb") as f:
+        data = f.read()
+    half = len(data) // 2
+    # 末尾补齐的0字节，以及成员之间的0字节
+    padded = gzip.compress(data) + b"\0" * 1024
+    members = gzip.compress(data[:half]) + b"\0" * 7 + gzip.compress(data[half:]) + b"\0" * 3
+    gz_path = str(tmp_path / "padded.pdm.gz")
+    with open(gz_path, "wb") as f:
+        f.write(padded)
+    for source in (padded, members, gz_path):
+        assert [t.code for t in parse_pdm(source)] == expected
+    for payload in (padded, members):
+        parser = PdmIncrementalParser()
+        for i in range(0, len(payload), 5):
+            parser.feed(payload[i:i + 5])
+        assert [t.code for t in parser.close()] == expected
+
+
+def test_progress_and_stats(synthetic_pdm, tmp_path):
+    path = synthetic_pdm(40, n_refs=10)
+    tables, stats = parse_pdm_stats(path)
+    assert stats.tables == len(tables) == 40 and stats.references == 10
+    assert stats.columns == sum(len(t.columns) for t in tables)
+    assert stats.progress == 1.0
+
+    gz_path = str(tmp_path / "model.pdm.gz")
+    with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+        dst.write(src.read())
+    seen = []
+    parse_pdm(gz_path, progress=lambda s: seen.append(s.progress))
+    assert seen and seen == sorted(seen) and seen[-1] == 1.0
+
+
+def test_include_exclude(synthetic_pdm):
+    path = synthetic_pdm(12, packages=3)
+    assert [t.code for t in parse_pdm(path, include="t_table_1*")] == ["t_table_1", "t_table_10", "t_table_11"]
+    assert [t.code for t in parse_pdm(path, include="pkg:pkg_0")] == ["t_table_%d" % i for i in range(4)]
+    tables = parse_pdm(path, exclude=["pkg:pkg_1", "pkg:pkg_2", "t_table_0"])
+    assert [t.code for t in tables] == ["t_table_1", "t_table_2", "t_table_3"]
+    assert all(r in tables for t in tables for r in t.refs)
+
+
+def test_parse_pdm_many(synthetic_pdm, tmp_path):
+    paths = [synthetic_pdm(n) for n in (3, 5)]
+    missing = str(tmp_path / "missing.pdm")
+    results = {path: (tables, error) for path, tables, error in parse_pdm_many(paths + [missing], workers=2)}
+    assert [len(results[p][0]) for p in paths] == [3, 5]
+    assert results[missing][0] is None and "FileNotFoundError" in results[missing][1]
+    tables = results[paths[1]][0]
+    assert all(r in tables for t in tables for r in t.refs)
+
+
+def test_incremental_parser(synthetic_pdm):
+    path = synthetic_pdm(10)
+    expected = [(t.code, [r.code for r in t.refs]) for t in parse_pdm(path)]
+    with open(path, "rb") as f:
+        data = f.read()
+    for payload in (data, gzip.compress(data)):
+        parser = PdmIncrementalParser()
+        for i in range(0, len(payload), 777):
+            parser.feed(payload[i:i + 777])
+        assert [(t.code, [r.code for r in t.refs]) for t in parser.close()] == expected
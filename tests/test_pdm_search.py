@@ -0,0 +1,47 @@
+from model import Table, Column, PdmColumnType
+from pdm_search import SearchIndex, tokenize
+
+
+def make_tables() -> list:
+    table = Table(1, "客户信息", "t_customer", "客户主表")
+    table.columns = [
+        Column("编号", "id", PdmColumnType.BIGINT, None),
+        Column("客户名称", "customer_name", PdmColumnType.VARCHAR, 50),
+        Column("创建时间", "createTime", PdmColumnType.DATETIME, None),
+    ]
+    return [table]
+
+
+def hit_keys(hits: list) -> list:
+    return [(hit.table_code, hit.column_code) for hit in hits]
+
+
+def test_tokenize():
+    assert tokenize("customer_id") == tokenize("customerId") == ("customer", "id")
+    assert tokenize("客户编号") == ("客户", "户编", "编号")
+
+
+def test_search_prefix_fuzzy_and_cjk():
+    index = SearchIndex()
+    index.add_tables("a.pdm", make_tables())
+    assert hit_keys(index.search("customer name")) == [("t_customer", "customer_name")]
+    assert ("t_customer", "createTime") in hit_keys(index.search("creat", prefix=True))
+    assert hit_keys(index.search("custmer", fuzzy=True, columns=False)) == [("t_customer", None)]
+    assert hit_keys(index.search("客", columns=False)) == [("t_customer", None)]
+
+
+def test_fuzzy_index_follows_removed_sources(tmp_path):
+    index = SearchIndex()
+    index.add_tables("a.pdm", make_tables())
+    index.add_tables("b.pdm", make_tables())
+    assert len(index.search("custmer", fuzzy=True)) == 4
+    index.remove_source("a.pdm")
+    assert {hit.source for hit in index.search("custmer", fuzzy=True)} == {"b.pdm"}
+
+    path = str(tmp_path / "search.index")
+    index.save(path)
+    loaded = SearchIndex.load(path)
+    assert hit_keys(loaded.search("custmer", fuzzy=True)) == hit_keys(index.search("custmer", fuzzy=True))
+    assert hit_keys(loaded.search("客")) == hit_keys(index.search("客"))
+    loaded.remove_source("b.pdm")
+    assert loaded.search("custmer", fuzzy=True) == [] and loaded.search("客") == []
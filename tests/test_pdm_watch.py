@@ -0,0 +1,62 @@
+import os
+
+import pdm_watch
+from model import Column, PdmColumnType
+from pdm_parser import parse_pdm
+from pdm_watch import PdmWatcher, SQL_DIR, PYMODEL_DIR
+from pdm_synth import write_synthetic_pdm
+
+
+def test_build_regenerates_only_changed_tables(synthetic_pdm, tmp_path, monkeypatch):
+    path = synthetic_pdm(6, n_refs=0)
+    out_dir = str(tmp_path / "out")
+    watcher = PdmWatcher(path, out_dir)
+    changed, removed = watcher.build()
+    assert len(changed) == 6 and removed == []
+    assert sorted(os.listdir(os.path.join(out_dir, SQL_DIR))) == ["t_table_%d.sql" % i for i in range(6)]
+    assert watcher.build() == ([], [])
+
+    # 修改一张表、删除一张表
+    tables = parse_pdm(path)
+    tables[2].columns.append(Column("备注", "remark", PdmColumnType.VARCHAR, 200))
+    del tables[5]
+    monkeypatch.setattr(pdm_watch, "parse_pdm", lambda *args, **kwargs: tables)
+    assert watcher.build() == (["t_table_2"], ["t_table_5"])
+    with open(os.path.join(out_dir, SQL_DIR, "t_table_2.sql"), encoding="utf-8") as f:
+        assert "remark" in f.read()
+    assert not os.path.exists(os.path.join(out_dir, PYMODEL_DIR, "t_table_5.py"))
+    with open(os.path.join(out_dir, PYMODEL_DIR, "__init__.py"), encoding="utf-8") as f:
+        assert "t_table_5" not in f.read()
+
+
+def test_poll_detects_changes(synthetic_pdm, tmp_path):
+    path = synthetic_pdm(2)
+    watcher = PdmWatcher(path, str(tmp_path / "out"))
+    assert watcher.poll(debounce=0)
+    assert not watcher.poll(debounce=0)
+    write_synthetic_pdm(path, 3)
+    assert watcher.poll(debounce=0)
+
+
+def test_generator_errors_do_not_abort_build(synthetic_pdm, tmp_path, monkeypatch):
+    path = synthetic_pdm(3, n_refs=0)
+    out_dir = str(tmp_path / "out")
+    generate_table_pymodel = pdm_watch.generate_table_pymodel
+
+    def fail_table_1(table, *args):
+        if table.code == "t_table_1":
+            raise Exception("无法生成")
+        return generate_table_pymodel(table, *args)
+    monkeypatch.setattr(pdm_watch, "generate_table_pymodel", fail_table_1)
+    watcher = PdmWatcher(path, out_dir)
+    assert watcher.build() == (["t_table_0", "t_table_1", "t_table_2"], [])
+    assert watcher.errors == {"t_table_1": ["t_table_1模型类生成失败: 无法生成"]}
+    with open(os.path.join(out_dir, PYMODEL_DIR, "t_table_1.py"), encoding="utf-8") as f:
+        assert f.read() == "# t_table_1模型类生成失败: 无法生成\n"
+    with open(os.path.join(out_dir, SQL_DIR, "t_table_1.sql"), encoding="utf-8") as f:
+        assert "CREATE TABLE" in f.read()
+    with open(os.path.join(out_dir, PYMODEL_DIR, "t_table_2.py"), encoding="utf-8") as f:
+        assert "class TTable2(BaseModel)" in f.read()
+    # 表未变化时保留上次的错误
+    assert watcher.build() == ([], [])
+    assert "t_table_1" in watcher.errors
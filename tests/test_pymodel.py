@@ -0,0 +1,84 @@
+import io
+import sqlite3
+import time
+
+import pytest
+
+from model import Table, Column, PdmColumnType
+from pymodel import generate_pymodel, write_pymodel
+
+
+def make_table() -> Table:
+    table = Table(1, "订单", "t_order")
+    table.columns = [
+        Column("编号", "id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+        Column("名称", "name", PdmColumnType.VARCHAR, 50),
+        Column("金额", "amount", PdmColumnType.DECIMAL, 18, col_scale=2),
+        Column("创建时间", "create_time", PdmColumnType.DATETIME, None),
+    ]
+    return table
+
+
+def load_models(code: str) -> dict:
+    namespace = {}
+    exec(code, namespace)
+    return namespace
+
+
+@pytest.mark.parametrize("slots", [False, True])
+def test_ignored_id_is_still_a_column(slots):
+    models = load_models(generate_pymodel([make_table()], table_prefix="t_", ignore_columns=["id"], slots=slots))
+    Order = models["Order"]
+    assert Order.columns == ("id", "name", "amount", "create_time")
+    assert Order.select_sql == "SELECT id, name, amount, create_time FROM t_order"
+
+
+def test_id_first_when_present():
+    table = make_table()
+    table.columns.append(table.columns.pop(0))
+    Order = load_models(generate_pymodel([table], table_prefix="t_"))["Order"]
+    assert Order.columns == ("id", "name", "amount", "create_time")
+
+
+@pytest.mark.parametrize("slots", [False, True])
+def test_executemany_and_query_on_sqlite(slots):
+    Order = load_models(generate_pymodel([make_table()], table_prefix="t_", ignore_columns=["id"],
+                                         slots=slots))["Order"]
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t_order (id INTEGER PRIMARY KEY, name TEXT, amount REAL, create_time TEXT)")
+    orders = [Order("order%d" % i, i * 1.5, None) for i in range(5)]
+    assert Order.executemany(conn, orders, paramstyle="qmark", chunk_size=2) == 5
+    ids = [o.id for o in orders]
+    assert conn.execute("SELECT id FROM t_order ORDER BY id").fetchall() == [(i,) for i in ids]
+
+    loaded = list(Order.query(conn, "amount > ?", (2,), size=2))
+    assert [(o.id, o.name, o.amount) for o in loaded] == [(ids[i], "order%d" % i, i * 1.5) for i in range(2, 5)]
+
+
+def test_bulk_insert_sqls():
+    Order = load_models(generate_pymodel([make_table()], table_prefix="t_"))["Order"]
+    orders = [Order(i, "o'%d" % i, i, None) for i in range(5)]
+    sqls = list(Order.get_bulk_insert_sqls(orders, chunk_size=2))
+    assert len(sqls) == 3
+    assert sqls[0].startswith("INSERT INTO t_order (id, name, amount, create_time) VALUES\n")
+    assert "(0, 'o''0', 0, NULL),\n(1, 'o''1', 1, NULL);" in sqls[0]
+    assert Order.get_insert_template("qmark") == \
+        "INSERT INTO t_order (id, name, amount, create_time) VALUES (?, ?, ?, ?)"
+
+
+def test_slots_model_formats_time_on_read():
+    models = load_models(generate_pymodel([make_table()], table_prefix="t_", ignore_columns=["id"], slots=True))
+    Order = models["Order"]
+    assert "_create_time" in Order.__slots__
+    order = Order("a", 1.5, 0)
+    with pytest.raises(AttributeError):
+        order.extra = 1
+    assert order._create_time == 0
+    assert order.create_time == time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(0))
+
+
+def test_write_pymodel_raises_on_bad_table():
+    broken = Table(2, "异常", "t_broken")
+    broken.columns = [Column("无编码", None, PdmColumnType.INT, None)]
+    with pytest.raises(Exception):
+        write_pymodel([make_table(), broken], io.StringIO())
@@ -0,0 +1,90 @@
+import subprocess
+import sys
+
+import pytest
+
+from model import Table, Column, PdmColumnType, pack_tables, unpack_tables
+from pdm_parser import parse_pdm
+from schema_diff import diff_tables, table_fingerprint, generate_alter_sql
+from sql_generator import DbType
+
+
+def test_fingerprint_is_stable_across_processes(synthetic_pdm):
+    path = synthetic_pdm(5)
+    local = [table_fingerprint(t) for t in parse_pdm(path)]
+    code = ("import sys; from pdm_parser import parse_pdm; from schema_diff import table_fingerprint; "
+            "print(' '.join(table_fingerprint(t) for t in parse_pdm(sys.argv[1])))")
+    # 每个子进程的字符串哈希种子不同
+    for seed in ("1", "2"):
+        out = subprocess.run([sys.executable, "-c", code, path], capture_output=True, text=True, check=True,
+                             env={"PYTHONHASHSEED": seed, "PYTHONPATH": ":".join(sys.path)}).stdout
+        assert out.split() == local
+
+
+def test_fingerprint_is_cached_and_packed(synthetic_pdm):
+    table = parse_pdm(synthetic_pdm(3))[0]
+    fingerprint = table_fingerprint(table)
+    assert table.fingerprint == fingerprint
+    restored = unpack_tables(pack_tables([table]))[0]
+    assert restored.fingerprint == fingerprint
+    # 缓存的指纹直接返回，不再遍历字段
+    restored.columns = None
+    assert table_fingerprint(restored) == fingerprint
+
+
+def test_diff_tables(synthetic_pdm):
+    path = synthetic_pdm(4)
+    old, new = parse_pdm(path), parse_pdm(path)
+    assert not diff_tables(old, new).changed_tables
+    new[1].columns.append(Column("备注", "remark", PdmColumnType.VARCHAR, 200))
+    new[1].fingerprint = None
+    del new[3]
+    diff = diff_tables(old, new)
+    assert [d.new.code for d in diff.changed_tables] == [new[1].code]
+    assert [c.code for c in diff.changed_tables[0].added_columns] == ["remark"]
+    assert [t.code for t in diff.dropped_tables] == [old[3].code]
+    sql = generate_alter_sql(old, new, DbType.MYSQL)
+    assert "remark" in sql and old[3].code in sql
+
+
+def make_table(*columns) -> Table:
+    table = Table(1, "订单", "t_order")
+    table.columns = list(columns)
+    return table
+
+
+def test_oracle_modify_declares_nullability_only_when_changed():
+    old = make_table(Column("名称", "name", PdmColumnType.VARCHAR, 50, not_null=True),
+                     Column("备注", "remark", PdmColumnType.VARCHAR, 50))
+    new = make_table(Column("名称", "name", PdmColumnType.VARCHAR, 100, not_null=True),
+                     Column("备注", "remark", PdmColumnType.VARCHAR, 50, not_null=True))
+    sql = generate_alter_sql([old], [new], DbType.ORACLE)
+    assert 'ALTER TABLE "T_ORDER" MODIFY ("NAME" VARCHAR2(100));' in sql
+    assert 'ALTER TABLE "T_ORDER" MODIFY ("REMARK" VARCHAR2(50) NOT NULL);' in sql
+    # MySQL的MODIFY必须给出完整定义
+    assert "MODIFY COLUMN `name` VARCHAR(100) NOT NULL COMMENT '名称';" in generate_alter_sql(
+        [old], [new], DbType.MYSQL)
+
+
+@pytest.mark.parametrize("db_type", list(DbType))
+def test_primary_key_change(db_type):
+    old = make_table(Column("编号", "id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+                     Column("编码", "code", PdmColumnType.VARCHAR, 32, not_null=True))
+    new = make_table(Column("编号", "id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+                     Column("编码", "code", PdmColumnType.VARCHAR, 32, pk=True, not_null=True))
+    diff = diff_tables([old], [new])
+    assert diff.changed_tables[0].pk_changed
+    lines = generate_alter_sql([old], [new], db_type).splitlines()
+    drop = [i for i, line in enumerate(lines) if "DROP PRIMARY KEY" in line or "DROP CONSTRAINT" in line]
+    add = [i for i, line in enumerate(lines) if "ADD PRIMARY KEY" in line]
+    assert len(drop) == 1 and len(add) == 1 and drop[0] < add[0]
+    # 只有主键标记变化时不输出无意义的字段修改
+    assert not any("MODIFY" in line or "ALTER COLUMN" in line for line in lines)
+
+
+def test_columns_without_code_are_skipped():
+    old = make_table(Column("编号", "id", PdmColumnType.BIGINT, None), Column("无编码", None, PdmColumnType.INT, None))
+    new = make_table(Column("编号", "id", PdmColumnType.BIGINT, 20), Column("无编码", None, PdmColumnType.INT, None))
+    table_diff = diff_tables([old], [new]).changed_tables[0]
+    assert [new.code for _, new in table_diff.modified_columns] == ["id"]
+    assert not table_diff.added_columns and not table_diff.dropped_columns
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from model import Table, Column, PdmColumnType
+from pdm_parser import parse_pdm, iter_pdm_tables
+from sql_generator import DbType, create_table_statement, write_sql, generate_sql, get_db_col_type
+
+
+def test_composite_primary_key_is_a_table_constraint():
+    table = Table(1, "明细", "t_detail")
+    table.columns = [Column("订单", "order_id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+                     Column("行号", "line_no", PdmColumnType.INT, None, pk=True, not_null=True),
+                     Column("数量", "quantity", PdmColumnType.INT, None)]
+    sql = create_table_statement(DbType.MYSQL, table)
+    assert "PRIMARY KEY (`order_id`, `line_no`)" in sql
+    assert sql.count("PRIMARY KEY") == 1
+    assert "`order_id` BIGINT NOT NULL COMMENT" in sql
+
+
+def test_single_primary_key_inline():
+    table = Table(1, "订单", "t_order")
+    table.columns = [Column("编号", "id", PdmColumnType.BIGINT, None, pk=True, not_null=True),
+                     Column("名称", "name", PdmColumnType.VARCHAR, 50)]
+    sql = create_table_statement(DbType.H2, table)
+    assert '"ID" BIGINT NOT NULL PRIMARY KEY' in sql
+    assert '"NAME" VARCHAR(50) NULL' in sql
+
+
+def test_write_sql_all_dialects(synthetic_pdm):
+    path = synthetic_pdm(6)
+    for db_type in DbType:
+        out = io.StringIO()
+        write_sql(iter_pdm_tables(path), db_type, out)
+        sql = out.getvalue()
+        assert sql == generate_sql(parse_pdm(path), db_type)
+        assert sql.count("CREATE TABLE") == 6
+        assert "生成失败" not in sql
+
+
+def make_tables() -> list:
+    good = Table(1, "正常", "t_good")
+    good.columns = [Column("名称", "name", PdmColumnType.VARCHAR, 255)]
+    bad = Table(2, "异常", "t_bad")
+    bad.columns = [Column("形状", "shape", None, None)]
+    return [bad, good]
+
+
+def test_unknown_type_raises_by_default():
+    with pytest.raises(Exception, match="t_bad表创建语句生成失败: shape字段类型无法识别"):
+        generate_sql(make_tables(), DbType.MYSQL)
+
+
+def test_unknown_type_only_fails_its_table_when_skipping():
+    out = io.StringIO()
+    assert write_sql(make_tables(), DbType.MYSQL, out, skip_errors=True) == ["t_bad"]
+    sql = out.getvalue()
+    assert "-- t_bad表创建语句生成失败: shape字段类型无法识别" in sql
+    assert "`name` VARCHAR(255) NULL" in sql
+
+
+def test_decimal_scale():
+    assert get_db_col_type(DbType.MYSQL, PdmColumnType.DECIMAL, 18, 4) == "DECIMAL(18,4)"
+    assert get_db_col_type(DbType.MYSQL, PdmColumnType.VARCHAR, 64) == "VARCHAR(64)"
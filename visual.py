@@ -1,10 +1,68 @@
+import functools
 import math
+import sys
 import tkinter as tk
 import tkinter.font as tkFont
 
+from er_layout import get_column_type_text, layout_tables, TableBox
 from model import Table, Column
 
-FAKE_CANVAS = tk.Canvas(None)
+
+class TextMeasurer:
+    """
+    文本尺寸测量服务：基于tkFont.Font.measure/metrics，按(字体, 文本)做LRU缓存，
+    不再为每次测量在画布上创建文本对象
+    """
+
+    def __init__(self, maxsize: int = 65536):
+        # 字体描述 -> tkFont.Font，字体名 -> tkFont.Font
+        self.fonts = {}
+        self.fonts_by_name = {}
+        self.__measure = functools.lru_cache(maxsize=maxsize)(self.__measure_uncached)
+
+    def get_font(self, font) -> tkFont.Font:
+        """
+        将字体描述（如"Times 20 italic bold"）转为tkFont.Font，同一描述只创建一次
+        """
+        if isinstance(font, tkFont.Font):
+            self.fonts_by_name.setdefault(str(font), font)
+            return font
+        f = self.fonts.get(font)
+        if f is None:
+            f = tkFont.Font(font=font)
+            self.fonts[font] = f
+            self.fonts_by_name[str(f)] = f
+        return f
+
+    def text_size(self, text: str, font) -> tuple:
+        """
+        计算文本的宽高
+        :param text: 文本内容
+        :param font: 文本字体
+        :return: returns a tuple like (width, height)
+        """
+        return self.__measure(str(self.get_font(font)), text)
+
+    def line_height(self, font) -> int:
+        return self.__measure(str(self.get_font(font)), "")[1]
+
+    def __measure_uncached(self, font_name: str, text: str) -> tuple:
+        f = self.fonts_by_name[font_name]
+        return f.measure(text), f.metrics("linespace")
+
+
+TEXT_MEASURER = TextMeasurer()
+
+# 默认打开的PDM文件，可通过命令行参数指定
+PDM_PATH = "/Users/liyilin/Workspace/doc/company/AIFactory-train-doc/06 数据模型/deepminer-v2(1).pdm"
+# ER图布局的最大宽度
+LAYOUT_WIDTH = 4096
+# 缩放比例低于该值时只绘制表框与表名
+LOD_SCALE = 0.5
+# 可见区域之外预先渲染的边距（屏幕像素）
+VIEWPORT_MARGIN = 200
+# 字体小于该字号时不再绘制文字
+MIN_FONT_SIZE = 5
 
 
 def get_canvas_text_bound_size(text: str, font):
@@ -14,109 +72,116 @@ def get_canvas_text_bound_size(text: str, font):
     :param font: 文本字体
     :return: returns a tuple like (width, height)
     """
-    t = FAKE_CANVAS.create_text(0, 0, text=text, font=font)
-    bound = FAKE_CANVAS.bbox(t)
-    return bound[2] - bound[0], bound[3] - bound[1]
+    return TEXT_MEASURER.text_size(text, font)
+
+
+class TkFontMetrics:
+    """
+    供er_layout使用的Tk字体度量
+    """
+
+    def __init__(self, font, measurer: TextMeasurer = None):
+        self.measurer = TEXT_MEASURER if measurer is None else measurer
+        self.font = self.measurer.get_font(font)
+        self.font_size = self.font.configure()['size']
+
+    def text_size(self, text: str) -> tuple:
+        return self.measurer.text_size(text, self.font)
 
 
 class TableRect:
     def __init__(self, root: tk.Canvas, x: int, y: int, table: Table, font: tkFont.Font = "Times 20 italic bold",
-                 padding: int = 3, line_width: int = 1):
+                 padding: int = 3, line_width: int = 1, measurer: TextMeasurer = None, tag: str = None):
+        """
+        :param tag: 绘制的所有图元都打上该标签，便于整体删除
+        """
         self.root = root
+        self.tag = tag
         self.x = x
         self.y = y
         self.table = table
-        self.font = font
+        self.measurer = TEXT_MEASURER if measurer is None else measurer
+        self.font = self.measurer.get_font(font)
         self.padding = padding
         self.line_width = line_width
+        # 布局只计算一次，render直接复用
+        self.font_size = self.font.configure()['size']
+        self.type_texts = [get_column_type_text(col) for col in table.columns]
+        self.title_width = self.measurer.text_size(table.name, self.font)[0]
+        self.name_width = max([self.measurer.text_size(col.name, self.font)[0] for col in table.columns], default=0)
+        self.type_width = max([self.measurer.text_size(text, self.font)[0] for text in self.type_texts], default=0)
         self.width, self.height = self.get_auto_bounding()
 
     def render(self):
-        font_size = self.font.configure()['size']
+        font_size = self.font_size
+        tags = () if self.tag is None else (self.tag,)
 
         # render Box
-        self.root.create_rectangle(self.x, self.y, self.x + self.width, self.y + self.height, fill="white")
+        self.root.create_rectangle(self.x, self.y, self.x + self.width, self.y + self.height, fill="white", tags=tags)
 
         # render table name
         x = self.x + self.width / 2
         y = self.y + font_size / 2 + self.padding
-        self.root.create_text(x, y, text=self.table.name, font=self.font)
+        self.root.create_text(x, y, text=self.table.name, font=self.font, tags=tags)
 
         # render split line
         y = self.y + font_size + self.padding * 2
-        self.root.create_line(self.x, y, self.x + self.width, y)
+        self.root.create_line(self.x, y, self.x + self.width, y, tags=tags)
 
         # render columns name
         sy = y + self.padding
         x = self.x + self.padding
-        max_width = 0
         for col in self.table.columns:
             col: Column = col
-            self.root.create_text(x, sy, text=col.name, font=self.font, anchor=tk.NW)
-            max_width = max(get_canvas_text_bound_size(col.name, self.font)[0], max_width)
+            self.root.create_text(x, sy, text=col.name, font=self.font, anchor=tk.NW, tags=tags)
             sy += font_size
 
         # render columns type
         sy = y + self.padding
-        x = x + max_width + self.padding
-        max_width = 0
-        for col in self.table.columns:
-            col: Column = col
-            text = col.col_type._name_
-            if col.col_length is not None:
-                text += "(" + str(col.col_length) + ")"
-                text = text.replace("((", "(").replace("))", ")")
-            self.root.create_text(x, sy, text=text, font=self.font, anchor=tk.NW)
-            max_width = max(get_canvas_text_bound_size(text, self.font)[0], max_width)
+        x = x + self.name_width + self.padding
+        for text in self.type_texts:
+            self.root.create_text(x, sy, text=text, font=self.font, anchor=tk.NW, tags=tags)
             sy += font_size
-        right = x + max_width + self.padding
+
+    def destroy(self):
+        if self.tag is not None:
+            self.root.delete(self.tag)
 
     def get_auto_bounding(self):
         left = self.x
         top = self.y
-        font_size = self.font.configure()['size']
+        font_size = self.font_size
 
         # table name + split line
-        right = self.x + get_canvas_text_bound_size(self.table.name, self.font)[0] + 2 * self.padding
+        right = self.x + self.title_width + 2 * self.padding
         y = self.y + font_size + self.padding * 2
 
         if self.table.columns is None or len(self.table.columns) == 0:
             return right - left, y + self.padding * 2 - top
 
         # columns name
-        sy = y + self.padding
-        x = self.x + self.padding
-        max_width = 0
-        for col in self.table.columns:
-            col: Column = col
-            max_width = max(get_canvas_text_bound_size(col.name, self.font)[0], max_width)
-            sy += font_size
-
+        sy = y + self.padding + font_size * len(self.table.columns)
         bottom = sy + self.padding + self.line_width
 
-        # render columns type
-        sy = y + self.padding
-        x = x + max_width + self.padding
-        max_width = 0
-        for col in self.table.columns:
-            col: Column = col
-            text = col.col_type._name_
-            if col.col_length is not None:
-                text += "(" + str(col.col_length) + ")"
-                text = text.replace("((", "(").replace("))", ")")
-            max_width = max(get_canvas_text_bound_size(text, self.font)[0], max_width)
-            sy += font_size
-        right = max(right, x + max_width + self.padding)
+        # columns type
+        x = self.x + self.padding + self.name_width + self.padding
+        right = max(right, x + self.type_width + self.padding)
 
         return right - left, bottom - top
 
 
 class Application(tk.Frame):
-    def __init__(self, master=None):
+    def __init__(self, master=None, pdm_path: str = PDM_PATH):
         super().__init__(master)
         self.master = master
         self.pack()
         self.canvas = None
+        self.pdm_path = pdm_path
+        self.font = None
+        self.layout = None
+        # 当前缩放比例，以及已绘制的表：表id -> 标签
+        self.scale = 1.0
+        self.rendered = {}
         self.create_widgets()
 
         # 滚动用的
@@ -129,32 +194,93 @@ class Application(tk.Frame):
         self.canvas.pack()
 
         self.canvas.delete("all")
-        font = tkFont.Font(family='Mono', size=15)
+        self.font = TEXT_MEASURER.get_font(('Mono', 15))
 
-        # 绘制ER图
+        # 布局ER图，只绘制可见区域内的表
         from pdm_parser import parse_pdm
-        ox, oy = 5, 5
-        x, y = ox, oy
-        my = 0
-        padding = 10
-        tables = parse_pdm("/Users/liyilin/Workspace/doc/company/AIFactory-train-doc/06 数据模型/deepminer-v2(1).pdm")
-        for table in tables:
-            tr = TableRect(self.canvas, x, y, table, font)
-            if tr.x + tr.width > 1024:
-                x = ox
-                y = my + padding
-                my = 0
-                tr = TableRect(self.canvas, x, y, table, font)
-            tr.render()
-            my = max(my, tr.y + tr.height)
-            x += tr.width + padding
+        tables = parse_pdm(self.pdm_path)
+        self.layout = layout_tables(tables, TkFontMetrics(self.font), max_width=LAYOUT_WIDTH)
+        self.update_scroll_region()
+        self.update_viewport()
 
         # 绑定事件
         self.canvas.bind("<ButtonPress-1>", lambda e: self.set_cur_pos(e))
         self.canvas.bind("<B1-Motion>", lambda e: self.scroll_canvase(e))
+        self.canvas.bind("<Configure>", lambda e: self.update_viewport())
+        self.canvas.bind("<MouseWheel>", lambda e: self.zoom(e, 1.25 if e.delta > 0 else 0.8))
+        self.canvas.bind("<Button-4>", lambda e: self.zoom(e, 1.25))
+        self.canvas.bind("<Button-5>", lambda e: self.zoom(e, 0.8))
         # self.canvas.
         # self.canvas.bind("<ButtonRelease-1>", lambda event: print("鼠标左键释放"))
 
+    def update_scroll_region(self):
+        self.canvas.configure(scrollregion=(0, 0, self.layout.width * self.scale, self.layout.height * self.scale))
+
+    def update_viewport(self):
+        """
+        按当前可见区域增删表：新进入视野的表绘制出来，离开视野的表删除，画布上的图元数量与模型大小无关
+        """
+        canvas = self.canvas
+        scale = self.scale
+        x0 = (canvas.canvasx(0) - VIEWPORT_MARGIN) / scale
+        y0 = (canvas.canvasy(0) - VIEWPORT_MARGIN) / scale
+        x1 = (canvas.canvasx(canvas.winfo_width()) + VIEWPORT_MARGIN) / scale
+        y1 = (canvas.canvasy(canvas.winfo_height()) + VIEWPORT_MARGIN) / scale
+        visible = {box.table.id: box for box in self.layout.visible(x0, y0, x1, y1)}
+        for table_id in list(self.rendered.keys()):
+            if table_id not in visible:
+                canvas.delete(self.rendered.pop(table_id))
+        for table_id, box in visible.items():
+            if table_id not in self.rendered:
+                self.rendered[table_id] = self.render_box(box)
+
+    def render_box(self, box: TableBox) -> str:
+        """
+        绘制一张表及其指向主表的连线
+        :return: 图元标签
+        """
+        canvas = self.canvas
+        scale = self.scale
+        tag = "table-%s" % box.table.id
+        font_size = int(round(self.font.configure()['size'] * scale))
+        x, y = box.x * scale, box.y * scale
+        if scale >= LOD_SCALE:
+            font = TEXT_MEASURER.get_font(('Mono', font_size))
+            TableRect(canvas, x, y, box.table, font, padding=max(1, int(round(box.padding * scale))), tag=tag).render()
+        else:
+            # 缩小时只保留表框与表名
+            canvas.create_rectangle(x, y, x + box.width * scale, y + box.height * scale, fill="white", tags=(tag,))
+            if font_size >= MIN_FONT_SIZE:
+                canvas.create_text(x + box.width * scale / 2, y + font_size, text=box.table.name,
+                                   font=TEXT_MEASURER.get_font(('Mono', font_size)), tags=(tag,))
+        cx, cy = box.center
+        for parent in box.table.refs:
+            parent_box = self.layout.box_by_id.get(parent.id)
+            if parent_box is None or parent_box is box:
+                continue
+            px, py = parent_box.center
+            line = canvas.create_line(cx * scale, cy * scale, px * scale, py * scale, fill="gray", tags=(tag,))
+            canvas.tag_lower(line)
+        return tag
+
+    def zoom(self, event, factor: float):
+        """
+        以鼠标位置为中心缩放
+        """
+        scale = min(2.0, max(0.05, self.scale * factor))
+        if scale == self.scale:
+            return
+        canvas = self.canvas
+        mx = canvas.canvasx(event.x) / self.scale
+        my = canvas.canvasy(event.y) / self.scale
+        self.scale = scale
+        canvas.delete("all")
+        self.rendered = {}
+        self.update_scroll_region()
+        canvas.xview_moveto(max(0.0, (mx * scale - event.x) / (self.layout.width * scale)))
+        canvas.yview_moveto(max(0.0, (my * scale - event.y) / (self.layout.height * scale)))
+        self.update_viewport()
+
     def set_cur_pos(self, event):
         self.cur_pos = (event.x, event.y)
         self.move = [0, 0]
@@ -174,9 +300,22 @@ class Application(tk.Frame):
         else:
             self.move[1] += self.cur_pos[1] - event.y
         self.cur_pos = (event.x, event.y)
+        if xscroll or yscroll:
+            self.update_viewport()
+
 
+def main(argv: list = None) -> int:
+    """
+    打开ER图窗口，需要图形界面；导入本模块不会创建Tk窗口
+    :param argv: 命令行参数，第一个参数为PDM文件路径
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    root = tk.Tk()
+    app = Application(master=root, pdm_path=argv[0] if argv else PDM_PATH)
+    app.mainloop()
+    return 0
 
-root = tk.Tk()
-app = Application(master=root)
 
-app.mainloop()
+if __name__ == "__main__":
+    sys.exit(main())